@@ -0,0 +1,118 @@
+"""
+Startup benchmark: the time it takes a fresh interpreter to import each backend
+function, and which heavy dependencies that import pulls in.
+
+Usage (from the backend directory):
+    python -m benchmarks.imports [--repeats 5] [--output imports.json]
+
+Each import runs in its own interpreter, so nothing is shared between them.
+Results are written as JSON so that runs can be compared over time.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks.run import git_commit
+
+# What each benchmarked name imports, run from the backend directory
+TARGETS = {
+    "functions": "import functions",
+    "functions.trim": "import functions; functions.get('trim')",
+    "functions.search": "import functions; functions.get('search')",
+    "functions.layout": "import functions; functions.get('layout')",
+    "functions.translate": "import functions; functions.get('translate')",
+    "cursor_detection": "import cursor_detection",
+    "pipeline": "import pipeline",
+}
+
+# Dependencies worth knowing about when they're imported at startup
+HEAVY_MODULES = [
+    "openai",
+    "deep_translator",
+    "sentence_transformers",
+    "torch",
+    "cv2",
+    "nltk",
+]
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(code: str) -> dict:
+    """Runs `code` in a fresh interpreter and returns its import time and loaded modules."""
+    process = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(code=code, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode:
+        error = process.stderr.strip().splitlines()
+        return {"error": error[-1] if error else f"exit code {process.returncode}"}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="Only run these benchmarks")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for name, code in TARGETS.items():
+        if args.only and name not in args.only:
+            continue
+
+        runs = [measure(code) for _ in range(args.repeats)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            results.append({"name": name, "error": errors[0]})
+            print(f"{name:<24} failed: {errors[0]}", file=sys.stderr)
+            continue
+
+        durations = [run["seconds"] for run in runs]
+        results.append(
+            {
+                "name": name,
+                "min": min(durations),
+                "median": statistics.median(durations),
+                "repeats": args.repeats,
+                "loaded": runs[0]["loaded"],
+            }
+        )
+        print(
+            f"{name:<24} {statistics.median(durations) * 1000:>10.2f} ms  "
+            f"{', '.join(runs[0]['loaded'])}",
+            file=sys.stderr,
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Microbenchmarks for the transcript hot paths on synthetic long transcripts.
+
+Usage (from the backend directory):
+    python -m benchmarks.run [--minutes 10 30 60 180] [--output results.json]
+
+Results are written as JSON so that runs can be compared over time.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from benchmarks.synthetic import generate_transcript, llm_answer
+from utils.general import (
+    chunk_transcript,
+    extend_to_complete_sentences,
+    find_transcript_segment,
+    linearize_transcript,
+    split_into_clauses,
+)
+from utils.diff_text import find_section_range
+from utils.spans import SpanIndex
+from utils.transcript_index import TranscriptIndex
+
+
+def timeit(func: Callable[[], object], repeats: int) -> dict:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "repeats": repeats,
+    }
+
+
+def benchmarks(transcript, seed: int) -> dict[str, Callable[[], object]]:
+    """The benchmarked calls for one transcript, by name."""
+    from functions.translate.main import map_timings, split_into_sentences
+
+    text = linearize_transcript(transcript)
+    clauses = [c for c in split_into_clauses(text) if len(c.split()) >= 3]
+    clause = clauses[len(clauses) // 2]
+    answer = llm_answer(transcript, seed)
+    middle = len(transcript) // 2
+    index = TranscriptIndex(transcript)
+    spans = SpanIndex(transcript)
+    sentences = split_into_sentences(transcript)
+    # Drop a word from every other sentence to exercise both mapping branches
+    translations = [
+        " ".join(word["text"] for word in sentence[: len(sentence) - i % 2])
+        for i, sentence in enumerate(sentences)
+    ]
+
+    return {
+        "find_section_range": lambda: find_section_range(transcript, answer),
+        "chunk_transcript": lambda: chunk_transcript(transcript, 170, 20),
+        "extend_to_complete_sentences": lambda: extend_to_complete_sentences(
+            {"start": middle, "end": middle + 10}, transcript
+        ),
+        "extend_to_complete_sentences[indexed]": lambda: extend_to_complete_sentences(
+            {"start": middle, "end": middle + 10}, transcript, spans
+        ),
+        "SpanIndex": lambda: SpanIndex(transcript),
+        "SpanIndex.clauses": lambda: spans.clauses,
+        "split_into_clauses": lambda: split_into_clauses(text),
+        "find_transcript_segment": lambda: find_transcript_segment(clause, transcript),
+        "find_transcript_segment[indexed]": lambda: find_transcript_segment(
+            clause, transcript, index=index
+        ),
+        "translate.split_into_sentences": lambda: split_into_sentences(transcript),
+        "translate.map_timings": lambda: [
+            map_timings(sentence, translation)
+            for sentence, translation in zip(sentences, translations)
+        ],
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 30, 60, 180])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="Only run these benchmarks")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for minutes in args.minutes:
+        transcript = generate_transcript(minutes, seed=args.seed)
+        for name, func in benchmarks(transcript, args.seed).items():
+            if args.only and name not in args.only:
+                continue
+            timing = timeit(func, args.repeats)
+            results.append(
+                {"name": name, "minutes": minutes, "words": len(transcript), **timing}
+            )
+            print(
+                f"{name:<36} {minutes:>6g} min {timing['median'] * 1000:>10.2f} ms",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import random
+import uuid
+import custom_types
+from config.constants import FPS
+
+WORDS = (
+    "the a to and of in it is you that this we for on with so be can just "
+    "click here then go over right now what going see screen button page file "
+    "open select settings video recording project edit share export title "
+    "summary chapter layout cursor transcript timeline frame camera window tab "
+    "really actually basically little bit next first after before important "
+    "feature option menu top left bottom side look want need make sure"
+).split()
+
+CONJUNCTIONS = ["and", "but", "or"]
+
+
+def generate_transcript(
+    minutes: float, seed: int = 0, words_per_minute: int = 150
+) -> custom_types.Transcript:
+    """
+    Generates a deterministic, realistic-looking transcript of the given length.
+
+    Sentences are 4-25 words long, with commas and conjunctions (so clause
+    splitting has work to do), capitalized starts and occasional pauses between
+    sentences. Timings are in frames at FPS, like real transcripts.
+    """
+    rng = random.Random(seed)
+    frames_per_word = 60 * FPS / words_per_minute
+
+    transcript = []
+    frame = 0.0
+    total_words = int(minutes * words_per_minute)
+
+    while len(transcript) < total_words:
+        length = rng.randint(4, 25)
+        for i in range(length):
+            if i > 0 and rng.random() < 0.08:
+                text = rng.choice(CONJUNCTIONS)
+            else:
+                text = rng.choice(WORDS)
+            if i == 0:
+                text = text.capitalize()
+            if i == length - 1:
+                text += rng.choice([".", ".", ".", "?", "!"])
+            elif rng.random() < 0.1:
+                text += ","
+
+            duration = frames_per_word * rng.uniform(0.6, 1.2)
+            transcript.append(
+                {
+                    "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "start": round(frame),
+                    "end": round(frame + duration),
+                    "text": text,
+                }
+            )
+            frame += frames_per_word
+
+        # Pause between sentences
+        frame += rng.uniform(0, 2) * FPS
+
+    return transcript[:total_words]
+
+
+def llm_answer(
+    transcript: custom_types.Transcript, seed: int = 0, length: int = 30
+) -> str:
+    """
+    Stands in for an LLM quoting the transcript: a random section with the
+    punctuation dropped and one word changed.
+    """
+    rng = random.Random(seed)
+    start = rng.randrange(0, max(1, len(transcript) - length))
+    words = [word["text"].strip(".,?!") for word in transcript[start : start + length]]
+    words[len(words) // 2] = "banana"
+    return " ".join(words)
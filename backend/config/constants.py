@@ -1,5 +1,10 @@
+import os
+
 FPS = 30
 
+# Local caches (LLM responses, embeddings, ...)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
 CURSOR_PHRASES = [
     "in the top left",
     "in the top right",
@@ -18,4 +23,80 @@ CURSOR_PHRASES = [
     "head to",
     "go to",
     "look at"
-]
\ No newline at end of file
+]
+
+# Layout search fan-out
+SEARCH_CONCURRENCY = 8
+SEARCH_TIMEOUT = 30  # seconds, per LLM request
+SEARCH_RETRIES = 2
+SEARCH_QUOTE_TOKENS = 50  # longest quote the LLM answers a search with
+
+# Translation
+TRANSLATE_CONCURRENCY = 4
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "on") != "off"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = 50_000
+LLM_CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+
+# Sentence embeddings
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_CACHE_SIZE = 10_000  # texts kept in the in-process LRU
+EMBEDDING_BATCH_SIZE = 128  # texts per micro-batch, see utils/embeddings.py
+EMBEDDING_BATCH_WAIT = 0.01  # seconds a request waits for others to join its batch
+
+# Search retrieval
+RETRIEVAL_TOP_K = 8  # windows sent to the LLM
+RETRIEVAL_WINDOW_SENTENCES = 3
+RETRIEVAL_MAX_WINDOW_WORDS = 80
+
+# Map-reduce summarization
+SUMMARY_SINGLE_CALL_WORDS = 3000  # shorter transcripts are summarized in one request
+SUMMARY_CHUNK_DURATION = 5 * 60 * FPS  # frames per chunk
+SUMMARY_REDUCE_FAN_IN = 8  # partial summaries combined per request
+SUMMARY_CONCURRENCY = 8
+
+# Chapter segmentation
+CHAPTER_WINDOW_SENTENCES = 3  # sentences compared on each side of a boundary
+CHAPTER_MIN_WORDS = 150
+CHAPTER_MAX_CHAPTERS = 10
+CHAPTER_EXCERPT_WORDS = 50  # words per chapter sent to the LLM for its title
+
+# Silence detection for trimming
+SILENCE_SAMPLE_RATE = 24_000  # Hz, a multiple of FPS
+SILENCE_BLOCK_SECONDS = 30  # audio decoded at a time
+SILENCE_MARGIN_DB = 10  # above the noise floor
+SILENCE_MIN_DURATION = 0.75  # seconds, shorter pauses are kept
+SILENCE_PADDING = 0.15  # seconds kept around words
+
+# Cursor tracking
+CURSOR_WORK_WIDTH = 960  # frames are downscaled to this width
+CURSOR_MATCH_THRESHOLD = 0.8
+CURSOR_SEARCH_BUDGET = 0.01  # seconds per frame searching the whole frame when lost
+CURSOR_SEARCH_BAND = 64  # rows of the working frame searched at a time
+CURSOR_STILL_RADIUS = 24  # pixels the cursor may move within one segment
+
+# Scene changes of the screen video
+SCENE_SAMPLE_INTERVAL = 0.5  # seconds between compared frames
+SCENE_SHARD_SECONDS = 120  # video decoded per worker task
+SCENE_MIN_SCORE = 0.05  # smaller changes aren't indexed
+SCENE_CHANGE_THRESHOLD = 0.3  # e.g. a new slide or window
+
+# Worker service, see server.py
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_CONCURRENT = 8  # requests processed at once
+SERVER_QUEUE_TIMEOUT = 1  # seconds a request waits for a slot before a 503
+
+# Job queue, see jobs.py
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")  # database and transcripts of the jobs
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))  # jobs processed at once
+JOBS_LEASE_SECONDS = 60  # a running job not heard from for this long is requeued
+JOBS_POLL_INTERVAL = 1  # seconds between checks for new jobs when idle
+
+# Tracing: "off", "jsonl" or "prometheus", see utils/tracing.py
+TRACING = os.getenv("TRACING", "off")
+TRACING_PATH = os.getenv(
+    "TRACING_PATH", "traces.jsonl" if TRACING == "jsonl" else "metrics.prom"
+)
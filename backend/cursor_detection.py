@@ -1,45 +1,65 @@
-from sentence_transformers import SentenceTransformer
-from utils.general import linearize_transcript, split_into_clauses, find_transcript_segment
-from config.constants import FPS, CURSOR_PHRASES
-from backend.detectors.cursor_reference import CursorReference
+from utils.spans import SpanIndex
+from utils import tracing
 import numpy as np
-import cv2
-import re
-import json
-import os
+
+# The detectors are imported on first use: they pull in OpenCV and the
+# embedding model, which most importers of this module never need
 
 def detect_cursor(frame):
-    # we can integrate the YOLO model here to detect the cursor 
-    # and pass the frame in props to the model to detect the cursor 
-    # and get the x,y co-ordinates of the cursor and return them
-    print("smthn")
-
-def process_video(video_path, transcript):
-    print("\ninit")
-    detector = CursorReference()
+    """
+    Finds the cursor in a single frame, by template matching over the whole
+    frame (see detectors.cursor_tracker). Returns its position as {x, y} in
+    pixels, or None if there is no cursor in the frame.
+    """
+    from detectors.cursor_tracker import CursorTracker
+
+    return CursorTracker().locate(frame)
+
+@tracing.traced("cursor")
+def process_video(video_path, transcript, spans=None, references=None):
+    """
+    `references` are the cursor references of the transcript with their word
+    ranges, if they were already found (e.g. by incremental.LiveTranscript).
+    """
     results = []
-    
-    full_text = linearize_transcript(transcript)
-    clauses = split_into_clauses(full_text)
-    #print(f"Found {len(clauses)} clauses.")
-    
-    for clause in clauses:
-        if detector.is_cursor_reference(clause):
-            segment = find_transcript_segment(clause, transcript)
-            if segment:
-                cap = cv2.VideoCapture(video_path)
-                timestamp_ms = (segment['start'] * 1000) / FPS
-                cap.set(cv2.CAP_PROP_POS_MSEC, timestamp_ms)
-                ret, frame = cap.read()
-                
-                if ret:
-                    #passing the frame in which we need to identify the cursor position to the detect_cursor function
-                    cursor_pos = detect_cursor(frame)
-                    if cursor_pos:
-                        results.append({
-                            'start': segment['start'],
-                            'end': segment['end'],
-                            'pos': cursor_pos
-                        })
-                cap.release()
+
+    if references is None:
+        from detectors.cursor_reference import CursorReference
+
+        detector = CursorReference()
+
+        # Clauses come with their word ranges, so there is nothing to look up
+        clauses = (spans or SpanIndex(transcript)).clauses
+        matches = detector.score_clauses([clause['text'] for clause in clauses])
+        references = [
+            {**match, 'start': clause['start'], 'end': clause['end']}
+            for clause, match in zip(clauses, matches)
+        ]
+
+    # Clauses shorter than three words are too ambiguous to act on
+    segments = [
+        transcript[reference['start']]
+        for reference in references
+        if reference['is_reference'] and len(reference['text'].split()) >= 3
+    ]
+
+    tracing.current().set(segments=len(segments))
+    if not segments:
+        return results
+
+    # Track the cursor through the whole video in one pass, then look up where
+    # it was at each reference
+    from detectors.cursor_tracker import track_video
+
+    tracked = track_video(video_path)
+    tracked_starts = np.array([cursor['start'] for cursor in tracked])
+
+    for segment in segments:
+        i = np.searchsorted(tracked_starts, segment['start'], side='right') - 1
+        if i >= 0 and tracked[i]['end'] > segment['start']:
+            results.append({
+                'start': segment['start'],
+                'end': segment['end'],
+                'pos': tracked[i]['pos']
+            })
     return results
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import TypedDict, List
+from typing import Any, Dict, Optional, TypedDict, List
 
 
 class Range(TypedDict):
@@ -6,6 +6,21 @@ class Range(TypedDict):
     end: int
 
 
+class SectionMatch(Range):
+    hallucination: float
+
+
+class SearchResult(TypedDict, total=False):
+    start: int
+    end: int
+    error: str  # instead of start and end if the query wasn't found
+
+
+class RetrievedWindow(Range):
+    text: str
+    similarity: float
+
+
 class Point(TypedDict):
     x: int
     y: int
@@ -36,4 +51,61 @@ class CursorReference(TypedDict):
     text: str
     similarity: float
 
+class CursorMatch(TypedDict):
+    text: str
+    phrase: str
+    similarity: float
+    is_reference: bool
+
+class Clause(Range):
+    text: str
+
+class ClauseMatch(CursorMatch):
+    start: int  # word index
+    end: int  # word index, exclusive
+
+class TranscriptionStatus(TypedDict, total=False):
+    status: str  # "processing", "completed" or "error"
+    words: List[dict]
+    error: str
+
+class TranscriptionResult(TypedDict, total=False):
+    audio_path: str
+    output_path: str
+    words: int
+    error: str
+
+class JobStatus(TypedDict):
+    id: str
+    status: str  # "queued", "running", "done" or "failed"
+    stages: Dict[str, str]  # "pending", "done" or "failed", in order
+    progress: float  # fraction of the stages which are done
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+class PipelineResult(TypedDict):
+    results: Dict[str, Any]
+    errors: Dict[str, str]
+    timings: Dict[str, float]
+    wall_time: float
+
+class TrimResult(Range):
+    silences: List[Range]  # internal pauses which can be cut, in frames
+
+class Chapter(Range):
+    title: str
+    start_word: int
+    end_word: int  # exclusive
+
+class SceneChange(TypedDict):
+    frame: int  # first frame showing the new content
+    score: float  # 0 (identical) to 1 (unrelated)
+
+class PartialSummary(TypedDict):
+    level: int  # 0 for chunk summaries, then one per reduce round
+    index: int  # position within the level, in transcript order
+    text: str
+    final: bool
+
 Transcript = List[Word]
@@ -1,22 +1,67 @@
-from sentence_transformers import SentenceTransformer
-from scipy import spatial
 import numpy as np
+import custom_types
 from config.constants import CURSOR_PHRASES
+from utils import tracing
+from utils.embeddings import encode, get_model, phrase_embeddings
+
 
 class CursorReference:
     def __init__(self):
-        self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        self.cursor_embeddings = self.model.encode(CURSOR_PHRASES)
-        
+        # The model and phrase embeddings are loaded on the first scoring, so
+        # building a detector doesn't load the model. Both are shared across
+        # instances.
+        self._cursor_embeddings = None
+
+    @property
+    def model(self):
+        return get_model()
+
+    @property
+    def cursor_embeddings(self) -> np.ndarray:
+        if self._cursor_embeddings is None:
+            self._cursor_embeddings = phrase_embeddings(CURSOR_PHRASES)
+        return self._cursor_embeddings
+
+    def score_clauses(
+        self, clauses: list[str], threshold: float = 0.4
+    ) -> list[custom_types.CursorMatch]:
+        """
+        Score every clause against the cursor phrases in one batch.
+
+        All clauses not already in the embedding cache are encoded with a single
+        forward pass and compared to the phrase embeddings with one matrix
+        product of unit vectors, so the result is the cosine similarity.
+
+        Parameters:
+        clauses (list[str]): The clauses to score.
+        threshold (float): Minimum similarity for a clause to count as a cursor reference.
+
+        Returns:
+        list (CursorMatch): One match per clause, in the same order as `clauses`.
+        """
+        if not clauses:
+            return []
+
+        with tracing.span("cursor.score_clauses", clauses=len(clauses)) as span:
+            clause_embeddings = encode(clauses)
+            similarities = clause_embeddings @ self.cursor_embeddings.T
+
+            best = similarities.argmax(axis=1)
+            best_similarities = similarities[np.arange(len(clauses)), best]
+            span.set(references=int((best_similarities > threshold).sum()))
+
+        return [
+            {
+                "text": clause,
+                "phrase": CURSOR_PHRASES[phrase_index],
+                "similarity": float(similarity),
+                "is_reference": bool(similarity > threshold),
+            }
+            for clause, phrase_index, similarity in zip(
+                clauses, best, best_similarities
+            )
+        ]
+
     def is_cursor_reference(self, text, threshold=0.4):
         """Check if text contains spatial reference"""
-        text_embedding = self.model.encode([text])[0]
-        similarities = [
-            1 - spatial.distance.cosine(text_embedding, phrase_embedding)
-            for phrase_embedding in self.cursor_embeddings
-        ]
-        max_sim = max(similarities)
-        max_phrase = CURSOR_PHRASES[np.argmax(similarities)]
-        if max_sim > threshold:
-            print(f"Text: '{text}'\nBest match: '{max_phrase}' (similarity: {max_sim:.3f})")
-        return max_sim > threshold
\ No newline at end of file
+        return self.score_clauses([text], threshold)[0]["is_reference"]
@@ -0,0 +1,461 @@
+import time
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+
+import custom_types
+from config.constants import (
+    FPS,
+    CURSOR_WORK_WIDTH,
+    CURSOR_MATCH_THRESHOLD,
+    CURSOR_SEARCH_BUDGET,
+    CURSOR_SEARCH_BAND,
+    CURSOR_STILL_RADIUS,
+)
+from utils import tracing
+from utils.frame_sampler import FrameSampler
+
+# Outline of the standard arrow cursor, tip at (0, 0), 19 px tall at 100% scaling
+ARROW = np.array(
+    [(0, 0), (0, 16), (4, 12), (7, 18.5), (9.5, 17.5), (6.5, 11.5), (11.5, 11.5)]
+)
+ARROW_HEIGHT = 19
+
+# Cursor heights in pixels of the screen recording: 100%, 150% and 200% scaling
+CURSOR_HEIGHTS = (19, 28, 38)
+
+# Sub-pixel positions of the tip in downscaled frames; a small cursor looks
+# different enough at each to need its own template
+PHASES = ((0, 0), (0.5, 0), (0, 0.5), (0.5, 0.5))
+
+
+def render_arrow(height: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draws the arrow cursor (white with a black outline) at the given height,
+    with its tip at pixel (1, 1). The same template finds dark cursors with a
+    light outline, see CursorTracker.
+
+    Returns:
+    tuple: The grayscale template and the mask of its cursor pixels.
+    """
+    scale = height / ARROW_HEIGHT
+    points = ARROW * scale + 1
+    size = (int(np.ceil(points[:, 1].max())) + 2, int(np.ceil(points[:, 0].max())) + 2)
+
+    # Drawn at 4x and downscaled, for antialiased edges at small sizes
+    big = np.zeros((size[0] * 4, size[1] * 4), np.uint8)
+    big_mask = np.zeros_like(big)
+    polygon = np.round(points * 4).astype(np.int32)
+    cv2.fillPoly(big, [polygon], 255)
+    cv2.fillPoly(big_mask, [polygon], 255)
+    cv2.polylines(big, [polygon], True, 0, thickness=max(1, round(4 * scale)))
+    cv2.polylines(big_mask, [polygon], True, 255, thickness=max(1, round(4 * scale)))
+
+    template = cv2.resize(big, size[::-1], interpolation=cv2.INTER_AREA)
+    mask = cv2.resize(big_mask, size[::-1], interpolation=cv2.INTER_AREA)
+    return template, (mask > 127).astype(np.uint8)
+
+
+def downscaled_arrows(
+    height: int, scale: float
+) -> list[tuple[np.ndarray, np.ndarray, float, float]]:
+    """
+    The cursor of the given height in frames downscaled by `scale`, at each of
+    the PHASES. Each is drawn at full size, shifted by whole pixels and then
+    downscaled like the frames are, so the templates match what the cursor
+    really looks like.
+
+    Returns:
+    list: (template, mask, tip x, tip y) for each phase, the tip in pixels of
+          the template.
+    """
+    template, mask = render_arrow(height)
+    if scale >= 1:
+        return [(template, mask, 1.0, 1.0)]
+
+    arrows = []
+    for phase_x, phase_y in PHASES:
+        dx, dy = round(phase_x / scale), round(phase_y / scale)
+        # Padded to a whole number of downscaled pixels, so pixel boundaries
+        # line up with the frame's
+        size = (
+            int(np.ceil((template.shape[1] + dx) * scale)),
+            int(np.ceil((template.shape[0] + dy) * scale)),
+        )
+        shifted = np.zeros((round(size[1] / scale), round(size[0] / scale)), np.uint8)
+        shifted_mask = np.zeros_like(shifted)
+        shifted[dy : dy + template.shape[0], dx : dx + template.shape[1]] = template
+        shifted_mask[dy : dy + template.shape[0], dx : dx + template.shape[1]] = (
+            mask * 255
+        )
+
+        small = cv2.resize(shifted, size, interpolation=cv2.INTER_AREA)
+        small_mask = cv2.resize(shifted_mask, size, interpolation=cv2.INTER_AREA)
+        arrows.append(
+            (
+                small,
+                (small_mask > 127).astype(np.uint8),
+                (1 + dx) * scale,
+                (1 + dy) * scale,
+            )
+        )
+    return arrows
+
+
+class CursorTracker:
+    """
+    Finds the mouse cursor in consecutive frames of a screen recording.
+
+    Frames are converted to grayscale and downscaled to `work_width`. Once the
+    cursor is found, each frame only searches a small region around its last
+    position, at the scale it was found at, and skips matching altogether if
+    nothing changed there. When it is lost, the regions which changed since the
+    previous frame (where a moving cursor shows up) are searched at every scale,
+    and a search of the whole frame picks up a cursor which isn't moving. That
+    search is spread over consecutive frames, one band of rows and template at
+    a time, for at most `search_budget` seconds per frame, so frames without a
+    cursor stay cheap.
+
+    Light cursors with a dark outline (Windows) and dark ones with a light
+    outline (macOS) are both found: with normalized correlation, the inverted
+    template's score is the negated score, so the lowest scores are the
+    matches of a dark cursor.
+    """
+
+    def __init__(
+        self,
+        work_width: int = CURSOR_WORK_WIDTH,
+        threshold: float = CURSOR_MATCH_THRESHOLD,
+        search_budget: float = CURSOR_SEARCH_BUDGET,
+        search_band: int = CURSOR_SEARCH_BAND,
+        cursor_heights: Iterable[int] = CURSOR_HEIGHTS,
+        diff_threshold: int = 25,
+        max_candidates: int = 8,
+        min_contrast: float = 80,
+        min_separation: float = 40,
+    ):
+        """
+        Parameters:
+        work_width (int): Width in pixels frames are downscaled to.
+        threshold (float): Minimum normalized correlation of a match.
+        search_budget (float): Seconds per frame spent searching the whole
+                               frame while the cursor is lost.
+        search_band (int): Rows of the working frame searched at a time.
+        cursor_heights (Iterable[int]): Cursor heights to look for, in pixels of
+                                        the original frames.
+        diff_threshold (int): Minimum change of a pixel's brightness between
+                              frames to count as motion.
+        max_candidates (int): Maximum number of changed regions searched per frame.
+        min_contrast (float): Minimum difference in brightness between the fill
+                              and the outline of a match, either way round.
+                              Correlation ignores contrast, so faint shapes
+                              could match otherwise.
+        min_separation (float): Minimum difference in brightness between the
+                                darkest pixel of the light part of a match and
+                                the lightest pixel of its dark part, which rules
+                                out shapes that only match on average.
+        """
+        self.work_width = work_width
+        self.threshold = threshold
+        self.search_budget = search_budget
+        self.search_band = search_band
+        self.cursor_heights = tuple(cursor_heights)
+        self.diff_threshold = diff_threshold
+        self.max_candidates = max_candidates
+        self.min_contrast = min_contrast
+        self.min_separation = min_separation
+
+        self._scale = None
+        self._templates = None
+        self._previous = None
+        self._position = None  # (x, y, size, phase) in working pixels
+        self._sweep = 0  # next (band, template) of the whole-frame search
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if self._scale is None:
+            self._scale = min(1.0, self.work_width / frame.shape[1])
+            # The templates of each cursor size, one per phase
+            self._templates = [
+                downscaled_arrows(height, self._scale) for height in self.cursor_heights
+            ]
+
+        if self._scale < 1:
+            size = (
+                round(frame.shape[1] * self._scale),
+                round(frame.shape[0] * self._scale),
+            )
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _match(
+        self,
+        gray: np.ndarray,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        templates: Iterable[tuple[int, int]],
+        threshold: float,
+    ) -> Optional[tuple[float, int, int, int, int]]:
+        """
+        Best match of the (size, phase) templates within the region, as
+        (score, x, y, size, phase).
+        """
+        best = None
+        for size, phase in templates:
+            template, mask, _, _ = self._templates[size][phase]
+            h, w = template.shape
+            region = gray[
+                max(0, y0) : min(gray.shape[0], y1 + h),
+                max(0, x0) : min(gray.shape[1], x1 + w),
+            ]
+            if region.shape[0] < h or region.shape[1] < w or region.std() < 1:
+                continue
+
+            scores = cv2.matchTemplate(
+                region, template, cv2.TM_CCOEFF_NORMED, mask=mask
+            )
+            scores = np.nan_to_num(scores, nan=0, posinf=0, neginf=0)
+            low, high, low_at, high_at = cv2.minMaxLoc(scores)
+
+            # A light cursor, and a dark one matching the inverted template
+            for sign, score, (x, y) in ((1, high, high_at), (-1, -low, low_at)):
+                if score < threshold or (best is not None and score <= best[0]):
+                    continue
+
+                # The light and dark parts of the match, as well as the pixels
+                # which are clearly either, rather than antialiased edges
+                patch = region[y : y + h, x : x + w]
+                bright = mask.astype(bool) & (template > 127)
+                solid = mask.astype(bool) & ((template >= 200) | (template <= 40))
+                light, dark = patch[bright], patch[mask.astype(bool) & ~bright]
+                light_core, dark_core = patch[bright & solid], patch[~bright & solid]
+                if sign < 0:
+                    light, dark = dark, light
+                    light_core, dark_core = dark_core, light_core
+
+                contrast = light.mean() - dark.mean()
+                separation = int(light_core.min()) - int(dark_core.max())
+                if contrast >= self.min_contrast and separation >= self.min_separation:
+                    best = (score, max(0, x0) + x, max(0, y0) + y, size, phase)
+
+        return best
+
+    def _continue_sweep(
+        self, gray: np.ndarray
+    ) -> Optional[tuple[float, int, int, int, int]]:
+        """
+        Searches the whole frame with the next templates and bands of rows, for
+        about `search_budget` seconds but at least one band. The sweep picks up
+        where the previous frame's left off, and starts over once it has
+        covered the whole frame with every template.
+        """
+        templates = self._all_templates()
+        bands = range(0, gray.shape[0], self.search_band)
+        units = len(bands) * len(templates)
+
+        deadline = time.perf_counter() + self.search_budget
+        for _ in range(units):
+            band, template = divmod(self._sweep % units, len(templates))
+            self._sweep += 1
+            y0 = bands[band]
+            match = self._match(
+                gray,
+                0,
+                y0,
+                gray.shape[1],
+                y0 + self.search_band,
+                [templates[template]],
+                self.threshold,
+            )
+            if match or time.perf_counter() >= deadline:
+                return match
+        return None
+
+    def _all_templates(self) -> list[tuple[int, int]]:
+        return [
+            (size, phase)
+            for size, arrows in enumerate(self._templates)
+            for phase in range(len(arrows))
+        ]
+
+    def _changed_regions(self, gray: np.ndarray) -> list[tuple[int, int, int, int]]:
+        if self._previous is None:
+            return []
+
+        moved = cv2.absdiff(gray, self._previous) > self.diff_threshold
+        if not moved.any():
+            return []
+
+        max_size = max(arrows[0][0].shape[0] for arrows in self._templates) * 3
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            cv2.dilate(moved.astype(np.uint8), np.ones((3, 3), np.uint8))
+        )
+        # Cursor-sized changes only, largest first; big ones are windows, scrolling etc.
+        stats = stats[1:count]
+        stats = stats[(stats[:, 2] <= max_size) & (stats[:, 3] <= max_size)]
+        stats = stats[np.argsort(-stats[:, 4])][: self.max_candidates]
+        return [(x, y, x + w, y + h) for x, y, w, h, _ in stats.tolist()]
+
+    def _to_position(self, match) -> custom_types.CursorPosition:
+        _, x, y, size, phase = match
+        _, _, tip_x, tip_y = self._templates[size][phase]
+        return {"x": (x + tip_x) / self._scale, "y": (y + tip_y) / self._scale}
+
+    def update(self, frame: np.ndarray) -> Optional[custom_types.CursorPosition]:
+        """
+        Finds the cursor in the next frame of the video.
+
+        Returns:
+        dict (CursorPosition): Position of the cursor's tip in pixels of the
+                               original frame, or None if it wasn't found.
+        """
+        gray = self._prepare(frame)
+        match = None
+
+        if self._position is not None:
+            x, y, size, phase = self._position
+            margin = self._templates[size][phase][0].shape[0]
+
+            around = (
+                slice(max(0, y - margin), y + 2 * margin),
+                slice(max(0, x - margin), x + 2 * margin),
+            )
+            unchanged = not (
+                cv2.absdiff(gray[around], self._previous[around]) > self.diff_threshold
+            ).any()
+
+            if unchanged:
+                match = (1.0, x, y, size, phase)
+            else:
+                # Every phase of the cursor's size, since it moved
+                match = self._match(
+                    gray,
+                    x - margin,
+                    y - margin,
+                    x + margin,
+                    y + margin,
+                    [(size, i) for i in range(len(self._templates[size]))],
+                    self.threshold,
+                )
+
+        all_templates = self._all_templates()
+        if match is None:
+            for x0, y0, x1, y1 in self._changed_regions(gray):
+                candidate = self._match(
+                    gray, x0 - 2, y0 - 2, x1 + 2, y1 + 2, all_templates, self.threshold
+                )
+                if candidate and (match is None or candidate[0] > match[0]):
+                    match = candidate
+
+        if match is None:
+            match = self._continue_sweep(gray)
+
+        self._previous = gray
+        self._position = match[1:] if match else None
+        return self._to_position(match) if match else None
+
+    def locate(self, frame: np.ndarray) -> Optional[custom_types.CursorPosition]:
+        """Finds the cursor in a single frame, by searching the whole frame."""
+        gray = self._prepare(frame)
+        match = self._match(
+            gray,
+            0,
+            0,
+            gray.shape[1],
+            gray.shape[0],
+            self._all_templates(),
+            self.threshold,
+        )
+        return self._to_position(match) if match else None
+
+
+def to_segments(
+    positions: Iterable[tuple[int, Optional[custom_types.CursorPosition]]],
+    video_fps: float,
+    still_radius: float = CURSOR_STILL_RADIUS,
+    frame_step: int = 1,
+) -> list[custom_types.CursorSegment]:
+    """
+    Groups per-frame cursor positions into segments where the cursor stays
+    within `still_radius` pixels of where the segment started.
+
+    Parameters:
+    positions (Iterable[tuple[int, CursorPosition]]): (video frame index, position
+                                                      or None) pairs, in order.
+    video_fps (float): Frame rate of the video, to convert to transcript frames.
+    still_radius (float): Distance in pixels the cursor may move within a segment.
+    frame_step (int): Video frames between consecutive positions.
+
+    Returns:
+    list (CursorSegment): The segments, with start/end in transcript frames
+                          (FPS) and the mean position of the cursor.
+    """
+    segments = []
+    current = None  # [first frame, last frame, xs, ys]
+
+    def close():
+        if current:
+            segments.append(
+                {
+                    "start": round(current[0] * FPS / video_fps),
+                    "end": round((current[1] + frame_step) * FPS / video_fps),
+                    "pos": {
+                        "x": float(np.mean(current[2])),
+                        "y": float(np.mean(current[3])),
+                    },
+                }
+            )
+
+    for frame_index, position in positions:
+        if position is not None and current is not None:
+            dx = position["x"] - current[2][0]
+            dy = position["y"] - current[3][0]
+            if dx * dx + dy * dy <= still_radius * still_radius:
+                current[1] = frame_index
+                current[2].append(position["x"])
+                current[3].append(position["y"])
+                continue
+
+        close()
+        current = None
+        if position is not None:
+            current = [frame_index, frame_index, [position["x"]], [position["y"]]]
+
+    close()
+    return segments
+
+
+def track_video(
+    video_path: str, frame_step: int = 1, **tracker_options
+) -> list[custom_types.CursorSegment]:
+    """
+    Tracks the cursor through a whole screen recording in one sequential pass.
+
+    Parameters:
+    video_path (str): Path to the screen video file.
+    frame_step (int): Only every `frame_step`-th frame is analysed; the frames in
+                      between are skipped without being decoded (see
+                      FrameSampler).
+    **tracker_options: Passed on to CursorTracker.
+
+    Returns:
+    list (CursorSegment): See `to_segments`.
+    """
+    tracker = CursorTracker(**tracker_options)
+
+    with FrameSampler(video_path) as sampler, tracing.span(
+        "cursor.track", frame_step=frame_step
+    ) as span:
+        positions = (
+            (index, tracker.update(frame))
+            for index, frame in sampler.sample_range(0, None, frame_step)
+        )
+        segments = to_segments(positions, sampler.fps or FPS, frame_step=frame_step)
+        span.set(segments=len(segments))
+
+    return segments
@@ -0,0 +1,254 @@
+import hashlib
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+
+import custom_types
+from config.constants import (
+    FPS,
+    CACHE_DIR,
+    SCENE_SAMPLE_INTERVAL,
+    SCENE_SHARD_SECONDS,
+    SCENE_MIN_SCORE,
+    SCENE_CHANGE_THRESHOLD,
+)
+from utils import tracing
+from utils.frame_sampler import FrameSampler
+
+# Bump when the signatures or scores change, so old cached indexes are ignored
+_VERSION = 1
+HISTOGRAM_BINS = 32
+
+
+def frame_signature(frame: np.ndarray) -> tuple[int, np.ndarray]:
+    """
+    Compact description of what a frame looks like: a 64-bit difference hash
+    of its layout, and a histogram of its brightness.
+
+    Returns:
+    tuple: The hash and the normalized histogram (HISTOGRAM_BINS float32s).
+    """
+    thumbnail = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    if thumbnail.ndim == 3:
+        thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+    # Whether each pixel of a 9x8 thumbnail is brighter than its right neighbour
+    small = cv2.resize(thumbnail, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    digest = int(np.packbits(bits).view(">u8")[0])
+
+    histogram = np.bincount(
+        thumbnail.flatten() // (256 // HISTOGRAM_BINS), minlength=HISTOGRAM_BINS
+    )
+    return digest, (histogram / histogram.sum()).astype(np.float32)
+
+
+def change_scores(hashes: np.ndarray, histograms: np.ndarray) -> np.ndarray:
+    """
+    How much each signature differs from the previous one, from 0 to 1: the
+    larger of the hash distance (32 differing bits being as different as two
+    unrelated images get) and the histogram distance.
+    """
+    if len(hashes) < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    xor = (hashes[1:] ^ hashes[:-1]).astype(">u8")
+    bits = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+    hash_distance = np.minimum(1, bits / 32)
+    histogram_distance = np.abs(histograms[1:] - histograms[:-1]).sum(axis=1) / 2
+    return np.maximum(hash_distance, histogram_distance).astype(np.float32)
+
+
+def _scan_shard(
+    video_path: str, start: int, end: Optional[int], step: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Signatures of every `step`-th frame in [start, end) of the video, end None
+    meaning the end of the video. Runs in a worker process.
+
+    Returns:
+    tuple: The frame indices, hashes (uint64) and histograms of the samples.
+    """
+    # The shards already keep every core busy
+    cv2.setNumThreads(1)
+
+    indices, hashes, histograms = [], [], []
+    with FrameSampler(video_path) as sampler:
+        for index, frame in sampler.sample_range(start, end, step):
+            digest, histogram = frame_signature(frame)
+            indices.append(index)
+            hashes.append(digest)
+            histograms.append(histogram)
+
+    return (
+        np.array(indices, dtype=np.int64),
+        np.array(hashes, dtype=np.uint64),
+        np.array(histograms, dtype=np.float32).reshape(-1, HISTOGRAM_BINS),
+    )
+
+
+class SceneIndex:
+    """
+    The points where the screen video visibly changes (a new slide, window or
+    page), sorted by frame, with a score of how much changed.
+
+    Frames are those of the transcript (FPS), so they can be compared to word
+    timings directly. Looking up the changes in a range is a binary search.
+    """
+
+    def __init__(self, frames: np.ndarray, scores: np.ndarray):
+        self.frames = np.asarray(frames, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def between(
+        self,
+        start: int = 0,
+        end: Optional[int] = None,
+        min_score: float = SCENE_CHANGE_THRESHOLD,
+    ) -> list[custom_types.SceneChange]:
+        """The changes in the frame range [start, end) scoring at least `min_score`."""
+        first = np.searchsorted(self.frames, start, side="left")
+        last = (
+            len(self.frames)
+            if end is None
+            else np.searchsorted(self.frames, end, side="left")
+        )
+        return [
+            {"frame": int(frame), "score": float(score)}
+            for frame, score in zip(self.frames[first:last], self.scores[first:last])
+            if score >= min_score
+        ]
+
+    def changes(
+        self, min_score: float = SCENE_CHANGE_THRESHOLD
+    ) -> list[custom_types.SceneChange]:
+        """All changes scoring at least `min_score`."""
+        return self.between(min_score=min_score)
+
+    def save(self, path: str):
+        # Write to a temporary file first so other workers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, frames=self.frames, scores=self.scores)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SceneIndex":
+        with np.load(path) as data:
+            return cls(data["frames"], data["scores"])
+
+
+def _cache_path(video_path: str, sample_interval: float) -> str:
+    # A video is identified by its path, size and modification time, so an
+    # edited or replaced file is indexed again
+    stat = os.stat(video_path)
+    key = "\n".join(
+        map(
+            str,
+            [
+                _VERSION,
+                os.path.abspath(video_path),
+                stat.st_size,
+                stat.st_mtime_ns,
+                sample_interval,
+            ],
+        )
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "scenes", f"{digest}.npz")
+
+
+def index_video(
+    video_path: str,
+    sample_interval: float = SCENE_SAMPLE_INTERVAL,
+    shard_seconds: float = SCENE_SHARD_SECONDS,
+    max_workers: Optional[int] = None,
+    min_score: float = SCENE_MIN_SCORE,
+    use_cache: bool = True,
+) -> SceneIndex:
+    """
+    Finds the scene changes of a screen video.
+
+    The video is split into shards of at most `shard_seconds`, which are decoded
+    in parallel by a process pool, each by a FrameSampler. Every
+    `sample_interval` seconds a frame is reduced to a signature (see
+    `frame_signature`). The shards are then merged in order, and consecutive
+    signatures compared, including across shard boundaries.
+
+    Parameters:
+    video_path (str): Path to the screen video file.
+    sample_interval (float): Seconds between compared frames, which is also the
+                             precision of the change points.
+    shard_seconds (float): Maximum length of video per worker task. Shorter
+                           shards balance the work better, but each one seeks.
+    max_workers (int, optional): Worker processes, all cores by default.
+    min_score (float): Changes scoring less than this are left out of the index.
+    use_cache (bool): Whether to reuse (and store) the index of this video file
+                      from CACHE_DIR.
+
+    Returns:
+    SceneIndex: The change points of the video.
+    """
+    with tracing.span("scenes") as span:
+        cache_path = _cache_path(video_path, sample_interval)
+        if use_cache and os.path.exists(cache_path):
+            span.set(cache="hit")
+            return SceneIndex.load(cache_path)
+        span.set(cache="miss")
+
+        with FrameSampler(video_path) as sampler:
+            video_fps = sampler.fps or FPS
+            frame_count = sampler.frame_count
+
+        max_workers = max_workers or os.cpu_count() or 1
+        step = max(1, round(sample_interval * video_fps))
+
+        # Shards start on a multiple of `step`, so the samples are evenly spaced
+        # across boundaries. The last one reads to the end, since the frame count
+        # is only an estimate for some containers.
+        shard_frames = min(shard_seconds * video_fps, frame_count / max_workers)
+        shard_frames = max(1, math.ceil(shard_frames / step)) * step
+        starts = list(range(0, max(1, frame_count), shard_frames))
+        shards = [
+            (start, next_start) for start, next_start in zip(starts, starts[1:])
+        ] + [(starts[-1], None)]
+        span.set(shards=len(shards), frames=frame_count)
+
+        if len(shards) == 1 or max_workers == 1:
+            results = [
+                _scan_shard(video_path, start, end, step) for start, end in shards
+            ]
+        else:
+            # Spawned rather than forked, since the caller may be running threads
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(shards)),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = [
+                    executor.submit(_scan_shard, video_path, start, end, step)
+                    for start, end in shards
+                ]
+                results = [future.result() for future in futures]
+
+        indices = np.concatenate([result[0] for result in results])
+        hashes = np.concatenate([result[1] for result in results])
+        histograms = np.concatenate([result[2] for result in results])
+
+        scores = change_scores(hashes, histograms)
+        keep = scores >= min_score
+        frames = np.round(indices[1:][keep] * FPS / video_fps).astype(np.int64)
+        index = SceneIndex(frames, scores[keep])
+        span.set(samples=len(indices), changes=len(index))
+
+        if use_cache:
+            index.save(cache_path)
+        return index
@@ -1,11 +1,53 @@
-try:
-    __all__ = ["trim", "search", "layout", "translate"]
-
-    from .trim import main as trim
-    from .search import main as search
-    from .layout import main as layout
-    from .translate import main as translate
-except ImportError as e:
-    # Log warning but don't fail if some modules are missing
-    import logging
-    logging.warning(f"Some modules could not be imported: {e}")
\ No newline at end of file
+"""
+The backend functions, by name. Each one is the `main` of the subpackage of
+the same name.
+
+Functions are only imported on first use, with their dependencies (OpenAI,
+numpy, deep-translator, ...), so e.g. a worker which only trims never imports
+the LLM client:
+
+    import functions
+    trim = functions.get("trim")  # or functions.trim
+"""
+
+import importlib
+import sys
+import types
+from typing import Callable
+
+__all__ = ["trim", "search", "layout", "translate", "get"]
+
+FUNCTIONS = ("trim", "search", "layout", "translate")
+
+
+class _FunctionsModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a subpackage (e.g. `from functions.trim.main import ...`)
+        # binds its name here to the subpackage. Bind its function instead,
+        # which is what the name meant when everything was imported eagerly.
+        if name in FUNCTIONS and isinstance(value, types.ModuleType):
+            value = value.main
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _FunctionsModule
+
+
+def get(name: str) -> Callable:
+    """Returns the `main` of the function called `name`, importing it if needed."""
+    if name not in FUNCTIONS:
+        raise KeyError(f"Unknown function: {name}")
+    function = importlib.import_module(f".{name}.main", __name__).main
+    globals()[name] = function
+    return function
+
+
+def __getattr__(name: str) -> Callable:
+    # Only called for names which aren't attributes yet, see PEP 562
+    if name in FUNCTIONS:
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *FUNCTIONS])
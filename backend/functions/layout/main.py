@@ -1,18 +1,118 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import numpy as np
 import custom_types
+from config.constants import (
+    SEARCH_CONCURRENCY,
+    SEARCH_TIMEOUT,
+    SEARCH_RETRIES,
+    SCENE_CHANGE_THRESHOLD,
+)
+from utils import tracing
 from utils.general import chunk_transcript, linearize_transcript
+from utils.spans import SpanIndex
 from ..search import main as search_main
 
-def main(transcript: custom_types.Transcript) -> list[custom_types.Range]:
-    layout_changes = []
 
-    intro_query = "Find where the speaker introduces themselves or the product in the video."
-    try:
-        intro_result = search_main(transcript, intro_query)
-        layout_changes.append(intro_result)
-    except RuntimeError:
-        pass  # coz sometimes there will be no intro, so.
+def search_with_retries(
+    transcript: custom_types.Transcript, query: str, timeout: float, retries: int
+) -> custom_types.Range:
+    """
+    Runs a transcript search, retrying with exponential backoff if it fails.
 
-    full_text = linearize_transcript(transcript)
+    The search samples the LLM with temperature 1, so a retry can succeed even
+    when the previous answer couldn't be found in the transcript. Retries skip
+    the LLM cache so they don't get the same answer again.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return search_main(
+                transcript, query, timeout=timeout, use_cache=attempt == 0
+            )
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2**attempt)
+
+
+def scene_change_ranges(
+    transcript: custom_types.Transcript,
+    changes: list[custom_types.SceneChange],
+    covered: list[custom_types.Range],
+    spans: Optional[SpanIndex] = None,
+) -> list[custom_types.Range]:
+    """
+    Layout changes for visual changes of the screen: from the change until
+    the end of the sentence being spoken, so the new screen content is shown
+    while it is talked about. Changes within an already `covered` range, or
+    before the first or after the last word, are left out.
+    """
+    if not transcript:
+        return []
+    spans = spans or SpanIndex(transcript)
+    word_starts = np.array([word["start"] for word in transcript])
+
+    ranges = []
+    for change in changes:
+        frame = change["frame"]
+        if frame >= transcript[-1]["end"] or any(
+            r["start"] <= frame < r["end"] for r in covered + ranges
+        ):
+            continue
+
+        # The word being spoken at the change, or the next one in a pause
+        word = max(0, int(np.searchsorted(word_starts, frame, side="right")) - 1)
+        if transcript[word]["end"] <= frame:
+            word += 1
+        if word >= len(transcript) or frame < word_starts[0]:
+            continue
+
+        sentence_end = int(spans.sentence_ends[spans.sentence_of(word)])
+        ranges.append({"start": frame, "end": transcript[sentence_end - 1]["end"]})
+    return ranges
+
+
+@tracing.traced("layout")
+def main(
+    transcript: custom_types.Transcript,
+    max_concurrency: int = SEARCH_CONCURRENCY,
+    timeout: float = SEARCH_TIMEOUT,
+    retries: int = SEARCH_RETRIES,
+    screen_video_path: Optional[str] = None,
+    scene_threshold: float = SCENE_CHANGE_THRESHOLD,
+    text: Optional[str] = None,
+) -> list[custom_types.Range]:
+    """
+    Finds the parts of the video where the layout should change.
+
+    All searches (the intro and one per transcript chunk) run concurrently, so
+    the wall time is roughly that of the slowest search. If the screen video is
+    given, it is indexed for scene changes meanwhile (see
+    detectors.scene_changes), and each one adds a layout change too.
+
+    Parameters:
+    transcript (Transcript): Transcript of the camera video file.
+    max_concurrency (int): Maximum number of searches in flight at once.
+    timeout (float): Timeout in seconds for each LLM request.
+    retries (int): Number of retries for each failed search.
+    screen_video_path (str, optional): Path to the screen video file.
+    scene_threshold (float): Minimum score of a scene change to act on.
+    text (str, optional): The linearized transcript, if it was already computed.
+
+    Returns:
+    list (Range): The frame ranges of the layout changes, in transcript order of
+                  the queries, followed by those of the scene changes in order.
+                  Searches which failed are left out, and so are the scene
+                  changes if the screen video can't be indexed.
+    """
+    intro_query = (
+        "Find where the speaker introduces themselves or the product in the video."
+    )
+    searches = [(transcript, intro_query)]
+
+    full_text = text if text is not None else linearize_transcript(transcript)
     word_count = len(full_text.split())
 
     if word_count >= 170:
@@ -28,11 +128,55 @@ def main(transcript: custom_types.Transcript) -> list[custom_types.Range]:
                 "you must still select at least one sentence from the transcript. The sentence "
                 "must be an exact match from the transcript."
             )
+            searches.append((chunk_section, query))
+
+    tracing.current().set(words=len(transcript), searches=len(searches))
+
+    # One more worker for the scene indexing, so it doesn't take a search's slot
+    workers = max_concurrency + 1 if screen_video_path else max_concurrency
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scenes = None
+        if screen_video_path:
+            from detectors.scene_changes import index_video
+
+            scenes = executor.submit(
+                contextvars.copy_context().run, index_video, screen_video_path
+            )
+
+        # Each search runs in a copy of the current context, so its spans are
+        # nested under this one
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                search_with_retries,
+                section,
+                query,
+                timeout,
+                retries,
+            )
+            for section, query in searches
+        ]
+
+        layout_changes = []
+        for future in futures:
+            try:
+                layout_changes.append(future.result())
+            except Exception:
+                # coz sometimes there will be no intro, and a failed chunk shouldn't affect the others
+                continue
+
+        if scenes is not None:
             try:
-                important_part = search_main(chunk_section, query)
-                print(important_part)
-                layout_changes.append(important_part)
-            except RuntimeError:
-                continue  # If the search fails for this chunk, continue with the next one.
+                changes = scenes.result().changes(scene_threshold)
+            except Exception as e:
+                # e.g. a missing or unreadable screen video, which shouldn't cost
+                # the ranges the searches found
+                tracing.current().fail(e)
+            else:
+                layout_changes += scene_change_ranges(
+                    transcript, changes, layout_changes
+                )
+                tracing.current().set(scene_changes=len(changes))
 
-    return layout_changes
\ No newline at end of file
+    tracing.current().set(found=len(layout_changes))
+    return layout_changes
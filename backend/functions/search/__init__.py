@@ -1,3 +1,3 @@
-__all__ = ["main"]
+__all__ = ["main", "search_many"]
 
-from .main import main
+from .main import main, search_many
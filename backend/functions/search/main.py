@@ -1,27 +1,67 @@
-import os
-from dotenv import load_dotenv
-import openai
+import json
+import re
 import custom_types
 import utils
+import llm
+from utils import tracing
+from utils.aligner import SectionAligner
+from config.constants import (
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_MAX_WINDOW_WORDS,
+    SEARCH_QUOTE_TOKENS,
+)
+from .retrieval import get_retriever
 
-load_dotenv(override=True)
-oai = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-
-def main(transcript: custom_types.Transcript, query: str) -> custom_types.Range:
+@tracing.traced("search")
+def main(
+    transcript: custom_types.Transcript,
+    query: str,
+    timeout: float = None,
+    use_cache: bool = True,
+    top_k: int = RETRIEVAL_TOP_K,
+    local: bool = False,
+) -> custom_types.Range:
     """
     Transcript search. Finds the section of a transcript corresponding to a given query.
 
     Parameters:
     transcript (Transcript): Transcript of the camera video file.
     query (str): The search query.
+    timeout (float, optional): Timeout in seconds for the LLM request.
+    use_cache (bool): Whether a cached LLM response may be used.
+    top_k (int, optional): For long transcripts, only the `top_k` transcript windows
+                           most similar to the query are sent to the LLM, so the
+                           prompt size doesn't grow with the transcript. None
+                           always sends the whole transcript.
+    local (bool): Skip the LLM and return the window most similar to the query.
 
     Returns:
     dict (Range): A frame range corresponding to the part of the transcript which fulfils the query.
     """
+    span = tracing.current()
+    span.set(words=len(transcript), local=local)
+
+    if local:
+        windows = get_retriever(transcript).rank(query, 1)
+        if not windows:
+            raise RuntimeError("Failed to find section range.")
+        return {
+            "start": transcript[windows[0]["start"]]["start"],
+            "end": transcript[windows[0]["end"] - 1]["end"],
+        }
 
-    # Convert transcript to string
-    transcript_text = utils.linearize_transcript(transcript)
+    aligner = None
+    if top_k and len(transcript) > top_k * RETRIEVAL_MAX_WINDOW_WORDS:
+        # Only send the most relevant windows, in transcript order
+        retriever = get_retriever(transcript)
+        aligner = retriever.aligner
+        windows = sorted(retriever.rank(query, top_k), key=lambda w: w["start"])
+        transcript_text = "\n...\n".join(window["text"] for window in windows)
+        span.set(windows=len(windows))
+    else:
+        # Convert transcript to string
+        transcript_text = utils.linearize_transcript(transcript)
 
     # Create prompt
     prompt = f"""TRANSCRIPT:
@@ -33,25 +73,19 @@ The substring must be an exact substring of the original transcript. You must no
 """
 
     # Execute prompt
-    response = oai.chat.completions.create(
+    response = llm.complete(
+        [{"role": "user", "content": prompt}],
         model="gpt-4o-mini",
+        use_cache=use_cache,
+        timeout=timeout,
         temperature=1,
         top_p=1,
-        max_tokens=50,
-        messages=[{"role": "user", "content": prompt}],
+        max_tokens=SEARCH_QUOTE_TOKENS,
     )
-    response = response.choices[0].message.content
-
-    # Log raw response
-    print("----- LLM RESPONSE -----")
-    print(response)
-    print("\n")
 
     # Extract section of transcript corresponding to response
-    word_range = utils.find_section_range(transcript, response)
-    print("----- WORD RANGE CORRESPONDING TO LLM RESPONSE -----")
-    print(word_range)
-    print("\n")
+    word_range = utils.find_section_range(transcript, response, aligner)
+    span.set(found=word_range is not None)
 
     # If failed to find section, then raise error
     if not word_range:
@@ -59,18 +93,169 @@ The substring must be an exact substring of the original transcript. You must no
 
     # Destructure word range
     start_temp, end_temp = word_range
-    start_word_index, end_word_index = start_temp, end_temp-1
+    start_word_index, end_word_index = start_temp, end_temp - 1
 
     # Extract start and end frame
     start_frame = transcript[start_word_index]["start"]
     end_frame = transcript[end_word_index]["end"]
+    span.set(selected_words=end_temp - start_temp)
 
-    # Log section of transcript that was selected by LLM
-    print("----- TRANSCRIPT SECTION CORRESPONDING TO LLM RESPONSE -----")
-    print(utils.linearize_transcript(transcript[start_word_index:end_word_index]))
+    return {"start": start_frame, "end": end_frame}
 
-    print("Start frame:", start_frame)
-    print("End frame:", end_frame)
-    print("\n")
 
-    return {"start": start_frame, "end": end_frame}
+# Structured output of search_many: one exact quote per query
+ANSWERS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "search_answers",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "answers": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "query": {"type": "integer"},
+                            "text": {"type": "string"},
+                        },
+                        "required": ["query", "text"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["answers"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Tokens of one answer of search_many besides its quote, e.g. {"query": 12, "text": ""},
+ANSWER_JSON_TOKENS = 15
+
+# An answer object, in the key order of ANSWERS_FORMAT
+_ANSWER = re.compile(
+    r'\{\s*"query"\s*:\s*(\d+)\s*,\s*"text"\s*:\s*("(?:[^"\\]|\\.)*")\s*\}'
+)
+
+
+def parse_answers(response: str, count: int) -> dict[int, str]:
+    """
+    The answer text of each query index (0-based) from the JSON response. If
+    the response was cut off, the answers which are complete are used.
+    """
+    try:
+        answers = json.loads(response)["answers"]
+    except (TypeError, ValueError, KeyError):
+        answers = [
+            {"query": int(number), "text": json.loads(text)}
+            for number, text in _ANSWER.findall(response or "")
+        ]
+
+    texts = {}
+    for answer in answers if isinstance(answers, list) else []:
+        if not isinstance(answer, dict):
+            continue
+        number, text = answer.get("query"), answer.get("text")
+        if isinstance(number, int) and 1 <= number <= count and isinstance(text, str):
+            texts.setdefault(number - 1, text)
+    return texts
+
+
+@tracing.traced("search_many")
+def search_many(
+    transcript: custom_types.Transcript,
+    queries: list[str],
+    timeout: float = None,
+    use_cache: bool = True,
+    top_k: int = RETRIEVAL_TOP_K,
+) -> list[custom_types.SearchResult]:
+    """
+    Transcript search for many queries at once.
+
+    The transcript is sent once, with all the queries, and the LLM answers with
+    a JSON list of quotes (see ANSWERS_FORMAT). Every quote is then located with
+    the same SectionAligner, so the transcript is only tokenized and indexed
+    once. For long transcripts, the windows most similar to each query are sent
+    instead, taking turns between the queries until there are 2 * `top_k`.
+
+    Parameters:
+    transcript (Transcript): Transcript of the camera video file.
+    queries (list[str]): The search queries.
+    timeout (float, optional): Timeout in seconds for the LLM request.
+    use_cache (bool): Whether a cached LLM response may be used.
+    top_k (int, optional): See `main`. None always sends the whole transcript.
+
+    Returns:
+    list (SearchResult): For each query, in order, the frame range of the part
+                         of the transcript which fulfils it, or the error.
+    """
+    span = tracing.current()
+    span.set(words=len(transcript), queries=len(queries))
+    if not queries:
+        return []
+
+    if top_k and len(transcript) > top_k * RETRIEVAL_MAX_WINDOW_WORDS:
+        retriever = get_retriever(transcript)
+        aligner = retriever.aligner
+
+        rankings = [retriever.rank(query, top_k) for query in queries]
+        windows = {}
+        for rank in range(top_k):
+            for ranking in rankings:
+                if rank < len(ranking) and len(windows) < 2 * top_k:
+                    window = ranking[rank]
+                    windows.setdefault((window["start"], window["end"]), window)
+
+        windows = sorted(windows.values(), key=lambda w: w["start"])
+        transcript_text = "\n...\n".join(window["text"] for window in windows)
+        span.set(windows=len(windows))
+    else:
+        aligner = SectionAligner(transcript)
+        transcript_text = utils.linearize_transcript(transcript)
+
+    numbered = "\n".join(f"{i + 1}. {query}" for i, query in enumerate(queries))
+    prompt = f"""TRANSCRIPT:
+{transcript_text}
+
+QUERIES:
+{numbered}
+
+INSTRUCTIONS:
+For each query, return a substring from the transcript above which fulfils it, with the number of the query.
+Each substring must be an exact substring of the original transcript. You must not add or change any words.
+Each substring must be at most 30 words long.
+"""
+
+    response = llm.complete(
+        [{"role": "user", "content": prompt}],
+        model="gpt-4o-mini",
+        use_cache=use_cache,
+        timeout=timeout,
+        temperature=1,
+        top_p=1,
+        # Room for every quote at its longest, so the JSON isn't cut off
+        max_tokens=len(queries) * (SEARCH_QUOTE_TOKENS + ANSWER_JSON_TOKENS) + 20,
+        response_format=ANSWERS_FORMAT,
+    )
+    answers = parse_answers(response, len(queries))
+
+    results = []
+    for i in range(len(queries)):
+        if i not in answers:
+            results.append({"error": "No answer for the query."})
+            continue
+
+        word_range = utils.find_section_range(transcript, answers[i], aligner)
+        if not word_range:
+            results.append({"error": "Failed to find section range."})
+            continue
+
+        start, end = word_range
+        results.append(
+            {"start": transcript[start]["start"], "end": transcript[end - 1]["end"]}
+        )
+
+    span.set(found=sum("error" not in result for result in results))
+    return results
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import custom_types
+from config.constants import RETRIEVAL_WINDOW_SENTENCES, RETRIEVAL_MAX_WINDOW_WORDS
+from utils.aligner import SectionAligner
+from utils.embeddings import encode
+from utils.general import linearize_transcript, sentence_ranges
+
+
+class TranscriptRetriever:
+    """
+    Ranks windows of consecutive sentences by semantic similarity to a query.
+
+    Windows are embedded once, with the same MiniLM model as the cursor
+    detection, so each query costs one query embedding and one matrix-vector
+    product.
+    """
+
+    def __init__(
+        self,
+        transcript: custom_types.Transcript,
+        window_sentences: int = RETRIEVAL_WINDOW_SENTENCES,
+        max_window_words: int = RETRIEVAL_MAX_WINDOW_WORDS,
+    ):
+        """
+        Parameters:
+        transcript (Transcript): The transcript to search.
+        window_sentences (int): Number of sentences per window. Windows overlap by
+                                half of that, so an answer spanning a window
+                                boundary is still contained in some window.
+        max_window_words (int): Windows are cut off at this many words, so that a
+                                transcript without punctuation still gets windows.
+        """
+        self.transcript = transcript
+        self.windows = []
+
+        sentences = sentence_ranges(transcript)
+        stride = max(1, (window_sentences + 1) // 2)
+        i = 0
+        while i < len(sentences):
+            last = min(i + window_sentences, len(sentences))
+            start, end = sentences[i]["start"], sentences[last - 1]["end"]
+            for chunk_start in range(start, end, max_window_words):
+                self.windows.append(
+                    {
+                        "start": chunk_start,
+                        "end": min(end, chunk_start + max_window_words),
+                    }
+                )
+            if last == len(sentences):
+                break
+            i += stride
+
+        self.texts = [
+            linearize_transcript(transcript[w["start"] : w["end"]])
+            for w in self.windows
+        ]
+        # Bypass the shared clause cache, these texts are only looked up here
+        self.embeddings = encode(self.texts, cache=None)
+
+        self._aligner = None
+        self._lock = threading.Lock()
+
+    @property
+    def aligner(self) -> SectionAligner:
+        with self._lock:
+            if self._aligner is None:
+                self._aligner = SectionAligner(self.transcript)
+            return self._aligner
+
+    def rank(self, query: str, k: int) -> list[custom_types.RetrievedWindow]:
+        """
+        Returns the `k` windows most similar to the query, best first.
+
+        Returns:
+        list (RetrievedWindow): Word range (end exclusive), text and similarity of
+                                each window.
+        """
+        if not self.windows:
+            return []
+
+        similarities = self.embeddings @ encode([query], cache=None)[0]
+        k = min(k, len(self.windows))
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best])]
+
+        return [
+            {
+                "start": self.windows[i]["start"],
+                "end": self.windows[i]["end"],
+                "text": self.texts[i],
+                "similarity": float(similarities[i]),
+            }
+            for i in best
+        ]
+
+
+_retrievers = OrderedDict()
+_retrievers_lock = threading.Lock()
+MAX_CACHED_RETRIEVERS = 16
+
+
+def get_retriever(transcript: custom_types.Transcript) -> TranscriptRetriever:
+    """
+    Returns the retriever for a transcript, building it on first use.
+
+    Retrievers are cached per transcript content, so every query against the
+    same transcript reuses its window embeddings.
+    """
+    key = hashlib.sha256(
+        "\n".join(f"{w['start']} {w['end']} {w['text']}" for w in transcript).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+    with _retrievers_lock:
+        if key in _retrievers:
+            _retrievers.move_to_end(key)
+            return _retrievers[key]
+
+    retriever = TranscriptRetriever(transcript)
+
+    with _retrievers_lock:
+        _retrievers[key] = retriever
+        while len(_retrievers) > MAX_CACHED_RETRIEVERS:
+            _retrievers.popitem(last=False)
+
+    return retriever
@@ -0,0 +1,100 @@
+import abc
+import threading
+import llm
+from utils import tracing
+
+
+class TranslationBackend(abc.ABC):
+    """
+    A translation service. Subclasses implement `translate` for a single piece of
+    text, which may contain several lines that must be kept as separate lines.
+    """
+
+    # Maximum length of the text passed to a single `translate` call
+    max_chars = 4500
+
+    @abc.abstractmethod
+    def translate(self, text: str, from_lang: str, to_lang: str) -> str:
+        """Translates the text, keeping its line breaks."""
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate through deep-translator, which rejects texts over 5000 chars."""
+
+    max_chars = 4500
+
+    def __init__(self):
+        # deep-translator binds the languages to the translator, so keep one per pair
+        self._translators = {}
+        self._lock = threading.Lock()
+
+    def _translator(self, from_lang: str, to_lang: str) -> "GoogleTranslator":
+        # Imported on first use, so importing the module stays cheap
+        from deep_translator import GoogleTranslator
+
+        with self._lock:
+            key = (from_lang, to_lang)
+            if key not in self._translators:
+                self._translators[key] = GoogleTranslator(
+                    source=from_lang, target=to_lang
+                )
+            return self._translators[key]
+
+    def translate(self, text: str, from_lang: str, to_lang: str) -> str:
+        return self._translator(from_lang, to_lang).translate(text)
+
+
+class OpenAIBackend(TranslationBackend):
+    """Chat completion based translation, through the shared cached LLM client."""
+
+    max_chars = 8000
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.model = model
+
+    def translate(self, text: str, from_lang: str, to_lang: str) -> str:
+        return llm.complete(
+            [
+                {
+                    "role": "system",
+                    "content": f"Translate the following from {from_lang} to {to_lang}. "
+                    "Translate each line separately and keep the line breaks exactly as they are:",
+                },
+                {"role": "user", "content": text},
+            ],
+            model=self.model,
+        )
+
+
+class FallbackBackend(TranslationBackend):
+    """Tries each backend in order until one succeeds."""
+
+    def __init__(self, backends: list[TranslationBackend]):
+        self.backends = backends
+        self.max_chars = min(backend.max_chars for backend in backends)
+
+    def translate(self, text: str, from_lang: str, to_lang: str) -> str:
+        errors = []
+        for backend in self.backends:
+            with tracing.span(
+                "translate", backend=type(backend).__name__, chars=len(text)
+            ) as span:
+                try:
+                    return backend.translate(text, from_lang, to_lang)
+                except Exception as e:
+                    span.fail(e)
+                    errors.append(e)
+        raise Exception(f"All translation methods failed: {errors}")
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_backend() -> TranslationBackend:
+    """Returns the process-wide Google backend with OpenAI as fallback."""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = FallbackBackend([GoogleBackend(), OpenAIBackend()])
+        return _default_backend
@@ -1,56 +1,87 @@
 import json
-import nltk
-from deep_translator import GoogleTranslator
-from openai import OpenAI
-import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
+from config.constants import TRANSLATE_CONCURRENCY
+from utils.spans import SpanIndex
+from .backends import TranslationBackend, get_default_backend
 
-# Download necessary NLTK data
-nltk.download('punkt')
-
-def split_into_sentences(transcript: List[Dict]) -> List[List[Dict]]:
+def split_into_sentences(
+    transcript: List[Dict], spans: SpanIndex = None
+) -> List[List[Dict]]:
     """Split transcript into sentence groups while preserving timing info"""
-    current_sentence = []
-    sentences = []
-    current_text = ""
-    
-    for word in transcript:
-        current_sentence.append(word)
-        current_text += word['text'] + " "
-        
-        if word['text'].endswith(('.', '!', '?')):
-            sentences.append(current_sentence)
-            current_sentence = []
-            current_text = ""
-    
-    if current_sentence:  # Add any remaining words
-        sentences.append(current_sentence)
-    
-    return sentences
+    spans = spans or SpanIndex(transcript)
+    return [
+        transcript[sentence["start"] : sentence["end"]] for sentence in spans.sentences
+    ]
 
-def translate_text(text: str, from_lang: str, to_lang: str) -> str:
+def translate_text(
+    text: str, from_lang: str, to_lang: str, backend: TranslationBackend = None
+) -> str:
     """Attempt translation with fallback mechanisms"""
-    # First try deep-translator
-    try:
-        print("Using google translator")
-        return GoogleTranslator(source=from_lang, target=to_lang).translate(text)
-    except Exception as e:
-        print(f"Deep-translator failed: {e}")
-        
-    # Fallback to OpenAI
-    try:
-        print("Using OpenAI")
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": f"Translate the following from {from_lang} to {to_lang}:"},
-                {"role": "user", "content": text}
-            ]
+    backend = backend or get_default_backend()
+    return backend.translate(text, from_lang, to_lang)
+
+def make_batches(texts: List[str], max_chars: int) -> List[List[int]]:
+    """Group consecutive texts into batches whose newline-joined length fits in max_chars"""
+    batches = []
+    current = []
+    current_length = 0
+
+    for i, text in enumerate(texts):
+        length = len(text) + 1  # +1 for the delimiter
+        if current and current_length + length > max_chars:
+            batches.append(current)
+            current = []
+            current_length = 0
+        current.append(i)
+        current_length += length
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+def translate_batch(
+    texts: List[str], from_lang: str, to_lang: str, backend: TranslationBackend
+) -> List[str]:
+    """
+    Translate several sentences with one request, one sentence per line.
+
+    Line breaks survive translation, so the result is split back on them. If the
+    backend merged or split lines anyway, the sentences are translated one by one.
+    """
+    if len(texts) == 1:
+        return [translate_text(texts[0], from_lang, to_lang, backend)]
+
+    translated = translate_text("\n".join(texts), from_lang, to_lang, backend)
+    lines = [line.strip() for line in translated.strip().split("\n") if line.strip()]
+    if len(lines) == len(texts):
+        return lines
+
+    return [translate_text(text, from_lang, to_lang, backend) for text in texts]
+
+def translate_sentences(
+    texts: List[str],
+    from_lang: str,
+    to_lang: str,
+    backend: TranslationBackend = None,
+    max_concurrency: int = TRANSLATE_CONCURRENCY,
+) -> List[str]:
+    """Translate sentences in size-limited batches, running batches concurrently"""
+    backend = backend or get_default_backend()
+
+    # The delimiter must not appear inside a sentence
+    texts = [" ".join(text.split()) for text in texts]
+    batches = make_batches(texts, backend.max_chars)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = executor.map(
+            lambda batch: translate_batch(
+                [texts[i] for i in batch], from_lang, to_lang, backend
+            ),
+            batches,
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        raise Exception(f"All translation methods failed: {e}")
+        return [text for batch in results for text in batch]
 
 def map_timings(original_words: List[Dict], translated_text: str) -> List[Dict]:
     """Map timings from original words to translated words"""
@@ -83,24 +114,42 @@ def map_timings(original_words: List[Dict], translated_text: str) -> List[Dict]:
     
     return result
 
-def main(transcript_path: str, from_lang: str, to_lang: str) -> List[Dict]:
-    with open(transcript_path, 'r') as f:
-        transcript = json.load(f)
-    
+def translate_transcript(
+    transcript: List[Dict],
+    from_lang: str,
+    to_lang: str,
+    backend: TranslationBackend = None,
+    max_concurrency: int = TRANSLATE_CONCURRENCY,
+    spans: SpanIndex = None,
+) -> List[Dict]:
+    spans = spans or SpanIndex(transcript)
+
     # Split into sentences
-    sentences = split_into_sentences(transcript)
+    sentences = split_into_sentences(transcript, spans)
+
+    # Translate all sentences in batches
+    sentence_texts = [
+        " ".join(spans.texts[sentence["start"] : sentence["end"]])
+        for sentence in spans.sentences
+    ]
+    translated_texts = translate_sentences(
+        sentence_texts, from_lang, to_lang, backend, max_concurrency
+    )
+
+    # Map timings
     final_result = []
-    
-    # Process each sentence
-    for sentence in sentences:
-        # Combine sentence words
-        sentence_text = " ".join(word['text'] for word in sentence)
-        
-        # Translate
-        translated_text = translate_text(sentence_text, from_lang, to_lang)
-        
-        # Map timings
-        translated_sentence = map_timings(sentence, translated_text)
-        final_result.extend(translated_sentence)
-    
+    for sentence, translated_text in zip(sentences, translated_texts):
+        final_result.extend(map_timings(sentence, translated_text))
+
     return final_result
+
+def main(
+    transcript_path: str,
+    from_lang: str,
+    to_lang: str,
+    backend: TranslationBackend = None,
+) -> List[Dict]:
+    with open(transcript_path, 'r') as f:
+        transcript = json.load(f)
+
+    return translate_transcript(transcript, from_lang, to_lang, backend)
@@ -1,36 +1,77 @@
 import os
+import numpy as np
 import custom_types
+from config.constants import FPS, SILENCE_MIN_DURATION, SILENCE_PADDING
+from utils import tracing
+from utils.transcript_array import TranscriptArray
+from .silence import (
+    read_audio_blocks,
+    frame_levels,
+    silent_frames,
+    runs,
+    snap_to_word_gaps,
+    find_keep_range,
+)
 
 
 def main(
     transcript: custom_types.Transcript,
     camera_video_path: str,
-) -> custom_types.Range:
+    detect_silences: bool = True,
+) -> custom_types.TrimResult:
     """
-    Trim unnecessary silence at the start/end of a video.
+    Trim unnecessary silence at the start/end of a video, and find the pauses
+    in between which can be cut.
 
     Parameters:
-    transcript (Transcript): Transcript of the camera video file.
+    transcript (Transcript): Transcript of the camera video file. A TranscriptArray
+                             works as well.
     camera_video_path (str): Path to the camera video file.
+    detect_silences (bool): Whether to analyse the audio track of the video.
 
     Returns:
-    dict (Range): A range representing the part of the video to keep.
+    dict (TrimResult): A range representing the part of the video to keep, and
+                       the silences within it, snapped to the gaps between words.
 
     Notes:
-    - No notes.
+    - The audio is decoded in fixed-size blocks (see silence.read_audio_blocks),
+      so memory use doesn't grow with the length of the video.
+    - If the audio can't be read, the range is that of the words and no silences
+      are returned, since a pause in the transcript may not be silent.
     """
 
-    # Log for debugging purposes
-    print("trim()", transcript[0:5], camera_video_path)
+    with tracing.span("trim", words=len(transcript)) as span:
+        if isinstance(transcript, TranscriptArray):
+            texts, starts, ends = transcript.texts, transcript.starts, transcript.ends
+        else:
+            texts = [t["text"] for t in transcript]
+            starts = np.fromiter((t["start"] for t in transcript), int, len(transcript))
+            ends = np.fromiter((t["end"] for t in transcript), int, len(transcript))
 
-    for t in transcript:
-        if t["text"]:
-            start = t["start"]
-            break
+        spoken = np.fromiter((bool(text) for text in texts), bool, len(texts))
+        starts, ends = starts[spoken], ends[spoken]
+        if not len(starts):
+            raise ValueError("The transcript has no words.")
 
-    for t in reversed(transcript):
-        if t["text"]:
-            end = t["end"]
-            break
+        silent = None
+        if detect_silences and camera_video_path and os.path.exists(camera_video_path):
+            try:
+                silent = silent_frames(
+                    frame_levels(read_audio_blocks(camera_video_path))
+                )
+            except Exception as e:
+                span.fail(e)
 
-    return {"start": start, "end": end}
+        padding = round(SILENCE_PADDING * FPS)
+        min_length = round(SILENCE_MIN_DURATION * FPS)
+
+        keep = find_keep_range(silent, starts, ends, padding)
+        silences = []
+        if silent is not None:
+            silences = snap_to_word_gaps(
+                runs(silent, min_length), starts, ends, min_length, padding
+            )
+
+        span.set(audio=silent is not None, silences=len(silences))
+
+    return {"start": keep["start"], "end": keep["end"], "silences": silences}
@@ -0,0 +1,196 @@
+import shutil
+import subprocess
+import wave
+from typing import Iterator, Optional
+import numpy as np
+import custom_types
+from config.constants import (
+    FPS,
+    SILENCE_SAMPLE_RATE,
+    SILENCE_BLOCK_SECONDS,
+    SILENCE_MARGIN_DB,
+)
+
+
+def read_audio_blocks(
+    path: str,
+    sample_rate: int = SILENCE_SAMPLE_RATE,
+    block_seconds: float = SILENCE_BLOCK_SECONDS,
+) -> Iterator[np.ndarray]:
+    """
+    Decodes the audio track of a media file into mono float32 blocks of
+    `block_seconds`, so memory use doesn't depend on the length of the file.
+
+    ffmpeg is used when it is installed (any container or codec, resampled to
+    `sample_rate`). Without it only 16-bit PCM WAV files can be read, at their
+    own sample rate, which must then be `sample_rate`.
+    """
+    block_samples = int(sample_rate * block_seconds)
+
+    if shutil.which("ffmpeg"):
+        process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-i",
+                path,
+                "-vn",
+                "-ac",
+                "1",
+                "-ar",
+                str(sample_rate),
+                "-f",
+                "s16le",
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        finished = False
+        try:
+            while True:
+                data = process.stdout.read(block_samples * 2)
+                if not data:
+                    break
+                yield np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+            finished = True
+        finally:
+            process.stdout.close()
+            if not finished:
+                # The caller stopped reading early
+                process.kill()
+            process.wait()
+            stderr = process.stderr.read().decode(errors="replace").strip()
+            process.stderr.close()
+
+        # A decode which failed midway must not pass for short audio
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"Failed to decode audio (exit code {process.returncode}): {stderr}"
+            )
+        return
+
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2 or f.getframerate() != sample_rate:
+            raise RuntimeError(
+                f"ffmpeg is not installed, and {path} is not a 16-bit {sample_rate} Hz WAV file"
+            )
+        channels = f.getnchannels()
+        while True:
+            data = f.readframes(block_samples)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+            yield samples.reshape(-1, channels).mean(axis=1)
+
+
+def frame_levels(
+    blocks: Iterator[np.ndarray], sample_rate: int = SILENCE_SAMPLE_RATE
+) -> np.ndarray:
+    """
+    RMS level in dBFS of every video frame (1 / FPS seconds) of audio.
+
+    Samples left over at the end of a block are carried into the next one, so
+    the frames line up with the video no matter the block size.
+    """
+    if sample_rate % FPS:
+        raise ValueError(f"The sample rate must be a multiple of {FPS}")
+    hop = sample_rate // FPS
+
+    levels = []
+    carry = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        samples = np.concatenate((carry, block)) if len(carry) else block
+        usable = len(samples) - len(samples) % hop
+        frames = samples[:usable].reshape(-1, hop)
+        levels.append(np.sqrt(np.einsum("ij,ij->i", frames, frames) / hop))
+        carry = samples[usable:]
+
+    if len(carry):
+        levels.append(np.sqrt([np.mean(carry**2)]))
+
+    rms = np.concatenate(levels) if levels else np.zeros(0)
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+
+def silent_frames(
+    levels: np.ndarray, margin_db: float = SILENCE_MARGIN_DB
+) -> np.ndarray:
+    """
+    Marks the frames quieter than the noise floor plus `margin_db`, where the
+    noise floor is estimated from the quietest tenth of the recording. The
+    threshold never goes above halfway between the noise floor and the typical
+    speech level, so a noisy room doesn't turn speech into silence.
+    """
+    if not len(levels):
+        return np.zeros(0, dtype=bool)
+
+    noise_floor, speech = np.percentile(levels, [10, 90])
+    threshold = min(noise_floor + margin_db, (noise_floor + speech) / 2)
+    return levels < threshold
+
+
+def runs(mask: np.ndarray, min_length: int = 1) -> list[custom_types.Range]:
+    """Frame ranges (end exclusive) of the runs of True of at least `min_length`."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = ends - starts >= min_length
+    return [
+        {"start": int(start), "end": int(end)}
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def snap_to_word_gaps(
+    silences: list[custom_types.Range],
+    word_starts: np.ndarray,
+    word_ends: np.ndarray,
+    min_length: int,
+    padding: int,
+) -> list[custom_types.Range]:
+    """
+    Restricts silences to the gaps between consecutive words, less `padding`
+    frames on each side, so a cut never clips a word and never falls outside of
+    the first and last word. Both are sorted, so each silence finds the gaps it
+    overlaps with a binary search.
+    """
+    # Gap i lies between word i and word i + 1
+    gap_starts = word_ends[:-1] + padding
+    gap_ends = word_starts[1:] - padding
+
+    snapped = []
+    for silence in silences:
+        # The gaps overlapping the silence
+        first = np.searchsorted(gap_ends, silence["start"], side="right")
+        last = np.searchsorted(gap_starts, silence["end"], side="left")
+        for i in range(first, last):
+            start = max(silence["start"], gap_starts[i])
+            end = min(silence["end"], gap_ends[i])
+            if end - start >= min_length:
+                snapped.append({"start": int(start), "end": int(end)})
+    return snapped
+
+
+def find_keep_range(
+    silent: Optional[np.ndarray],
+    word_starts: np.ndarray,
+    word_ends: np.ndarray,
+    padding: int,
+) -> custom_types.Range:
+    """
+    The outer range to keep: from the first to the last word, plus up to
+    `padding` frames of audio on either side as long as it isn't silent
+    (e.g. a word onset before the transcribed start).
+    """
+    start, end = int(word_starts[0]), int(word_ends[-1])
+    if silent is None:
+        return {"start": start, "end": end}
+
+    voiced = np.flatnonzero(~silent)
+    if len(voiced):
+        start = min(start, max(start - padding, int(voiced[0])))
+        end = max(end, min(end + padding, int(voiced[-1]) + 1))
+    return {"start": max(0, start), "end": end}
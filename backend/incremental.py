@@ -0,0 +1,209 @@
+import threading
+from typing import Iterable, Optional
+import numpy as np
+import custom_types
+from config.constants import (
+    CHAPTER_WINDOW_SENTENCES,
+    CHAPTER_MIN_WORDS,
+    CHAPTER_MAX_CHAPTERS,
+)
+from pipeline import ProcessingContext
+from utils import tracing
+from utils.general import linearize_transcript
+from utils.spans import ends_sentence, starts_clause
+
+
+class LiveTranscript:
+    """
+    Processes a transcript while the recording is still in progress.
+
+    Words are passed to `append` as they arrive, and each call only does work
+    for the new words: it updates the trim range, closes the sentences and
+    clauses the new words complete, scores the new clauses for cursor references
+    and embeds the new sentence windows for chapter segmentation. `finish`
+    closes the last sentence and clause once recording stops, after which
+    `context` hands everything to the pipeline, so no stage starts over.
+
+    Sentences and clauses follow the rules of utils.spans.SpanIndex, and the
+    chapter candidates those of utils.segmentation.topic_segments. The trim
+    range only goes by the words; functions.trim.main refines it with the audio.
+    """
+
+    def __init__(
+        self,
+        cursor: bool = True,
+        window_sentences: int = CHAPTER_WINDOW_SENTENCES,
+    ):
+        """
+        Parameters:
+        cursor (bool): Whether to score clauses for cursor references, which
+                       loads the embedding model.
+        window_sentences (int): Sentences per window for chapter segmentation.
+        """
+        self.words = []
+        self.sentences = []
+        self.clauses = []
+        self.cursor_references = [] if cursor else None
+        self.window_sentences = window_sentences
+
+        self._trim_start = None
+        self._trim_end = None
+        self._sentence_start = 0
+        self._clause_start = 0
+        self._window_embeddings = []
+        self._similarities = []
+        self._detector = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def append(self, words: Iterable[custom_types.Word]):
+        """Adds newly transcribed words to the end of the transcript."""
+        with self._lock:
+            if self._finished:
+                raise RuntimeError("The transcript is already finished.")
+
+            first_new = len(self.words)
+            self.words.extend(words)
+            with tracing.span("live.append", words=len(self.words) - first_new):
+                self._update(first_new, len(self.words))
+
+    def finish(self):
+        """Closes the last sentence and clause. Call once recording has stopped."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            with tracing.span("live.finish", words=len(self.words)):
+                self._update(len(self.words), len(self.words))
+
+    def _update(self, first_new: int, end: int):
+        words = self.words
+
+        for i in range(first_new, end):
+            if words[i]["text"]:
+                if self._trim_start is None:
+                    self._trim_start = words[i]["start"]
+                self._trim_end = words[i]["end"]
+
+        # Clauses and sentences which the new words complete
+        new_clauses = []
+        for i in range(max(1, first_new), end):
+            if starts_clause(words[i - 1]["text"], words[i]["text"]):
+                new_clauses.append(self._close_clause(i))
+
+        new_sentences = 0
+        for i in range(first_new, end):
+            if ends_sentence(words[i]["text"]):
+                self.sentences.append({"start": self._sentence_start, "end": i + 1})
+                self._sentence_start = i + 1
+                new_sentences += 1
+
+        if self._finished:
+            if self._clause_start < len(words):
+                new_clauses.append(self._close_clause(len(words)))
+            if self._sentence_start < len(words):
+                self.sentences.append(
+                    {"start": self._sentence_start, "end": len(words)}
+                )
+                self._sentence_start = len(words)
+                new_sentences += 1
+
+        new_clauses = [clause for clause in new_clauses if clause["text"]]
+        self.clauses.extend(new_clauses)
+        if self.cursor_references is not None and new_clauses:
+            self._score_clauses(new_clauses)
+
+        if new_sentences:
+            self._embed_windows()
+
+    def _close_clause(self, end: int) -> custom_types.Clause:
+        start = self._clause_start
+        self._clause_start = end
+        text = linearize_transcript(self.words[start:end]).strip()
+        return {"start": start, "end": end, "text": text}
+
+    def _score_clauses(self, clauses: list[custom_types.Clause]):
+        if self._detector is None:
+            from detectors.cursor_reference import CursorReference
+
+            self._detector = CursorReference()
+
+        matches = self._detector.score_clauses([clause["text"] for clause in clauses])
+        for clause, match in zip(clauses, matches):
+            if match["is_reference"]:
+                self.cursor_references.append(
+                    {**match, "start": clause["start"], "end": clause["end"]}
+                )
+
+    def _embed_windows(self):
+        from utils.embeddings import encode
+
+        # Windows of `w` sentences, and the similarity across each boundary
+        # with full windows on both sides, as in utils.segmentation
+        w = self.window_sentences
+        first = len(self._window_embeddings)
+        last = len(self.sentences) - w + 1
+        if last <= first:
+            return
+
+        texts = [
+            linearize_transcript(
+                self.words[
+                    self.sentences[j]["start"] : self.sentences[j + w - 1]["end"]
+                ]
+            )
+            for j in range(first, last)
+        ]
+        self._window_embeddings.extend(encode(texts, cache=None))
+
+        for g in range(max(0, first - w), last - w):
+            self._similarities.append(
+                float(self._window_embeddings[g] @ self._window_embeddings[g + w])
+            )
+
+    def trim(self) -> Optional[custom_types.Range]:
+        """The part of the recording to keep so far, None before the first word."""
+        if self._trim_start is None:
+            return None
+        return {"start": self._trim_start, "end": self._trim_end}
+
+    def chapter_candidates(
+        self,
+        min_words: int = CHAPTER_MIN_WORDS,
+        max_chapters: int = CHAPTER_MAX_CHAPTERS,
+    ) -> list[custom_types.Range]:
+        """
+        Chapter word ranges over the words so far, from the similarities
+        computed as the words arrived.
+        """
+        from utils.segmentation import select_segments
+
+        return select_segments(
+            np.array(self._similarities),
+            self.sentences,
+            len(self.words),
+            self.window_sentences,
+            min_words,
+            max_chapters,
+        )
+
+    def context(
+        self,
+        camera_video_path: Optional[str] = None,
+        screen_video_path: Optional[str] = None,
+        options: Optional[dict] = None,
+    ) -> ProcessingContext:
+        """
+        A pipeline context for the finished transcript, with everything that was
+        computed during recording filled in.
+        """
+        self.finish()
+
+        context = ProcessingContext(
+            self.words, camera_video_path, screen_video_path, options
+        )
+        context.derived("sentences", lambda: self.sentences)
+        context.derived("chapter_segments", self.chapter_candidates)
+        if self.cursor_references is not None:
+            context.derived("cursor_references", lambda: self.cursor_references)
+        return context
@@ -0,0 +1,605 @@
+"""
+Durable job queue for processing recordings.
+
+Usage (from the backend directory):
+    python jobs.py submit --transcript tests/0/transcript.json --camera tests/0/camera_video.mp4
+    python jobs.py work [--workers 2]
+    python jobs.py status [job id]
+
+Jobs and the result of every finished stage are stored in SQLite, so a worker
+which crashes or is restarted picks its jobs up again at the first unfinished
+stage. Several `work` processes can share one database.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+import custom_types
+from config.constants import (
+    JOBS_DIR,
+    JOBS_WORKERS,
+    JOBS_LEASE_SECONDS,
+    JOBS_POLL_INTERVAL,
+)
+from pipeline import Pipeline, ProcessingContext, default_stages
+from utils import tracing
+from utils.general import load_transcript
+
+TRANSCRIPTION = "transcription"
+
+
+def _to_json(value):
+    # Stage results may hold numpy scalars and arrays
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def content_hash(
+    files: dict[str, Optional[str]], options: Optional[dict] = None
+) -> str:
+    """
+    Hash of the contents of the given files (by role, e.g. "camera_video") and
+    the options, so the same recording is recognised under any file name.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+    for role, path in sorted(files.items()):
+        if path is None:
+            continue
+        digest.update(f"\n{role}\n".encode("utf-8"))
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def planned_stages(
+    transcript_path: Optional[str],
+    screen_video_path: Optional[str],
+    options: Optional[dict],
+) -> list[str]:
+    """The stages a job goes through, transcription first if there's no transcript."""
+    context = ProcessingContext([], None, screen_video_path, options)
+    stages = [stage.name for stage in default_stages(context)]
+    return stages if transcript_path else [TRANSCRIPTION, *stages]
+
+
+class JobStore:
+    """
+    Jobs and their per-stage results, in a SQLite database.
+
+    A job is identified by the content hash of its recording, transcript and
+    options, so submitting the same upload twice returns the existing job.
+    Workers claim queued jobs in a transaction, so no job is claimed twice,
+    even by workers in different processes. While a job runs, its worker keeps
+    renewing a lease; a job whose lease ran out (its worker died) is queued
+    again, and only its unfinished stages run.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, lease_seconds: float = JOBS_LEASE_SECONDS
+    ):
+        """
+        Parameters:
+        path (str, optional): Path of the SQLite database, by default in JOBS_DIR.
+                              Use ":memory:" for a throwaway store.
+        lease_seconds (float): How long a claim or renewal holds a job.
+        """
+        self.lease_seconds = lease_seconds
+        path = path or os.path.join(JOBS_DIR, "jobs.sqlite3")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                transcript_path TEXT,
+                audio_path TEXT,
+                camera_video_path TEXT,
+                screen_video_path TEXT,
+                options TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS stages (
+                job_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                duration REAL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (job_id, name)
+            )""")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+        )
+
+    def submit(
+        self,
+        transcript_path: Optional[str] = None,
+        camera_video_path: Optional[str] = None,
+        screen_video_path: Optional[str] = None,
+        audio_path: Optional[str] = None,
+        options: Optional[dict] = None,
+    ) -> str:
+        """
+        Queues a recording for processing, unless it already was.
+
+        Parameters:
+        transcript_path (str, optional): The transcript. Without it, the job
+                                         transcribes `audio_path` first.
+        camera_video_path (str, optional): Path to the camera video file.
+        screen_video_path (str, optional): Path to the screen video file.
+        audio_path (str, optional): The audio to transcribe.
+        options (dict, optional): Stage options, e.g. {"to_lang": "de"}.
+
+        Returns:
+        str: The id of the job. A failed job submitted again is queued again,
+             and only its failed stages run.
+        """
+        if not transcript_path and not audio_path:
+            raise ValueError("A job needs a transcript_path or an audio_path")
+
+        paths = {
+            "transcript": transcript_path,
+            "audio": audio_path,
+            "camera_video": camera_video_path,
+            "screen_video": screen_video_path,
+        }
+        key = content_hash(paths, options)
+        stages = planned_stages(transcript_path, screen_video_path, options)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, status FROM jobs WHERE content_hash = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    self._db.execute(
+                        "INSERT INTO jobs VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, ?, ?)",
+                        (
+                            job_id,
+                            key,
+                            json.dumps(stages),
+                            transcript_path,
+                            audio_path,
+                            camera_video_path,
+                            screen_video_path,
+                            json.dumps(options or {}),
+                            now,
+                            now,
+                        ),
+                    )
+                else:
+                    job_id, status = row
+                    if status == "failed":
+                        self._db.execute(
+                            "UPDATE jobs SET status = 'queued', error = NULL, updated_at = ? WHERE id = ?",
+                            (now, job_id),
+                        )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Takes the oldest queued job, or one whose worker stopped renewing its
+        lease, and marks it as running for `worker`.
+
+        Returns:
+        dict: The job's row, or None if there is nothing to do.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    """SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+                    ORDER BY created_at LIMIT 1""",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                        (worker, now + self.lease_seconds, now, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.job(row[0]) if row else None
+
+    def renew(self, job_id: str, worker: str) -> bool:
+        """
+        Extends the lease of a running job of the worker.
+
+        Returns:
+        bool: False if the job isn't the worker's anymore, e.g. because its
+              lease ran out and another worker claimed it.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, job_id, worker),
+            )
+        return cursor.rowcount > 0
+
+    def finish(
+        self, job_id: str, worker: str, status: str, error: Optional[str] = None
+    ) -> bool:
+        """
+        Marks a running job of the worker as "done" or "failed".
+
+        Returns:
+        bool: False if the job isn't the worker's anymore, in which case it is
+              left to its new worker.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                """UPDATE jobs SET status = ?, error = ?, worker = NULL,
+                lease_until = NULL, updated_at = ?
+                WHERE id = ? AND worker = ? AND status = 'running'""",
+                (status, error, now, job_id, worker),
+            )
+        return cursor.rowcount > 0
+
+    def job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([column[0] for column in cursor.description], row))
+        job["stages"] = json.loads(job["stages"])
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def record_stage(
+        self,
+        job_id: str,
+        worker: str,
+        name: str,
+        result: Any,
+        error: Optional[str],
+        duration: Optional[float] = None,
+    ) -> bool:
+        """
+        Stores the outcome of a stage of a running job of the worker as soon as
+        it finishes.
+
+        Returns:
+        bool: False if the job isn't the worker's anymore, in which case nothing
+              is stored, so a stale worker can't overwrite its new worker's stages.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                    (now, job_id, worker),
+                )
+                if cursor.rowcount > 0:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            job_id,
+                            name,
+                            "failed" if error else "done",
+                            None if error else json.dumps(result, default=_to_json),
+                            error,
+                            duration,
+                            now,
+                        ),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return cursor.rowcount > 0
+
+    def results(self, job_id: str) -> dict[str, Any]:
+        """The results of the job's finished stages, by stage name."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, result FROM stages WHERE job_id = ? AND status = 'done'",
+                (job_id,),
+            ).fetchall()
+        return {name: json.loads(result) for name, result in rows}
+
+    def status(self, job_id: str) -> Optional[custom_types.JobStatus]:
+        """The job's progress, without loading any stage results."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, stages, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            finished = dict(
+                self._db.execute(
+                    "SELECT name, status FROM stages WHERE job_id = ?", (job_id,)
+                ).fetchall()
+            )
+
+        status, stages, error, created_at, updated_at = row
+        stages = {name: finished.get(name, "pending") for name in json.loads(stages)}
+        done = sum(stage == "done" for stage in stages.values())
+        return {
+            "id": job_id,
+            "status": status,
+            "stages": stages,
+            "progress": done / len(stages) if stages else 1.0,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def recent(
+        self, status: Optional[str] = None, limit: int = 50
+    ) -> list[custom_types.JobStatus]:
+        """The most recent jobs, optionally only those with the given status."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE ? IS NULL OR status = ? ORDER BY created_at DESC LIMIT ?",
+                (status, status, limit),
+            ).fetchall()
+        return [self.status(job_id) for (job_id,) in rows]
+
+
+class WorkerPool:
+    """
+    Processes the jobs of a JobStore on `workers` threads.
+
+    Each thread claims one job at a time and runs its unfinished stages, the
+    independent ones in parallel (see pipeline.Pipeline). Every stage's result
+    is stored as soon as it finishes. More workers process more recordings at
+    once; most of the work is waiting on APIs or in native code, which
+    threads handle well. For more, run several pools on the same database.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOBS_WORKERS,
+        stage_workers: int = 4,
+        poll_interval: float = JOBS_POLL_INTERVAL,
+        transcription_backend=None,
+    ):
+        """
+        Parameters:
+        store (JobStore): Where the jobs come from.
+        workers (int): Jobs processed at once.
+        stage_workers (int): Stages of one job run at once.
+        poll_interval (float): Seconds between checks for new jobs when idle.
+        transcription_backend (TranscriptionBackend, optional): For jobs without
+                              a transcript. Defaults to AssemblyAI.
+        """
+        self.store = store
+        self.workers = workers
+        self.stage_workers = stage_workers
+        self.poll_interval = poll_interval
+        self.transcription_backend = transcription_backend
+        self.name = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops taking new jobs and waits for the running ones to finish."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def run_until_idle(self):
+        """Processes jobs on the calling thread until none are left."""
+        while self.run_one():
+            pass
+
+    def run_one(self) -> bool:
+        """Claims and processes one job. Returns False if there was none."""
+        job = self.store.claim(self.name)
+        if job is None:
+            return False
+
+        # The lease is renewed for as long as the job runs, on whichever
+        # thread runs it
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew_lease,
+            args=(job["id"], done),
+            name=f"job-lease-{job['id'][:8]}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            self.process(job)
+        except Exception as e:
+            logging.exception(f"Job {job['id']} failed")
+            self.store.finish(job["id"], self.name, "failed", str(e))
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def _work(self):
+        while not self._stop.is_set():
+            if not self.run_one():
+                self._stop.wait(self.poll_interval)
+
+    def _renew_lease(self, job_id: str, done: threading.Event):
+        while not done.wait(self.store.lease_seconds / 3):
+            if not self.store.renew(job_id, self.name):
+                logging.warning(f"Lost the lease of job {job_id}")
+                return
+
+    def _transcribe(self, job: dict) -> str:
+        from transcription import AssemblyAIBackend, transcribe
+
+        backend = self.transcription_backend or AssemblyAIBackend()
+        output_path = os.path.join(JOBS_DIR, job["id"], "transcript.json")
+        result = asyncio.run(transcribe(job["audio_path"], output_path, backend))
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        return output_path
+
+    def process(self, job: dict):
+        """Runs the job's unfinished stages, skipping those already done."""
+        job_id = job["id"]
+        done = self.store.results(job_id)
+
+        with tracing.span("job", resumed=bool(done)) as span:
+            transcript_path = job["transcript_path"]
+            if TRANSCRIPTION in job["stages"]:
+                if TRANSCRIPTION in done:
+                    transcript_path = done[TRANSCRIPTION]["transcript_path"]
+                else:
+                    start = time.perf_counter()
+                    try:
+                        transcript_path = self._transcribe(job)
+                    except Exception as e:
+                        self.store.record_stage(
+                            job_id,
+                            self.name,
+                            TRANSCRIPTION,
+                            None,
+                            str(e),
+                            time.perf_counter() - start,
+                        )
+                        self.store.finish(job_id, self.name, "failed", str(e))
+                        span.fail(e)
+                        return
+                    self.store.record_stage(
+                        job_id,
+                        self.name,
+                        TRANSCRIPTION,
+                        {"transcript_path": transcript_path},
+                        None,
+                        time.perf_counter() - start,
+                    )
+
+            context = ProcessingContext(
+                load_transcript(transcript_path),
+                job["camera_video_path"],
+                job["screen_video_path"],
+                job["options"],
+            )
+            context.results.update(done)
+            stages = [
+                stage for stage in default_stages(context) if stage.name not in done
+            ]
+            span.set(stages=len(stages))
+
+            def on_stage_done(name, result, error, duration):
+                self.store.record_stage(
+                    job_id, self.name, name, result, error, duration
+                )
+
+            errors = Pipeline(stages).run(context, self.stage_workers, on_stage_done)[
+                "errors"
+            ]
+            if errors:
+                name = next(iter(errors))
+                self.store.finish(
+                    job_id, self.name, "failed", f"{name}: {errors[name]}"
+                )
+            else:
+                self.store.finish(job_id, self.name, "done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="Path of the job database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue a recording")
+    submit.add_argument("--transcript")
+    submit.add_argument("--audio")
+    submit.add_argument("--camera")
+    submit.add_argument("--screen")
+    submit.add_argument("--to-lang")
+
+    work = commands.add_parser("work", help="Process jobs until interrupted")
+    work.add_argument("--workers", type=int, default=JOBS_WORKERS)
+
+    status = commands.add_parser("status", help="Show the status of jobs")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args()
+    store = JobStore(args.db)
+
+    if args.command == "submit":
+        options = {"to_lang": args.to_lang} if args.to_lang else None
+        print(
+            store.submit(args.transcript, args.camera, args.screen, args.audio, options)
+        )
+    elif args.command == "status":
+        statuses = [store.status(args.job_id)] if args.job_id else store.recent()
+        print(json.dumps(statuses, indent=2))
+    else:
+        logging.basicConfig(level=logging.INFO)
+        pool = WorkerPool(store, args.workers)
+        pool.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info("Finishing the running jobs")
+            pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+__all__ = ["cache", "completion"]
+
+from .cache import CompletionCache
+from .completion import complete, get_cache, get_client
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+
+class CompletionCache:
+    """
+    Persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Responses are keyed on a hash of the model, messages and sampling parameters.
+    Entries expire after `ttl` seconds, and once there are more than
+    `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 50_000,
+        ttl: float = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Parameters:
+        path (str): Path of the SQLite database. Use ":memory:" for a throwaway cache.
+        max_entries (int): Maximum number of cached responses.
+        ttl (float, optional): Time in seconds after which a response expires.
+        clock (Callable): Returns the current time in seconds.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS completions_accessed_at ON completions (accessed_at)"
+        )
+        (self._size,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict], **params) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, latency, created_at FROM completions WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._size -= 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            self.latency_saved += row[1]
+            return row[0]
+
+    def put(self, key: str, response: str, latency: float):
+        now = self.clock()
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, response, latency, now, now),
+            )
+            if not exists:
+                self._size += 1
+
+            # Evict the least recently used entries
+            if self._size > self.max_entries:
+                self._db.execute(
+                    """DELETE FROM completions WHERE key IN (
+                        SELECT key FROM completions ORDER BY accessed_at LIMIT ?
+                    )""",
+                    (self._size - self.max_entries,),
+                )
+                self._size = self.max_entries
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM completions")
+            self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "latency_saved": self.latency_saved,
+            "entries": self._size,
+        }
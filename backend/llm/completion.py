@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from config.constants import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL,
+)
+from utils import tracing
+from .cache import CompletionCache
+
+_client = None
+_cache = None
+_lock = threading.Lock()
+
+
+def get_client() -> "OpenAI":
+    """Returns the process-wide OpenAI client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            # The SDK takes a while to import, so only LLM calls pay for it
+            from openai import OpenAI
+
+            load_dotenv(override=True)
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            _client = OpenAI(api_key=api_key)
+        return _client
+
+
+def get_cache() -> CompletionCache:
+    """Returns the process-wide completion cache, opening it on first use."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = CompletionCache(
+                LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL
+            )
+        return _cache
+
+
+def complete(
+    messages: list[dict],
+    model: str = "gpt-4o-mini",
+    use_cache: bool = True,
+    timeout: float = None,
+    **params,
+) -> str:
+    """
+    Runs a chat completion, serving it from the persistent cache when the same
+    model, messages and sampling parameters were seen before.
+
+    Parameters:
+    messages (list[dict]): The chat messages.
+    model (str): The model name.
+    use_cache (bool): Whether to look the response up in the cache. The fresh
+                      response is stored either way, e.g. when retrying a
+                      response that turned out to be unusable. A structured
+                      response (response_format) which was cut off at
+                      max_tokens isn't stored, since it isn't valid JSON.
+    timeout (float, optional): Timeout in seconds for the request.
+    **params: Sampling parameters such as temperature or max_tokens.
+
+    Returns:
+    str: The content of the response message.
+    """
+    cache = get_cache() if LLM_CACHE_ENABLED else None
+    key = CompletionCache.make_key(model, messages, **params)
+
+    with tracing.span("llm.complete", model=model) as span:
+        if cache is not None and use_cache:
+            response = cache.get(key)
+            if response is not None:
+                span.set(cache="hit")
+                return response
+
+        start = time.perf_counter()
+        response = get_client().chat.completions.create(
+            model=model, messages=messages, timeout=timeout, **params
+        )
+        latency = time.perf_counter() - start
+
+        span.set(cache="miss")
+        if response.usage is not None:
+            span.set(
+                prompt_tokens=response.usage.prompt_tokens,
+                completion_tokens=response.usage.completion_tokens,
+            )
+
+        choice = response.choices[0]
+        content = choice.message.content
+        truncated = choice.finish_reason == "length"
+        if truncated:
+            span.set(truncated=True)
+        if (
+            cache is not None
+            and content is not None
+            and not (truncated and "response_format" in params)
+        ):
+            cache.put(key, content, latency)
+
+        return content
@@ -0,0 +1,321 @@
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+import custom_types
+from utils import tracing
+from utils.general import linearize_transcript, load_transcript
+from utils.spans import SpanIndex
+
+
+class ProcessingContext:
+    """
+    Everything the stages of one recording share.
+
+    The transcript is loaded once, and derived data (its text and sentence
+    spans) is computed on first use and then reused by every stage. It is safe
+    to access from several stages at once.
+    """
+
+    def __init__(
+        self,
+        transcript: custom_types.Transcript,
+        camera_video_path: Optional[str] = None,
+        screen_video_path: Optional[str] = None,
+        options: Optional[dict] = None,
+    ):
+        self.transcript = transcript
+        self.camera_video_path = camera_video_path
+        self.screen_video_path = screen_video_path
+        self.options = options or {}
+
+        # Outputs of the stages which have finished, by stage name
+        self.results = {}
+
+        self._derived = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(
+        cls,
+        transcript_path: str,
+        camera_video_path: Optional[str] = None,
+        screen_video_path: Optional[str] = None,
+        options: Optional[dict] = None,
+    ) -> "ProcessingContext":
+        return cls(
+            load_transcript(transcript_path),
+            camera_video_path,
+            screen_video_path,
+            options,
+        )
+
+    def derived(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Returns the shared value `name`, computing it once with `compute`."""
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        # Per-value lock, so computing one value doesn't block the others
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = compute()
+            return self._derived[name]
+
+    @property
+    def text(self) -> str:
+        return self.derived("text", lambda: linearize_transcript(self.transcript))
+
+    @property
+    def spans(self) -> SpanIndex:
+        return self.derived("spans", lambda: SpanIndex(self.transcript))
+
+    @property
+    def sentences(self) -> list[custom_types.Range]:
+        return self.derived("sentences", lambda: self.spans.sentences)
+
+
+class Stage:
+    """
+    A unit of work in the pipeline.
+
+    `run` is called with the ProcessingContext once all stages named in
+    `depends_on` have finished; their outputs are in `context.results`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[ProcessingContext], Any],
+        depends_on: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            missing = set(stage.depends_on) - names
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown {missing}")
+        self.stages = stages
+
+    def run(
+        self,
+        context: ProcessingContext,
+        max_workers: int = 4,
+        on_stage_done: Optional[
+            Callable[[str, Any, Optional[str], float], None]
+        ] = None,
+    ) -> custom_types.PipelineResult:
+        """
+        Runs every stage as soon as its dependencies have finished, with
+        independent stages running in parallel on a thread pool.
+
+        A failed stage doesn't stop the others, but the stages depending on it
+        are skipped.
+
+        `on_stage_done(name, result, error, duration)` is called on the calling
+        thread as soon as each stage finishes, with error None if it succeeded.
+
+        Returns:
+        dict (PipelineResult): Stage outputs, errors, per-stage durations in
+                               seconds, and the total wall time.
+        """
+        pending = {stage.name: stage for stage in self.stages}
+        errors = {}
+        timings = {}
+        running = {}
+
+        def timed(stage):
+            start = time.perf_counter()
+            try:
+                with tracing.span("pipeline.stage", stage=stage.name):
+                    return stage.run(context)
+            finally:
+                timings[stage.name] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    failed = [dep for dep in stage.depends_on if dep in errors]
+                    if failed:
+                        errors[name] = f"Skipped, {failed[0]} failed"
+                        del pending[name]
+                    elif all(dep in context.results for dep in stage.depends_on):
+                        # Stage spans are nested under the caller's span
+                        future = executor.submit(
+                            contextvars.copy_context().run, timed, stage
+                        )
+                        running[future] = name
+                        del pending[name]
+
+                if not running:
+                    # Nothing can make progress, which only happens with a cycle
+                    for name in pending:
+                        errors[name] = "Skipped, circular dependency"
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        context.results[name] = future.result()
+                    except Exception as e:
+                        errors[name] = str(e)
+                    if on_stage_done is not None:
+                        on_stage_done(
+                            name,
+                            context.results.get(name),
+                            errors.get(name),
+                            timings[name],
+                        )
+
+        return {
+            "results": context.results,
+            "errors": errors,
+            "timings": timings,
+            "wall_time": time.perf_counter() - start,
+        }
+
+
+# Stages which can use results computed ahead of time (see
+# incremental.LiveTranscript.context) look them up with `derived`, falling back
+# to None when there are none. Trimming always runs, since it reads the audio.
+
+
+def _trim(context):
+    from functions.trim.main import main as trim
+
+    return trim(context.transcript, context.camera_video_path)
+
+
+def _title(context):
+    from title_generate import generate_title_from_transcript
+
+    return generate_title_from_transcript(context.transcript)
+
+
+def _summary(context):
+    from transcript_summary import generate_summary
+
+    return generate_summary(context.transcript, text=context.text)
+
+
+def _chapters(context):
+    from transcript_chapter_generator import generate_chapters
+
+    return generate_chapters(
+        context.transcript,
+        sentences=context.sentences,
+        segments=context.derived("chapter_segments", lambda: None),
+    )
+
+
+def _layout(context):
+    from functions.layout.main import main as layout
+
+    return layout(
+        context.transcript,
+        screen_video_path=context.screen_video_path,
+        text=context.text,
+    )
+
+
+def _translate(context):
+    from functions.translate.main import translate_transcript
+
+    return translate_transcript(
+        context.transcript,
+        context.options.get("from_lang", "en"),
+        context.options["to_lang"],
+        spans=context.spans,
+    )
+
+
+def _cursor(context):
+    from cursor_detection import process_video
+
+    references = context.derived("cursor_references", lambda: None)
+    return process_video(
+        context.screen_video_path,
+        context.transcript,
+        spans=context.spans if references is None else None,
+        references=references,
+    )
+
+
+# Every stage function by name, e.g. for running a single stage (see server.py)
+STAGE_FUNCTIONS = {
+    "trim": _trim,
+    "title": _title,
+    "summary": _summary,
+    "chapters": _chapters,
+    "layout": _layout,
+    "translate": _translate,
+    "cursor": _cursor,
+}
+
+
+def default_stages(context: ProcessingContext) -> list[Stage]:
+    """The AI processing stages that apply to the given recording."""
+    names = ["trim", "title", "summary", "chapters", "layout"]
+    if context.options.get("to_lang"):
+        names.append("translate")
+    if context.screen_video_path:
+        names.append("cursor")
+    return [Stage(name, STAGE_FUNCTIONS[name]) for name in names]
+
+
+def run_pipeline(
+    transcript_path: str,
+    camera_video_path: Optional[str] = None,
+    screen_video_path: Optional[str] = None,
+    options: Optional[dict] = None,
+    max_workers: int = 4,
+) -> custom_types.PipelineResult:
+    """
+    Runs all AI processing stages for one recording.
+
+    Parameters:
+    transcript_path (str): Path to the transcript (JSON or binary).
+    camera_video_path (str, optional): Path to the camera video file.
+    screen_video_path (str, optional): Path to the screen video file. Cursor
+                                       detection only runs if it is given.
+    options (dict, optional): Stage options, e.g. "from_lang" and "to_lang".
+                              Translation only runs if "to_lang" is given.
+    max_workers (int): Maximum number of stages running at once.
+
+    Returns:
+    dict (PipelineResult): See Pipeline.run.
+    """
+    context = ProcessingContext.from_files(
+        transcript_path, camera_video_path, screen_video_path, options
+    )
+    return Pipeline(default_stages(context)).run(context, max_workers)
+
+
+if __name__ == "__main__":
+    result = run_pipeline(
+        "tests/0/transcript.json",
+        camera_video_path="tests/0/camera_video.mp4",
+        options={"to_lang": "de"},
+    )
+
+    for name, duration in sorted(result["timings"].items(), key=lambda t: -t[1]):
+        status = (
+            f"failed: {result['errors'][name]}" if name in result["errors"] else "ok"
+        )
+        print(f"{name:<10} {duration:8.2f}s  {status}")
+    print(f"{'total':<10} {result['wall_time']:8.2f}s")
+    print(
+        json.dumps(
+            {k: v for k, v in result["results"].items() if k != "translate"}, indent=2
+        )
+    )
@@ -0,0 +1,326 @@
+"""
+Long-lived worker service for the backend functions.
+
+Usage (from the backend directory):
+    python server.py [--host 127.0.0.1] [--port 8000] [--max-concurrent 8]
+
+POST /<function> runs one function on the recording described by the JSON
+body, and responds with {"result": ...} or {"error": "..."}. The functions are
+trim, search, search_many, layout, translate, title, summary, chapters and
+cursor. The body holds:
+    transcript (list) or transcript_path (str): The transcript.
+    camera_video_path, screen_video_path (str): The videos, where needed.
+    query (str): The search query, for search.
+    queries (list[str]): The search queries, for search_many.
+    options (dict): Stage options, e.g. {"from_lang": "en", "to_lang": "de"}.
+
+GET /health reports what was loaded at startup, and GET /metrics serves the
+tracing metrics in the Prometheus text format.
+
+Models and clients are loaded once at startup, and embedding requests from
+concurrent requests are merged into shared batches (see
+utils.embeddings.MicroBatcher). At most `max_concurrent` requests run at
+once; a request which can't get a slot within SERVER_QUEUE_TIMEOUT seconds
+is turned away with a 503, so a saturated worker sheds load instead of
+queueing without bound.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import numpy as np
+
+from config.constants import (
+    CURSOR_PHRASES,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_CONCURRENT,
+    SERVER_QUEUE_TIMEOUT,
+    TRACING,
+)
+from pipeline import STAGE_FUNCTIONS, ProcessingContext
+from utils import tracing
+from utils.general import load_transcript
+
+
+class BadRequest(Exception):
+    """The request itself is invalid, answered with a 400."""
+
+
+# The functions served, and what their requests need besides the transcript
+ENDPOINTS = {
+    "trim": ["camera_video_path"],
+    "search": ["query"],
+    "search_many": ["queries"],
+    "layout": [],
+    "translate": ["options.to_lang"],
+    "title": [],
+    "summary": [],
+    "chapters": [],
+    "cursor": ["screen_video_path"],
+}
+
+# Imported at startup, so no request pays for it
+_MODULES = [
+    "functions.trim.main",
+    "functions.search.main",
+    "functions.layout.main",
+    "functions.translate.main",
+    "title_generate",
+    "transcript_summary",
+    "transcript_chapter_generator",
+    "cursor_detection",
+]
+
+
+def warm_up() -> dict[str, str]:
+    """
+    Imports every function and loads the embedding model, the cursor phrase
+    embeddings and the LLM client and cache, with embedding batching enabled.
+    A step which fails (e.g. no API key) is logged and skipped, so the
+    functions which don't need it still work.
+
+    Returns:
+    dict: "ok" or the error of each step, by name.
+    """
+    from utils import embeddings
+
+    def load_llm():
+        import llm
+
+        llm.get_cache()
+        llm.get_client()
+
+    steps = {
+        **{
+            module: (lambda module=module: importlib.import_module(module))
+            for module in _MODULES
+        },
+        "embedding_model": lambda: (
+            embeddings.get_model(),
+            embeddings.enable_batching(),
+        ),
+        "cursor_phrases": lambda: embeddings.phrase_embeddings(CURSOR_PHRASES),
+        "llm": load_llm,
+    }
+
+    status = {}
+    for name, step in steps.items():
+        try:
+            with tracing.span("server.warm_up", step=name):
+                step()
+            status[name] = "ok"
+        except Exception as e:
+            logging.warning(f"Warm-up of {name} failed: {e}")
+            status[name] = str(e)
+    return status
+
+
+def _to_json(value):
+    # Results may hold numpy scalars and arrays
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def run(name: str, context: ProcessingContext, body: dict) -> Any:
+    """Runs the function `name`, the same way the pipeline runs its stage."""
+    if name == "search":
+        import functions
+
+        return functions.get("search")(
+            context.transcript, body["query"], local=body.get("local", False)
+        )
+    if name == "search_many":
+        from functions.search.main import search_many
+
+        return search_many(context.transcript, list(body["queries"]))
+    return STAGE_FUNCTIONS[name](context)
+
+
+def parse_request(name: str, body: Any) -> ProcessingContext:
+    """Checks a request body and builds the context its function runs on."""
+    if not isinstance(body, dict):
+        raise BadRequest("The body must be a JSON object")
+
+    for field in ENDPOINTS[name]:
+        value = body
+        for key in field.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if not value:
+            raise BadRequest(f"Missing {field}")
+
+    if "query" in body and not isinstance(body["query"], str):
+        raise BadRequest("query must be a string")
+    if "queries" in body and not (
+        isinstance(body["queries"], list)
+        and all(isinstance(query, str) for query in body["queries"])
+    ):
+        raise BadRequest("queries must be a list of strings")
+    if "options" in body and not isinstance(body["options"], dict):
+        raise BadRequest("options must be an object")
+
+    if isinstance(body.get("transcript"), list):
+        transcript = body["transcript"]
+    elif isinstance(body.get("transcript_path"), str):
+        try:
+            transcript = load_transcript(body["transcript_path"])
+        except (OSError, ValueError) as e:
+            raise BadRequest(f"Failed to load the transcript: {e}")
+    else:
+        raise BadRequest("Missing transcript or transcript_path")
+
+    return ProcessingContext(
+        transcript,
+        body.get("camera_video_path"),
+        body.get("screen_video_path"),
+        body.get("options"),
+    )
+
+
+class WorkerServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        max_concurrent: int = SERVER_MAX_CONCURRENT,
+        queue_timeout: float = SERVER_QUEUE_TIMEOUT,
+    ):
+        super().__init__(address, RequestHandler)
+        self.queue_timeout = queue_timeout
+        self.warm_up_status = {}
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def metrics(self) -> str:
+        with self._lock:
+            lines = [
+                "# TYPE server_requests_in_flight gauge",
+                f"server_requests_in_flight {self.in_flight}",
+                "# TYPE server_rejected_total counter",
+                f"server_rejected_total {self.rejected}",
+            ]
+        return tracing.render_prometheus() + "\n".join(lines) + "\n"
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: WorkerServer
+
+    def _send(self, status: int, body: str, content_type: str, headers: dict = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        self._send(
+            status,
+            json.dumps(payload, default=_to_json),
+            "application/json",
+            headers,
+        )
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(
+                200, {"status": "ok", "warm_up": self.server.warm_up_status}
+            )
+        elif self.path == "/metrics":
+            self._send(200, self.server.metrics(), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        name = self.path.strip("/")
+        if name not in ENDPOINTS:
+            self._send_json(404, {"error": f"Unknown function: {name}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        server = self.server
+        if not server.slots.acquire(timeout=server.queue_timeout):
+            with server._lock:
+                server.rejected += 1
+            self._send_json(503, {"error": "Busy, retry later"}, {"Retry-After": "1"})
+            return
+
+        with server._lock:
+            server.in_flight += 1
+        try:
+            with tracing.span("server.request", function=name) as span:
+                try:
+                    context = parse_request(name, body)
+                    # Serialized here, so a result which can't be is a 500 too
+                    response = json.dumps(
+                        {"result": run(name, context, body)}, default=_to_json
+                    )
+                except BadRequest as e:
+                    span.set(status="bad_request")
+                    self._send_json(400, {"error": str(e)})
+                    return
+                except Exception as e:
+                    logging.exception(f"{name} failed")
+                    span.fail(e)
+                    self._send_json(500, {"error": str(e)})
+                    return
+            self._send(200, response, "application/json")
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+            server.slots.release()
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-concurrent", type=int, default=SERVER_MAX_CONCURRENT)
+    parser.add_argument("--queue-timeout", type=float, default=SERVER_QUEUE_TIMEOUT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # /metrics needs the aggregated metrics, which are only kept in memory
+    # when tracing is otherwise off
+    if TRACING == "off":
+        tracing.configure("prometheus")
+
+    server = WorkerServer(
+        (args.host, args.port), args.max_concurrent, args.queue_timeout
+    )
+    server.warm_up_status = warm_up()
+    logging.info(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
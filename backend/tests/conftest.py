@@ -0,0 +1,45 @@
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from utils import embeddings
+
+
+class StubModel:
+    """
+    Stands in for the SentenceTransformer: a text's embedding is the
+    normalized sum of a fixed random vector per word, so texts sharing words
+    are similar.
+    """
+
+    dimension = 64
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.encoded.append(list(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                word = word.strip(".,;!?")
+                rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+                vectors[i] += rng.standard_normal(self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+
+@pytest.fixture
+def stub_model(tmp_path, monkeypatch):
+    """Replaces the embedding model, and keeps its embeddings out of the caches."""
+    model = StubModel()
+    monkeypatch.setattr(embeddings, "get_model", lambda model_name=None: model)
+    monkeypatch.setattr(embeddings, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(embeddings, "_phrase_embeddings", {})
+    monkeypatch.setattr(embeddings.clause_cache, "_entries", OrderedDict())
+    return model
@@ -0,0 +1,119 @@
+import json
+import os
+from collections import Counter
+
+import pytest
+
+from utils.aligner import SectionAligner
+from utils.diff_text import (
+    cleaned,
+    diff_text,
+    find_section_range,
+    hallucination_rate,
+    revert_hallucinations,
+    revert_internal_deletions,
+)
+from utils.general import linearize_transcript
+
+HERE = os.path.dirname(__file__)
+TRANSCRIPTS = ["transcript5.json", "0/transcript.json", "0/transcript2.json"]
+
+
+def sequence_matcher_range(transcript, section):
+    """find_section_range as it was before SectionAligner: diffs of the whole transcript."""
+    text = linearize_transcript(transcript)
+    section = section.strip()
+    if hallucination_rate(text, section) > 0.1:
+        return None
+
+    section = revert_hallucinations(text, section)
+    section = revert_internal_deletions(text, section)
+    equal = next((x for x in diff_text(text, section, False) if x[0] == "equal"), None)
+    if equal is None:
+        return None
+    return equal[1], equal[2]
+
+
+def exact(words):
+    return words
+
+
+def repunctuated(words):
+    return [word.lower().strip(".,?!") for word in words]
+
+
+def substituted(words):
+    return words[: len(words) // 2] + ["banana"] + words[len(words) // 2 + 1 :]
+
+
+def shortened(words):
+    return words[: len(words) // 3] + words[len(words) // 3 + 2 :]
+
+
+@pytest.fixture(scope="module", params=TRANSCRIPTS)
+def transcript(request):
+    with open(os.path.join(HERE, request.param)) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("edit", [exact, repunctuated, substituted, shortened])
+def test_matches_the_sequence_matcher_ranges(transcript, edit):
+    aligner = SectionAligner(transcript)
+    words = [word["text"] for word in transcript]
+
+    for start in range(0, len(words) - 40, len(words) // 12):
+        for length in (17, 29):
+            section = " ".join(edit(words[start : start + length]))
+            expected = sequence_matcher_range(transcript, section)
+            assert expected is not None
+            assert find_section_range(transcript, section, aligner) == expected, (
+                start,
+                length,
+            )
+
+
+def test_words_apart_are_anchored_by_single_words(transcript):
+    aligner = SectionAligner(transcript)
+    words = [word["text"] for word in transcript]
+    counts = Counter(cleaned(word) for word in words)
+    unique = [i for i, word in enumerate(words) if counts[cleaned(word)] == 1]
+
+    pairs = [(i, j) for i, j in zip(unique, unique[1:]) if 1 < j - i <= 8]
+    assert pairs
+    for i, j in pairs:
+        # The two words aren't adjacent, so no n-gram longer than one matches
+        assert not aligner.index.positions((cleaned(words[i]), cleaned(words[j])))
+        section = f"{words[i]} {words[j]}"
+        assert find_section_range(transcript, section, aligner) == (i, j + 1)
+        assert sequence_matcher_range(transcript, section) == (i, j + 1)
+
+
+def test_common_ngrams_still_anchor_when_nothing_rarer_matches(transcript, monkeypatch):
+    # Every n-gram counts as too common, so only the fallback votes are left
+    monkeypatch.setattr(SectionAligner, "MAX_ANCHOR_OCCURRENCES", 0)
+    aligner = SectionAligner(transcript)
+    words = [word["text"] for word in transcript]
+
+    for start in range(0, len(words) - 40, len(words) // 6):
+        section = " ".join(shortened(words[start : start + 17]))
+        assert find_section_range(
+            transcript, section, aligner
+        ) == sequence_matcher_range(transcript, section)
+
+
+def test_short_sections_missing_words_keep_their_own_range(transcript):
+    # The whole-transcript diff could match the first remaining word far
+    # before the section (e.g. a "the" 50 words earlier) and return a much
+    # longer range; the diff around the anchor doesn't
+    aligner = SectionAligner(transcript)
+    words = [word["text"] for word in transcript]
+
+    for start in range(0, len(words) - 40, len(words) // 12):
+        section = " ".join(shortened(words[start : start + 8]))
+        assert find_section_range(transcript, section, aligner) == (start, start + 8)
+
+
+def test_unrelated_text_is_not_found(transcript):
+    section = "completely unrelated words about cooking pasta with tomato sauce"
+    assert find_section_range(transcript, section) is None
+    assert sequence_matcher_range(transcript, section) is None
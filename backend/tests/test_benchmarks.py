@@ -0,0 +1,69 @@
+import json
+import sys
+
+from benchmarks import run
+from benchmarks.synthetic import generate_transcript, llm_answer
+from utils.diff_text import find_section_range
+from utils.spans import SpanIndex
+
+
+def test_synthetic_transcripts_are_deterministic_per_seed():
+    transcript = generate_transcript(2, seed=3)
+
+    assert generate_transcript(2, seed=3) == transcript
+    assert generate_transcript(2, seed=4) != transcript
+    assert len(transcript) == 300
+    assert len({word["id"] for word in transcript}) == len(transcript)
+    for word, next_word in zip(transcript, transcript[1:]):
+        assert word["start"] < word["end"]
+        assert word["start"] < next_word["start"]
+
+    # Several sentences, with commas and conjunctions splitting them into clauses
+    spans = SpanIndex(transcript)
+    assert len(spans.sentences) > 10
+    assert len(spans.clauses) > len(spans.sentences)
+
+
+def test_llm_answers_are_found_in_their_transcript():
+    transcript = generate_transcript(2, seed=3)
+    answer = llm_answer(transcript, seed=3)
+
+    assert llm_answer(transcript, seed=3) == answer
+    assert "banana" in answer.split()
+    start, end = find_section_range(transcript, answer)
+    assert end - start >= 25
+
+
+def test_every_benchmark_runs_and_reports_json(tmp_path, monkeypatch):
+    output = tmp_path / "results.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["run", "--minutes", "1", "2", "--repeats", "2", "--output", str(output)],
+    )
+
+    run.main()
+
+    report = json.loads(output.read_text())
+    assert set(report["meta"]) == {"timestamp", "commit", "python", "platform", "seed"}
+    names = list(run.benchmarks(generate_transcript(1), 0))
+    assert [(r["name"], r["minutes"]) for r in report["results"]] == [
+        (name, minutes) for minutes in (1, 2) for name in names
+    ]
+    for result in report["results"]:
+        assert result["repeats"] == 2
+        assert 0 <= result["min"] <= result["median"]
+        assert result["words"] == result["minutes"] * 150
+
+
+def test_only_runs_the_given_benchmarks(capsys, monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["run", "--minutes", "1", "--repeats", "1", "--only", "chunk_transcript"],
+    )
+
+    run.main()
+
+    report = json.loads(capsys.readouterr().out)
+    assert [r["name"] for r in report["results"]] == ["chunk_transcript"]
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import cursor_detection
+from config.constants import CURSOR_PHRASES
+from detectors import cursor_tracker
+from detectors.cursor_reference import CursorReference
+from utils import embeddings
+
+
+def test_the_model_is_loaded_on_first_scoring(stub_model, monkeypatch):
+    loads = []
+    monkeypatch.setattr(
+        embeddings, "get_model", lambda model_name=None: loads.append(1) or stub_model
+    )
+
+    detector = CursorReference()
+    assert loads == []
+
+    matches = detector.score_clauses(
+        ["click the button in the top right", "revenue grew every quarter"]
+    )
+    assert len(loads) == 2  # the clauses, then the phrases
+    assert [match["is_reference"] for match in matches] == [True, False]
+    assert matches[0]["phrase"] == "in the top right"
+
+    detector.score_clauses(["look in the top left"])
+    assert len(loads) == 3
+    assert stub_model.encoded[1] == CURSOR_PHRASES
+
+
+CLAUSES = [
+    "click the button in the top right",
+    "revenue grew every quarter",
+    "then look over here",
+    "this one",
+    "move it to the bottom left corner",
+]
+
+
+def one_by_one(model, text, threshold=0.4):
+    """is_cursor_reference as it was: one clause, then a loop over the phrases."""
+    text_embedding = model.encode([text])[0]
+    phrase_embeddings = model.encode(CURSOR_PHRASES)
+    similarities = [
+        float(
+            text_embedding
+            @ phrase
+            / np.linalg.norm(text_embedding)
+            / np.linalg.norm(phrase)
+        )
+        for phrase in phrase_embeddings
+    ]
+    best = int(np.argmax(similarities))
+    return CURSOR_PHRASES[best], similarities[best], similarities[best] > threshold
+
+
+def test_batch_scores_match_scoring_one_clause_at_a_time(stub_model):
+    matches = CursorReference().score_clauses(CLAUSES)
+    # One forward pass for the clauses, one for the phrases
+    assert stub_model.encoded == [CLAUSES, CURSOR_PHRASES]
+
+    for clause, match in zip(CLAUSES, matches):
+        phrase, similarity, is_reference = one_by_one(stub_model, clause)
+        assert match["text"] == clause
+        assert match["phrase"] == phrase
+        assert match["similarity"] == pytest.approx(similarity, abs=1e-5)
+        assert match["is_reference"] == is_reference
+        assert CursorReference().is_cursor_reference(clause) == is_reference
+
+    assert CursorReference().score_clauses([]) == []
+
+
+def test_process_video_looks_up_the_cursor_at_each_reference(stub_model, monkeypatch):
+    transcript = [
+        {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+        for i, text in enumerate(
+            "Revenue grew every quarter. Click the button in the top right. Done.".split()
+        )
+    ]
+    tracked = [
+        {"start": 0, "end": 50, "pos": {"x": 1, "y": 2}},
+        {"start": 50, "end": 200, "pos": {"x": 30, "y": 40}},
+    ]
+    monkeypatch.setattr(cursor_tracker, "track_video", lambda path: tracked)
+
+    assert cursor_detection.process_video("screen.mp4", transcript) == [
+        {"start": 40, "end": 48, "pos": {"x": 1, "y": 2}}
+    ]
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+
+from config.constants import FPS
+from detectors.cursor_tracker import CursorTracker, render_arrow, track_video
+
+
+def screen_with_cursor(height: int, dark: bool, x: int = 1500, y: int = 900):
+    """A 1080p gray screen with some dark lines, and the cursor's tip at (x, y)."""
+    frame = np.full((1080, 1920), 235, np.uint8)
+    frame[100:1000:40, 200:1700] = 30
+    template, mask = render_arrow(height)
+    if dark:
+        template = 255 - template
+    region = frame[y - 1 : y - 1 + template.shape[0], x - 1 : x - 1 + template.shape[1]]
+    region[mask.astype(bool)] = template[mask.astype(bool)]
+    return frame
+
+
+@pytest.mark.parametrize("height", [19, 28, 38])
+@pytest.mark.parametrize("dark", [False, True])
+def test_locates_light_and_dark_cursors(height, dark):
+    position = CursorTracker().locate(screen_with_cursor(height, dark))
+    assert position is not None
+    assert abs(position["x"] - 1500) <= 2 and abs(position["y"] - 900) <= 2
+
+
+def test_still_cursor_is_found_by_the_spread_out_search():
+    frame = screen_with_cursor(28, dark=True)
+    tracker = CursorTracker()
+    positions = [tracker.update(frame) for _ in range(120)]
+    found = [p for p in positions if p is not None]
+    assert found and abs(found[-1]["x"] - 1500) <= 2
+    assert positions[-1] is not None
+
+
+def test_no_cursor_is_not_found():
+    frame = np.full((1080, 1920), 235, np.uint8)
+    frame[100:1000:40, 200:1700] = 30
+    tracker = CursorTracker()
+    assert all(tracker.update(frame) is None for _ in range(120))
+
+
+def test_track_video_finds_a_cursor_which_appears(tmp_path):
+    path = str(tmp_path / "screen.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1920, 1080))
+    empty = np.full((1080, 1920), 235, np.uint8)
+    empty[100:1000:40, 200:1700] = 30
+    for i in range(30):
+        frame = empty if i < 10 else screen_with_cursor(19, dark=False)
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    writer.release()
+
+    segments = track_video(path, frame_step=2)
+
+    assert len(segments) == 1
+    assert segments[0]["start"] == round(10 * FPS / 30)
+    assert segments[0]["end"] == round(30 * FPS / 30)
+    assert abs(segments[0]["pos"]["x"] - 1500) <= 2
+    assert abs(segments[0]["pos"]["y"] - 900) <= 2
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+import pytest
+
+from utils.frame_sampler import FrameSampler
+
+FRAMES = 60
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    """A short video whose frames all look different."""
+    path = str(tmp_path_factory.mktemp("video") / "video.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (128, 96))
+    rng = np.random.default_rng(0)
+    for i in range(FRAMES):
+        frame = rng.integers(0, 256, (96, 128, 3), dtype=np.uint8)
+        cv2.putText(frame, str(i), (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 0, 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture(scope="module")
+def decoded(video_path):
+    """Every frame of the video, decoded one after the other."""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    assert len(frames) == FRAMES
+    return frames
+
+
+@pytest.mark.parametrize("seek_threshold", [300, 4])
+def test_sample_matches_a_sequential_decode(video_path, decoded, seek_threshold):
+    indices = [45, 3, 3, 17, 0, 59, 16, 100, -1, 30]
+    with FrameSampler(video_path, seek_threshold=seek_threshold) as sampler:
+        frames = list(sampler.sample(indices))
+
+    assert len(frames) == len(indices)
+    for index, frame in zip(indices, frames):
+        if 0 <= index < FRAMES:
+            assert np.array_equal(frame, decoded[index]), index
+        else:
+            assert frame is None
+
+
+@pytest.mark.parametrize(
+    "start, end, step", [(0, None, 1), (0, None, 7), (10, 40, 3), (50, 200, 4)]
+)
+def test_sample_range_matches_a_sequential_decode(
+    video_path, decoded, start, end, step
+):
+    with FrameSampler(video_path, seek_threshold=4) as sampler:
+        samples = list(sampler.sample_range(start, end, step))
+
+    expected = list(range(start, min(end or FRAMES, FRAMES), step))
+    assert [index for index, _ in samples] == expected
+    for index, frame in samples:
+        assert np.array_equal(frame, decoded[index]), index
+
+
+def test_sample_range_can_stop_early(video_path, decoded):
+    with FrameSampler(video_path) as sampler:
+        for index, frame in sampler.sample_range(0, None, 2):
+            if index == 20:
+                break
+        # The sampler is still usable after the consumer stopped
+        frame = next(sampler.sample([21]))
+    assert np.array_equal(frame, decoded[21])
+
+
+def test_frames_are_downscaled_to_max_width(video_path):
+    with FrameSampler(video_path, max_width=64) as sampler:
+        frame = next(sampler.sample([5]))
+    assert frame.shape == (48, 64, 3)
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code: str):
+    # A fresh interpreter, since the order of the imports is what's tested
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND, check=True)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import functions\n"
+        "from functions.trim.main import main\n"
+        "assert functions.trim is main",
+        "from functions.trim.main import main\n"
+        "import functions\n"
+        "assert functions.trim is main",
+        "import functions\n"
+        "function = functions.get('trim')\n"
+        "assert functions.trim is function",
+        "import functions\n"
+        "function = functions.trim\n"
+        "assert functions.get('trim') is function",
+        "import functions.trim\n"
+        "import functions\n"
+        "assert functions.trim is functions.get('trim')",
+    ],
+)
+def test_names_are_the_functions_in_any_import_order(code):
+    run(code)
+
+
+def test_importing_functions_is_lazy():
+    run(
+        "import sys, functions\n"
+        "assert 'functions.trim' not in sys.modules\n"
+        "assert 'numpy' not in sys.modules"
+    )
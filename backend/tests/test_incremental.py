@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from detectors.cursor_reference import CursorReference
+from incremental import LiveTranscript
+from utils.segmentation import topic_segments, window_similarities
+from utils.spans import SpanIndex
+
+TOPICS = [
+    "the dashboard shows revenue charts",
+    "our pricing plans include discounts",
+    "the mobile app syncs offline notes",
+]
+
+
+def transcript():
+    """Three topics of eight sentences, with clauses, and no final period."""
+    texts = []
+    for topic in TOPICS:
+        for i in range(8):
+            texts += f"Here {topic}, and {topic} again {i}.".split()
+        texts += "Click this button in the top right.".split()
+    texts += ["", "and", "that", "is", "all"]
+    return [
+        {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.mark.parametrize("increment", [1, 4, 13, 1000])
+def test_incremental_results_match_the_batch_ones(stub_model, increment):
+    words = transcript()
+    live = LiveTranscript(window_sentences=2)
+    for i in range(0, len(words), increment):
+        live.append(words[i : i + increment])
+    live.finish()
+
+    spans = SpanIndex(words)
+    assert live.sentences == spans.sentences
+    assert live.clauses == spans.clauses
+    assert live.trim() == {"start": words[0]["start"], "end": words[-1]["end"]}
+
+    batch = window_similarities(words, spans.sentences, 2)
+    assert np.allclose(live._similarities, batch, atol=1e-6)
+    segments = topic_segments(words, window_sentences=2, min_words=20, max_segments=5)
+    assert len(segments) > 1
+    assert live.chapter_candidates(min_words=20, max_chapters=5) == segments
+
+    matches = CursorReference().score_clauses(
+        [clause["text"] for clause in spans.clauses]
+    )
+    references = [
+        {**match, "start": clause["start"], "end": clause["end"]}
+        for clause, match in zip(spans.clauses, matches)
+        if match["is_reference"]
+    ]
+    assert references
+
+    # Similarities only differ in float rounding, with other batch sizes
+    def without_similarity(matches):
+        return [{**match, "similarity": None} for match in matches]
+
+    assert without_similarity(live.cursor_references) == without_similarity(references)
+    assert np.allclose(
+        [match["similarity"] for match in live.cursor_references],
+        [match["similarity"] for match in references],
+    )
+
+
+def test_the_context_reuses_the_incremental_results(stub_model):
+    words = transcript()
+    live = LiveTranscript(window_sentences=2)
+    live.append(words)
+
+    context = live.context()
+    encoded = len(stub_model.encoded)
+
+    assert context.sentences == SpanIndex(words).sentences
+    assert context.derived("chapter_segments", lambda: None) == (
+        live.chapter_candidates()
+    )
+    assert context.derived("cursor_references", lambda: None) == (
+        live.cursor_references
+    )
+    assert len(stub_model.encoded) == encoded
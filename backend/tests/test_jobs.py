@@ -0,0 +1,144 @@
+import json
+import time
+
+import pytest
+
+import jobs
+import pipeline
+
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": f"word{i}."}
+    for i in range(5)
+]
+
+STAGES = ("trim", "title", "summary", "chapters", "layout")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replaces every stage with a stub, and counts the calls of each."""
+    calls = {name: 0 for name in STAGES}
+
+    def stub(name):
+        def run(context):
+            calls[name] += 1
+            return f"{name} result"
+
+        return run
+
+    for name in STAGES:
+        monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, name, stub(name))
+    return calls
+
+
+@pytest.fixture
+def transcript_path(tmp_path):
+    path = tmp_path / "transcript.json"
+    path.write_text(json.dumps(TRANSCRIPT))
+    return str(path)
+
+
+def test_submitting_the_same_recording_twice_returns_the_same_job(
+    tmp_path, transcript_path
+):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    job_id = store.submit(transcript_path, options={"to_lang": "de"})
+
+    assert store.submit(transcript_path, options={"to_lang": "de"}) == job_id
+    assert store.submit(transcript_path, options={"to_lang": "fr"}) != job_id
+    assert len(store.recent()) == 2
+
+
+def test_a_resubmitted_job_only_reruns_its_failed_stages(
+    tmp_path, transcript_path, calls, monkeypatch
+):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    pool = jobs.WorkerPool(store)
+
+    def fail(context):
+        calls["title"] += 1
+        raise RuntimeError("no title")
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "title", fail)
+    job_id = store.submit(transcript_path)
+    pool.run_until_idle()
+
+    status = store.status(job_id)
+    assert status["status"] == "failed"
+    assert status["error"] == "title: no title"
+    assert status["stages"]["title"] == "failed"
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "title", lambda context: "title")
+    assert store.submit(transcript_path) == job_id
+    pool.run_until_idle()
+
+    assert store.status(job_id)["status"] == "done"
+    assert calls == {name: 1 for name in STAGES}
+    assert store.results(job_id)["title"] == "title"
+
+
+def test_a_job_whose_lease_ran_out_is_resumed_by_another_worker(
+    tmp_path, transcript_path, calls
+):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.1)
+    job_id = store.submit(transcript_path)
+
+    # A worker which claims the job, finishes one stage and dies
+    assert store.claim("dead")["id"] == job_id
+    assert store.record_stage(job_id, "dead", "trim", "trim result", None)
+    assert store.claim("other") is None
+    time.sleep(0.2)
+
+    pool = jobs.WorkerPool(store)
+    assert pool.run_one()
+
+    assert store.status(job_id)["status"] == "done"
+    assert calls["trim"] == 0
+    assert all(calls[name] == 1 for name in STAGES if name != "trim")
+
+
+def test_a_worker_which_lost_its_lease_leaves_the_job_to_the_new_one(
+    tmp_path, transcript_path
+):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.1)
+    job_id = store.submit(transcript_path)
+
+    store.claim("stale")
+    time.sleep(0.2)
+    assert store.claim("new")["id"] == job_id
+
+    assert store.record_stage(job_id, "new", "trim", "new result", None)
+    assert not store.record_stage(job_id, "stale", "trim", None, "late failure")
+    assert not store.record_stage(job_id, "stale", "title", "stale title", None)
+    assert store.results(job_id) == {"trim": "new result"}
+
+    assert not store.renew(job_id, "stale")
+    assert not store.finish(job_id, "stale", "failed", "gone")
+    assert store.status(job_id)["status"] == "running"
+
+    assert store.finish(job_id, "new", "done")
+    assert store.status(job_id)["status"] == "done"
+
+
+def test_run_until_idle_renews_the_lease_of_a_long_job(
+    tmp_path, transcript_path, calls, monkeypatch
+):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = jobs.JobStore(path, lease_seconds=0.3)
+    other = jobs.JobStore(path, lease_seconds=0.3)
+    claimed = []
+
+    def slow(context):
+        # Outlasts the lease several times while another process polls
+        for _ in range(10):
+            time.sleep(0.1)
+            claimed.append(other.claim("other"))
+        return "slow"
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "layout", slow)
+    job_id = store.submit(transcript_path)
+    jobs.WorkerPool(store).run_until_idle()
+
+    assert claimed == [None] * 10
+    assert store.status(job_id)["status"] == "done"
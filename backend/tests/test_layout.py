@@ -0,0 +1,113 @@
+import importlib
+import json
+import threading
+import time
+
+import pytest
+
+from utils import tracing
+
+# The module, since functions.layout is the function once it's been used
+layout = importlib.import_module("functions.layout.main")
+
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": f"word{i}."}
+    for i in range(50)
+]
+
+
+def test_unreadable_screen_video_keeps_the_search_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        layout,
+        "search_with_retries",
+        lambda transcript, query, timeout, retries: {"start": 10, "end": 58},
+    )
+    traces = tmp_path / "traces.jsonl"
+    tracing.configure("jsonl", str(traces))
+    try:
+        ranges = layout.main(
+            TRANSCRIPT, screen_video_path=str(tmp_path / "missing.mp4")
+        )
+    finally:
+        tracing.configure("off")
+
+    assert ranges == [{"start": 10, "end": 58}]
+    spans = [json.loads(line) for line in traces.read_text().splitlines()]
+    (span,) = [s for s in spans if s["name"] == "layout"]
+    assert span["error"].startswith("FileNotFoundError")
+    assert span["attributes"]["found"] == 1
+
+
+# Sentences of 25 words, long enough for the intro search plus one per chunk
+LONG_TRANSCRIPT = [
+    {
+        "id": str(i),
+        "start": i * 10,
+        "end": i * 10 + 8,
+        "text": f"word{i}." if i % 25 == 24 else f"word{i}",
+    }
+    for i in range(300)
+]
+
+
+def test_searches_run_concurrently_and_keep_their_order(monkeypatch):
+    chunks = [
+        chunk["transcript"]
+        for chunk in layout.chunk_transcript(LONG_TRANSCRIPT, duration=170, overlap=20)
+        if len(chunk["transcript"]) >= 20
+    ]
+    assert len(chunks) > 3
+    failing = (chunks[1][0]["start"], chunks[1][-1]["end"])
+
+    lock = threading.Lock()
+    in_flight = [0, 0]  # now, peak
+
+    def search(transcript, query, timeout, retries):
+        start, end = transcript[0]["start"], transcript[-1]["end"]
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        # Later sections finish first
+        time.sleep(0.1 - start / LONG_TRANSCRIPT[-1]["end"] * 0.08)
+        with lock:
+            in_flight[0] -= 1
+        if transcript is not LONG_TRANSCRIPT and (start, end) == failing:
+            raise RuntimeError("no answer")
+        return {"start": start, "end": end}
+
+    monkeypatch.setattr(layout, "search_with_retries", search)
+    ranges = layout.main(LONG_TRANSCRIPT, max_concurrency=3)
+
+    assert 1 < in_flight[1] <= 3
+    # The intro, then the chunks in transcript order, without the failed one
+    assert ranges == [{"start": 0, "end": LONG_TRANSCRIPT[-1]["end"]}] + [
+        {"start": chunk[0]["start"], "end": chunk[-1]["end"]}
+        for chunk in chunks
+        if (chunk[0]["start"], chunk[-1]["end"]) != failing
+    ]
+
+
+def test_failed_searches_are_retried_without_the_cache(monkeypatch):
+    calls = []
+
+    def search(transcript, query, timeout, use_cache):
+        calls.append((timeout, use_cache))
+        if len(calls) < 3:
+            raise ValueError("not found in the transcript")
+        return {"start": 0, "end": 8}
+
+    sleeps = []
+    monkeypatch.setattr(layout, "search_main", search)
+    monkeypatch.setattr(layout.time, "sleep", sleeps.append)
+
+    assert layout.search_with_retries(TRANSCRIPT, "query", 5, 2) == {
+        "start": 0,
+        "end": 8,
+    }
+    assert calls == [(5, True), (5, False), (5, False)]
+    assert sleeps == [0.5, 1.0]
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        layout.search_with_retries(TRANSCRIPT, "query", 5, 1)
+    assert len(calls) == 2
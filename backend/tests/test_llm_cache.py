@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm import completion
+from llm.cache import CompletionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_responses_persist_across_instances(tmp_path, clock):
+    path = str(tmp_path / "cache" / "llm.sqlite3")
+    CompletionCache(path, clock=clock).put("key", "response", 1.5)
+
+    cache = CompletionCache(path, clock=clock)
+    assert cache.get("key") == "response"
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 0,
+        "latency_saved": 1.5,
+        "entries": 1,
+    }
+
+
+def test_responses_expire_after_the_ttl(tmp_path, clock):
+    cache = CompletionCache(str(tmp_path / "llm.sqlite3"), ttl=60, clock=clock)
+    cache.put("key", "response", 1.0)
+
+    clock.now += 60
+    assert cache.get("key") == "response"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+    # Reading it again doesn't extend its life, only writing it does
+    cache.put("key", "fresh", 1.0)
+    clock.now += 30
+    assert cache.get("key") == "fresh"
+    clock.now += 31
+    assert cache.get("key") is None
+
+
+def test_the_least_recently_used_responses_are_evicted(tmp_path, clock):
+    cache = CompletionCache(str(tmp_path / "llm.sqlite3"), max_entries=3, clock=clock)
+    for key in ["a", "b", "c"]:
+        cache.put(key, key, 1.0)
+        clock.now += 1
+
+    # "a" is the oldest, but was just used
+    assert cache.get("a") == "a"
+    clock.now += 1
+    cache.put("d", "d", 1.0)
+
+    assert cache.stats()["entries"] == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ["a", "c", "d"]] == ["a", "c", "d"]
+
+    # Replacing an entry doesn't count as a new one
+    cache.put("d", "new d", 1.0)
+    assert cache.stats()["entries"] == 3
+    assert cache.get("c") == "c"
+
+
+def fake_client(content: str, finish_reason: str, calls: list):
+    def create(**kwargs):
+        calls.append(kwargs)
+        choice = SimpleNamespace(
+            message=SimpleNamespace(content=content), finish_reason=finish_reason
+        )
+        return SimpleNamespace(choices=[choice], usage=None)
+
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+
+@pytest.mark.parametrize(
+    "params, cached",
+    [
+        ({"max_tokens": 5}, True),
+        ({"max_tokens": 5, "response_format": {"type": "json_object"}}, False),
+    ],
+)
+def test_truncated_responses_are_only_cached_when_unstructured(
+    tmp_path, monkeypatch, params, cached
+):
+    cache = CompletionCache(str(tmp_path / "llm.sqlite3"))
+    calls = []
+    monkeypatch.setattr(completion, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(completion, "get_cache", lambda: cache)
+    monkeypatch.setattr(
+        completion, "get_client", lambda: fake_client('{"ans', "length", calls)
+    )
+    messages = [{"role": "user", "content": "Answer"}]
+
+    assert completion.complete(messages, **params) == '{"ans'
+    assert completion.complete(messages, **params) == '{"ans'
+    assert len(calls) == (1 if cached else 2)
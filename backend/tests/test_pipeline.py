@@ -0,0 +1,139 @@
+import json
+import threading
+
+import pytest
+
+import pipeline
+from pipeline import Pipeline, ProcessingContext, Stage
+
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+    for i, text in enumerate("Hello there. Next part.".split())
+]
+
+
+def test_stages_run_after_their_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, value, depends_on=()):
+        def run(context):
+            with lock:
+                order.append(name)
+            return value(context)
+
+        return Stage(name, run, depends_on)
+
+    # Listed before the stages they depend on
+    stages = [
+        stage(
+            "c", lambda context: context.results["a"] + context.results["b"], ("a", "b")
+        ),
+        stage("b", lambda context: context.results["a"] * 2, ("a",)),
+        stage("a", lambda context: 1),
+    ]
+    done = []
+    result = Pipeline(stages).run(
+        ProcessingContext(TRANSCRIPT),
+        on_stage_done=lambda *args: done.append(args[:3]),
+    )
+
+    assert order == ["a", "b", "c"]
+    assert result["results"] == {"a": 1, "b": 2, "c": 3}
+    assert result["errors"] == {}
+    assert set(result["timings"]) == {"a", "b", "c"}
+    assert done == [("a", 1, None), ("b", 2, None), ("c", 3, None)]
+
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+    stages = [Stage(name, lambda context: barrier.wait()) for name in "abc"]
+
+    result = Pipeline(stages).run(ProcessingContext(TRANSCRIPT), max_workers=3)
+    assert result["errors"] == {}
+
+
+def test_dependents_of_a_failed_stage_are_skipped():
+    def fail(context):
+        raise RuntimeError("no audio")
+
+    done = []
+    result = Pipeline(
+        [
+            Stage("a", fail),
+            Stage("b", lambda context: "b", depends_on=("a",)),
+            Stage("c", lambda context: "c", depends_on=("b",)),
+            Stage("d", lambda context: "d"),
+        ]
+    ).run(ProcessingContext(TRANSCRIPT), on_stage_done=lambda *args: done.append(args))
+
+    assert result["results"] == {"d": "d"}
+    assert result["errors"] == {
+        "a": "no audio",
+        "b": "Skipped, a failed",
+        "c": "Skipped, b failed",
+    }
+    # Skipped stages never ran
+    assert sorted(args[0] for args in done) == ["a", "d"]
+    assert [args[2] for args in done if args[0] == "a"] == ["no audio"]
+
+
+def test_cycles_are_skipped_and_unknown_dependencies_rejected():
+    result = Pipeline(
+        [
+            Stage("a", lambda context: "a"),
+            Stage("b", lambda context: "b", depends_on=("a", "c")),
+            Stage("c", lambda context: "c", depends_on=("b",)),
+        ]
+    ).run(ProcessingContext(TRANSCRIPT))
+
+    assert result["results"] == {"a": "a"}
+    assert result["errors"] == {
+        "b": "Skipped, circular dependency",
+        "c": "Skipped, circular dependency",
+    }
+
+    with pytest.raises(ValueError, match="unknown"):
+        Pipeline([Stage("a", lambda context: "a", depends_on=("missing",))])
+
+
+def test_derived_values_are_computed_once():
+    context = ProcessingContext(TRANSCRIPT)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    stages = [
+        Stage(name, lambda context: context.derived("shared", compute))
+        for name in "abcd"
+    ]
+    result = Pipeline(stages).run(context, max_workers=4)
+
+    assert set(result["results"].values()) == {"value"}
+    assert calls == [1]
+    assert context.text == "Hello there. Next part."
+    assert context.sentences == [{"start": 0, "end": 2}, {"start": 2, "end": 4}]
+
+
+def test_run_pipeline_loads_the_transcript_once(tmp_path, monkeypatch):
+    path = tmp_path / "transcript.json"
+    path.write_text(json.dumps(TRANSCRIPT))
+    seen = []
+    for name in pipeline.STAGE_FUNCTIONS:
+        monkeypatch.setitem(
+            pipeline.STAGE_FUNCTIONS,
+            name,
+            lambda context, name=name: seen.append((name, context)) or name,
+        )
+
+    result = pipeline.run_pipeline(str(path), options={"to_lang": "de"})
+
+    names = ["trim", "title", "summary", "chapters", "layout", "translate"]
+    assert sorted(result["results"]) == sorted(names)
+    assert len({id(context) for _, context in seen}) == 1
+    assert seen[0][1].transcript == TRANSCRIPT
+
+    result = pipeline.run_pipeline(str(path), screen_video_path="screen.mp4")
+    assert sorted(result["results"]) == sorted(names[:-1] + ["cursor"])
@@ -0,0 +1,116 @@
+import importlib
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+import llm
+from functions.search import retrieval
+from utils.general import linearize_transcript
+
+# The module, since functions.search is the function once it's been used
+search = importlib.import_module("functions.search.main")
+
+# 120 sentences of 8 words, no two sentences sharing a word
+SENTENCES = [[f"s{k}w{j}" for j in range(8)] for k in range(120)]
+TRANSCRIPT = [
+    {
+        "id": str(i),
+        "start": i * 10,
+        "end": i * 10 + 8,
+        "text": f"{word}." if j == 7 else word,
+    }
+    for i, (j, word) in enumerate(
+        (j, word) for sentence in SENTENCES for j, word in enumerate(sentence)
+    )
+]
+
+
+@pytest.fixture(autouse=True)
+def retrievers(stub_model, monkeypatch):
+    monkeypatch.setattr(retrieval, "_retrievers", OrderedDict())
+
+
+def sentence_range(k):
+    return 8 * k, 8 * (k + 1)
+
+
+def test_windows_overlap_and_cover_every_word():
+    retriever = retrieval.TranscriptRetriever(
+        TRANSCRIPT, window_sentences=3, max_window_words=20
+    )
+
+    covered = np.zeros(len(TRANSCRIPT), dtype=bool)
+    for window, text in zip(retriever.windows, retriever.texts):
+        assert 0 < window["end"] - window["start"] <= 20
+        assert text == linearize_transcript(TRANSCRIPT[window["start"] : window["end"]])
+        covered[window["start"] : window["end"]] = True
+    assert covered.all()
+
+    # With the default sizes, every pair of consecutive sentences is in a window
+    windows = retrieval.TranscriptRetriever(TRANSCRIPT).windows
+    for k in range(len(SENTENCES) - 1):
+        start, end = sentence_range(k)[0], sentence_range(k + 1)[1]
+        assert any(w["start"] <= start and end <= w["end"] for w in windows)
+
+
+def test_rank_returns_the_most_similar_windows_first(stub_model):
+    retriever = retrieval.TranscriptRetriever(TRANSCRIPT)
+    query = " ".join(SENTENCES[37])
+
+    ranked = retriever.rank(query, 4)
+
+    similarities = retriever.embeddings @ stub_model.encode([query])[0]
+    expected = np.argsort(-similarities)[:4]
+    assert [(w["start"], w["end"]) for w in ranked] == [
+        (retriever.windows[i]["start"], retriever.windows[i]["end"]) for i in expected
+    ]
+    assert [w["similarity"] for w in ranked] == sorted(
+        (w["similarity"] for w in ranked), reverse=True
+    )
+    start, end = sentence_range(37)
+    assert ranked[0]["start"] <= start and end <= ranked[0]["end"]
+    assert len(retriever.rank(query, 1000)) == len(retriever.windows)
+
+
+def test_retrievers_are_cached_per_transcript_content(stub_model):
+    retriever = retrieval.get_retriever(TRANSCRIPT)
+    encoded = len(stub_model.encoded)
+
+    assert retrieval.get_retriever([dict(word) for word in TRANSCRIPT]) is retriever
+    assert len(stub_model.encoded) == encoded
+
+    assert retrieval.get_retriever(TRANSCRIPT[:-8]) is not retriever
+
+
+def test_local_search_returns_the_best_window():
+    start, end = sentence_range(37)
+    result = search.main(TRANSCRIPT, " ".join(SENTENCES[37]), local=True)
+    assert result["start"] <= TRANSCRIPT[start]["start"]
+    assert TRANSCRIPT[end - 1]["end"] <= result["end"]
+
+
+def test_long_transcripts_only_send_the_top_windows(monkeypatch):
+    prompts = []
+
+    def complete(messages, **params):
+        prompts.append(messages[0]["content"])
+        return " ".join(SENTENCES[37])
+
+    monkeypatch.setattr(llm, "complete", complete)
+    assert len(TRANSCRIPT) > search.RETRIEVAL_TOP_K * search.RETRIEVAL_MAX_WINDOW_WORDS
+
+    result = search.main(TRANSCRIPT, " ".join(SENTENCES[37]))
+
+    # The answer is still located in the whole transcript
+    start, end = sentence_range(37)
+    assert result == {
+        "start": TRANSCRIPT[start]["start"],
+        "end": TRANSCRIPT[end - 1]["end"],
+    }
+    assert prompts[0].count("\n...\n") == search.RETRIEVAL_TOP_K - 1
+    assert len(prompts[0]) < len(linearize_transcript(TRANSCRIPT)) / 2
+
+    # With top_k=None, the whole transcript is sent
+    search.main(TRANSCRIPT, " ".join(SENTENCES[37]), top_k=None)
+    assert linearize_transcript(TRANSCRIPT) in prompts[1]
@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+import pytest
+
+from config.constants import FPS
+from detectors.scene_changes import index_video
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    """Four seconds of one slide, then four seconds of a very different one."""
+    path = str(tmp_path_factory.mktemp("video") / "screen.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (320, 180))
+    first = np.full((180, 320, 3), 230, np.uint8)
+    first[20:160:20, 20:300] = 20
+    second = np.full((180, 320, 3), 40, np.uint8)
+    second[30:150, 40:140] = 250
+    for i in range(80):
+        writer.write(first if i < 40 else second)
+    writer.release()
+    return path
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_finds_the_slide_change_across_shards(video_path, max_workers):
+    index = index_video(
+        video_path,
+        sample_interval=0.5,
+        shard_seconds=1.5,
+        max_workers=max_workers,
+        use_cache=False,
+    )
+
+    # Frame 40 of the 10 fps video, in transcript frames
+    assert index.changes() == [{"frame": round(40 * FPS / 10), "score": 1.0}]
@@ -0,0 +1,82 @@
+import importlib
+import json
+from types import SimpleNamespace
+
+import llm
+from llm import completion
+from llm.cache import CompletionCache
+
+# The module, since functions.search is the function once it's been used
+search = importlib.import_module("functions.search.main")
+
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+    for i, text in enumerate(
+        "Hi, I am Ada. Today we look at the new dashboard. "
+        "First open the settings page. Then save your changes.".split()
+    )
+]
+
+
+def test_truncated_answers_keep_the_complete_ones():
+    response = json.dumps(
+        {"answers": [{"query": 1, "text": "I am Ada."}, {"query": 2, "text": "x"}]}
+    )
+    # Cut off in the middle of the second answer
+    truncated = response[: response.index('"x"') + 1]
+    assert search.parse_answers(truncated, 2) == {0: "I am Ada."}
+    assert search.parse_answers("not json", 2) == {}
+
+
+def test_budget_fits_every_quote(monkeypatch):
+    requests = []
+
+    def complete(messages, **params):
+        requests.append(params)
+        return json.dumps(
+            {
+                "answers": [
+                    {"query": 1, "text": "I am Ada."},
+                    {"query": 2, "text": "open the settings page."},
+                ]
+            }
+        )
+
+    monkeypatch.setattr(llm, "complete", complete)
+    results = search.search_many(TRANSCRIPT, ["Who speaks?", "What to open?"])
+
+    assert requests[0]["max_tokens"] >= 2 * search.SEARCH_QUOTE_TOKENS
+    assert results == [{"start": 10, "end": 38}, {"start": 120, "end": 158}]
+
+
+def fake_client(content: str, finish_reason: str):
+    choice = SimpleNamespace(
+        message=SimpleNamespace(content=content), finish_reason=finish_reason
+    )
+    response = SimpleNamespace(choices=[choice], usage=None)
+    create = lambda **kwargs: response
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+
+def test_truncated_structured_responses_arent_cached(monkeypatch):
+    cache = CompletionCache(":memory:")
+    monkeypatch.setattr(completion, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(completion, "get_cache", lambda: cache)
+    messages = [{"role": "user", "content": "Quote it"}]
+    params = {"max_tokens": 5, "response_format": search.ANSWERS_FORMAT}
+
+    monkeypatch.setattr(
+        completion, "get_client", lambda: fake_client('{"ans', "length")
+    )
+    assert completion.complete(messages, **params) == '{"ans'
+    assert (
+        cache.get(CompletionCache.make_key("gpt-4o-mini", messages, **params)) is None
+    )
+
+    monkeypatch.setattr(completion, "get_client", lambda: fake_client("{}", "stop"))
+    completion.complete(messages, **params)
+    assert (
+        cache.get(CompletionCache.make_key("gpt-4o-mini", messages, **params)) == "{}"
+    )
@@ -0,0 +1,125 @@
+import random
+
+import numpy as np
+
+import llm
+from transcript_chapter_generator import generate_chapters
+from utils.general import linearize_transcript, sentence_ranges
+from utils.segmentation import (
+    depth_scores,
+    select_segments,
+    topic_segments,
+    window_similarities,
+)
+
+# Three topics of 12 sentences of 8 words, each topic with its own vocabulary
+TOPICS = [[f"t{topic}v{i}" for i in range(15)] for topic in range(3)]
+rng = random.Random(0)
+WORDS = []
+for vocabulary in TOPICS:
+    for _ in range(12):
+        sentence = rng.choices(vocabulary, k=8)
+        sentence[-1] += "."
+        WORDS.extend(sentence)
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+    for i, text in enumerate(WORDS)
+]
+TOPIC_WORDS = 12 * 8
+
+
+def test_window_similarities_compare_adjacent_windows(stub_model):
+    sentences = sentence_ranges(TRANSCRIPT)
+    similarities = window_similarities(TRANSCRIPT, sentences, 3)
+
+    def embed(first, last):
+        text = linearize_transcript(
+            TRANSCRIPT[sentences[first]["start"] : sentences[last]["end"]]
+        )
+        return stub_model.encode([text])[0]
+
+    assert len(similarities) == len(sentences) - 5
+    for gap, similarity in enumerate(similarities):
+        expected = embed(gap, gap + 2) @ embed(gap + 3, gap + 5)
+        assert np.isclose(similarity, expected, atol=1e-5)
+
+    assert len(window_similarities(TRANSCRIPT, sentences[:5], 3)) == 0
+
+
+def test_depth_scores_match_the_textbook_definition():
+    similarities = np.random.default_rng(1).random(30)
+    for radius in (1, 3):
+        expected = [
+            max(similarities[max(0, g - radius) : g + 1])
+            + max(similarities[g : g + radius + 1])
+            - 2 * similarities[g]
+            for g in range(len(similarities))
+        ]
+        assert np.allclose(depth_scores(similarities, radius), expected)
+
+
+def test_boundaries_fall_between_the_topics(stub_model):
+    expected = [
+        {"start": 0, "end": TOPIC_WORDS},
+        {"start": TOPIC_WORDS, "end": 2 * TOPIC_WORDS},
+        {"start": 2 * TOPIC_WORDS, "end": 3 * TOPIC_WORDS},
+    ]
+    assert topic_segments(TRANSCRIPT, min_words=50) == expected
+
+    # The deepest valleys, between the topics, are taken first
+    assert topic_segments(TRANSCRIPT, min_words=20, max_segments=3) == expected
+    first, second = topic_segments(TRANSCRIPT, min_words=20, max_segments=2)
+    assert first["end"] in (TOPIC_WORDS, 2 * TOPIC_WORDS)
+
+    assert topic_segments(TRANSCRIPT, min_words=200) == [
+        {"start": 0, "end": len(TRANSCRIPT)}
+    ]
+    assert topic_segments([]) == []
+
+
+def test_select_segments_keeps_segments_apart():
+    sentences = [{"start": 10 * i, "end": 10 * (i + 1)} for i in range(20)]
+    # A valley at every other gap
+    similarities = np.tile([1.0, 0.0], 7)
+
+    segments = select_segments(similarities, sentences, 200, 3, min_words=45)
+
+    assert len(segments) > 1
+    assert segments[0]["start"] == 0 and segments[-1]["end"] == 200
+    for segment in segments:
+        assert segment["end"] - segment["start"] >= 45
+        assert segment["start"] % 10 == 0
+    assert select_segments(similarities[:2], sentences, 200) == [
+        {"start": 0, "end": 200}
+    ]
+
+
+def test_chapters_are_titled_from_excerpts(stub_model, monkeypatch):
+    prompts = []
+
+    def complete(messages, **params):
+        prompts.append(messages[-1]["content"])
+        return "Chapter 1: First\nChapter 3: Third"
+
+    monkeypatch.setattr(llm, "complete", complete)
+    monkeypatch.setattr(
+        "transcript_chapter_generator.topic_segments",
+        lambda transcript, sentences, max_segments: topic_segments(
+            transcript, sentences, min_words=50, max_segments=max_segments
+        ),
+    )
+
+    chapters = generate_chapters(TRANSCRIPT)
+
+    assert [c["title"] for c in chapters] == ["First", "Chapter 2", "Third"]
+    assert [(c["start_word"], c["end_word"]) for c in chapters] == [
+        (0, TOPIC_WORDS),
+        (TOPIC_WORDS, 2 * TOPIC_WORDS),
+        (2 * TOPIC_WORDS, 3 * TOPIC_WORDS),
+    ]
+    assert chapters[1]["start"] == TRANSCRIPT[TOPIC_WORDS]["start"]
+    assert chapters[1]["end"] == TRANSCRIPT[2 * TOPIC_WORDS - 1]["end"]
+    # Only the opening words of each chapter are sent
+    assert len(prompts) == 1
+    assert TRANSCRIPT[TOPIC_WORDS]["text"] in prompts[0]
+    assert len(prompts[0].split()) < len(TRANSCRIPT)
@@ -0,0 +1,62 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import server
+
+TRANSCRIPT = [{"id": "0", "start": 0, "end": 10, "text": "Hello."}]
+
+
+@pytest.fixture
+def url():
+    worker = server.WorkerServer(("127.0.0.1", 0), max_concurrent=2)
+    threading.Thread(target=worker.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{worker.server_address[1]}"
+    worker.shutdown()
+    worker.server_close()
+
+
+def post(url: str, body: dict) -> tuple[int, dict]:
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"))
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_result_which_cant_be_serialized_is_a_500(url, monkeypatch):
+    monkeypatch.setattr(server, "run", lambda name, context, body: {1, 2})
+    status, body = post(f"{url}/title", {"transcript": TRANSCRIPT})
+    assert status == 500
+    assert "set" in body["error"]
+
+
+def test_numpy_results_are_serialized(url, monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(
+        server, "run", lambda name, context, body: {"start": np.int64(3)}
+    )
+    assert post(f"{url}/title", {"transcript": TRANSCRIPT}) == (
+        200,
+        {"result": {"start": 3}},
+    )
+
+
+@pytest.mark.parametrize(
+    "name, fields",
+    [
+        ("search", {"query": ["not", "a", "string"]}),
+        ("search_many", {"queries": "not a list"}),
+        ("search_many", {"queries": ["fine", 3]}),
+        ("title", {"options": "not an object"}),
+    ],
+)
+def test_fields_of_the_wrong_type_are_a_400(url, name, fields):
+    status, body = post(f"{url}/{name}", {"transcript": TRANSCRIPT, **fields})
+    assert status == 400
+    assert "must be" in body["error"]
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from utils.general import (
+    extend_to_complete_sentences,
+    linearize_transcript,
+    split_into_clauses,
+)
+from utils.spans import SpanIndex
+from utils.transcript_array import TranscriptArray
+
+HERE = os.path.dirname(__file__)
+TRANSCRIPTS = [
+    "transcript5.json",
+    "transcript6.json",
+    "0/transcript.json",
+    "0/transcript2.json",
+]
+
+
+def words(text: str) -> list[dict]:
+    return [
+        {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": word}
+        for i, word in enumerate(text.split(" "))
+    ]
+
+
+@pytest.fixture(scope="module", params=TRANSCRIPTS)
+def transcript(request):
+    with open(os.path.join(HERE, request.param)) as f:
+        return json.load(f)
+
+
+def test_extend_matches_the_word_by_word_extension(transcript):
+    spans = SpanIndex(transcript)
+    for start in range(len(transcript)):
+        for length in (0, 1, 4, 15):
+            word_range = {"start": start, "end": min(len(transcript), start + length)}
+            assert spans.extend_to_sentences(
+                word_range
+            ) == extend_to_complete_sentences(word_range, transcript), word_range
+
+
+def test_clauses_match_split_into_clauses(transcript):
+    clauses = SpanIndex(transcript).clauses
+    assert [clause["text"] for clause in clauses] == split_into_clauses(
+        linearize_transcript(transcript)
+    )
+    for clause in clauses:
+        assert clause["text"] == linearize_transcript(
+            transcript[clause["start"] : clause["end"]]
+        )
+
+
+def test_transcript_arrays_get_the_same_spans(transcript):
+    spans = SpanIndex(transcript)
+    array_spans = SpanIndex(TranscriptArray.from_words(transcript))
+    assert array_spans.sentences == spans.sentences
+    assert array_spans.clauses == spans.clauses
+
+
+def test_clauses_start_after_punctuation_and_at_conjunctions():
+    transcript = words("First, open it and click save but wait. Then order or cancel")
+    assert [clause["text"] for clause in SpanIndex(transcript).clauses] == [
+        "First,",
+        "open it",
+        "and click save",
+        "but wait.",
+        "Then order",
+        "or cancel",
+    ]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_extends_up_to_the_last_word(indexed):
+    # The last sentence has no punctuation; the extension used to stop one
+    # word before the end of the transcript
+    transcript = words("Open the page. Then click the button")
+    spans = SpanIndex(transcript) if indexed else None
+    assert extend_to_complete_sentences({"start": 4, "end": 5}, transcript, spans) == {
+        "start": 3,
+        "end": 7,
+    }
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_words_without_text_are_allowed(indexed):
+    transcript = words("Open the page. . Then click the button.")
+    transcript[1]["text"] = ""
+    transcript[5]["text"] = ""
+    spans = SpanIndex(transcript) if indexed else None
+    assert extend_to_complete_sentences({"start": 1, "end": 2}, transcript, spans) == {
+        "start": 0,
+        "end": 3,
+    }
+    assert extend_to_complete_sentences({"start": 5, "end": 6}, transcript, spans) == {
+        "start": 4,
+        "end": 8,
+    }
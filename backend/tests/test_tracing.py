@@ -0,0 +1,97 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from utils import tracing
+
+
+@pytest.fixture(autouse=True)
+def tracing_off():
+    yield
+    tracing.configure("off")
+
+
+@tracing.traced("outer")
+def outer(fail=False):
+    tracing.current().set(words=3)
+    with tracing.span("inner", cache="hit"):
+        pass
+    # Spans started on another thread in a copy of the context nest here too
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(inner_on_thread,))
+    thread.start()
+    thread.join()
+    if fail:
+        raise ValueError("bad input")
+    return "done"
+
+
+def inner_on_thread():
+    with tracing.span("thread", frames=10) as span:
+        span.fail(RuntimeError("handled"))
+
+
+def read_spans(path):
+    return {
+        span["name"]: span for span in map(json.loads, path.read_text().splitlines())
+    }
+
+
+def test_off_records_nothing():
+    tracing.configure("off")
+    assert tracing.span("anything", a=1) is tracing._NOOP
+    assert tracing.current() is tracing._NOOP
+    assert outer() == "done"
+    assert tracing.render_prometheus() == ""
+
+
+def test_jsonl_spans_are_nested(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("jsonl", str(path))
+    outer()
+    tracing.configure("off")
+
+    spans = read_spans(path)
+    assert spans["outer"]["parent_id"] is None
+    assert spans["outer"]["attributes"] == {"words": 3}
+    assert spans["outer"]["error"] is None
+    for name in ("inner", "thread"):
+        assert spans[name]["parent_id"] == spans["outer"]["span_id"]
+        assert spans[name]["trace_id"] == spans["outer"]["trace_id"]
+        assert 0 <= spans[name]["duration"] <= spans["outer"]["duration"]
+    assert spans["inner"]["attributes"] == {"cache": "hit"}
+    assert spans["thread"]["error"] == "RuntimeError: handled"
+
+
+def test_jsonl_records_exceptions(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("jsonl", str(path))
+    with pytest.raises(ValueError):
+        outer(fail=True)
+    tracing.configure("off")
+
+    assert read_spans(path)["outer"]["error"] == "ValueError: bad input"
+
+
+def test_prometheus_aggregates_per_span(tmp_path):
+    tracing.configure("prometheus")
+    outer()
+    with pytest.raises(ValueError):
+        outer(fail=True)
+
+    metrics = tracing.render_prometheus()
+    assert 'span_calls_total{span="outer"} 2' in metrics
+    assert 'span_errors_total{span="outer"} 1' in metrics
+    assert 'span_errors_total{span="thread"} 2' in metrics
+    assert 'span_attribute_total{span="outer",attribute="words"} 6' in metrics
+    assert 'span_attribute_total{span="thread",attribute="frames"} 20' in metrics
+    assert 'span_outcome_total{span="inner",attribute="cache",value="hit"} 2' in metrics
+
+    # With a path, the metrics are written when the output is switched
+    path = tmp_path / "metrics.prom"
+    tracing.configure("prometheus", str(path))
+    outer()
+    tracing.configure("off")
+    assert 'span_calls_total{span="outer"} 1' in path.read_text()
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils.general import load_transcript
+from utils.transcript_array import TranscriptArray
+
+HERE = os.path.dirname(__file__)
+
+
+def real_transcript():
+    with open(os.path.join(HERE, "transcript5.json")) as f:
+        return json.load(f)
+
+
+def edited_transcript():
+    """Non-uuid ids, empty and non-ASCII texts, and repeated words."""
+    texts = ["Hello", "", "wörld", "—", "", "Hello", "日本語", "end."]
+    return [
+        {"id": f"w{i}", "start": i * 7, "end": i * 7 + 5, "text": text}
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.mark.parametrize("make", [real_transcript, edited_transcript])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load_round_trips_every_word(tmp_path, make, mmap):
+    words = make()
+    # The real transcript has no empty words, so add one
+    words.insert(3, {**words[3], "text": ""})
+    path = str(tmp_path / "transcript.bin")
+
+    TranscriptArray.from_words(words).save(path)
+    loaded = TranscriptArray.load(path, mmap=mmap)
+
+    assert isinstance(loaded.starts, np.memmap) == mmap
+    assert len(loaded) == len(words)
+    assert loaded.to_words() == words
+    assert [loaded[i] for i in range(len(words))] == words
+    assert loaded.texts == [word["text"] for word in words]
+
+
+def test_load_transcript_reads_both_formats(tmp_path):
+    words = edited_transcript()
+    json_path = str(tmp_path / "transcript.json")
+    bin_path = str(tmp_path / "transcript.bin")
+    with open(json_path, "w") as f:
+        json.dump(words, f)
+    TranscriptArray.from_json(json_path).save(bin_path)
+
+    assert load_transcript(json_path) == words
+    assert list(load_transcript(bin_path)) == words
+
+
+def test_slices_round_trip(tmp_path):
+    words = real_transcript()
+    path = str(tmp_path / "slice.bin")
+
+    TranscriptArray.from_words(words)[100:250].save(path)
+
+    assert TranscriptArray.load(path).to_words() == words[100:250]
+
+
+def test_empty_transcript_round_trips(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    TranscriptArray.from_words([]).save(path)
+    assert TranscriptArray.load(path).to_words() == []
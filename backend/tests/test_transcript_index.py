@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+from utils import transcript_index
+from utils.general import find_transcript_segment
+from utils.transcript_index import TranscriptIndex, get_index
+
+TEXT = "So today we look at the new dashboard. Then we look at the settings page."
+TRANSCRIPT = [
+    {"id": str(i), "start": i * 10, "end": i * 10 + 8, "text": text}
+    for i, text in enumerate(TEXT.split())
+]
+
+
+def test_find_transcript_segment_builds_the_index_once(monkeypatch):
+    built = []
+
+    class CountingIndex(TranscriptIndex):
+        def __init__(self, transcript, **kwargs):
+            built.append(transcript)
+            super().__init__(transcript, **kwargs)
+
+    monkeypatch.setattr(transcript_index, "TranscriptIndex", CountingIndex)
+    monkeypatch.setattr(transcript_index, "_indexes", OrderedDict())
+
+    transcript = [dict(word) for word in TRANSCRIPT]
+    assert find_transcript_segment("the new dashboard", transcript)["id"] == "5"
+    assert find_transcript_segment("the settings page", transcript)["id"] == "12"
+    assert find_transcript_segment("we look at", transcript, hint=10)["id"] == "9"
+    # An equal copy of the transcript shares the index
+    assert find_transcript_segment("today we look", list(transcript))["id"] == "1"
+    assert len(built) == 1
+
+
+def test_get_index_rebuilds_for_changed_text():
+    edited = [dict(word) for word in TRANSCRIPT]
+    edited[6]["text"] = "old"
+
+    assert get_index(TRANSCRIPT) is get_index([dict(w) for w in TRANSCRIPT])
+    assert get_index(edited) is not get_index(TRANSCRIPT)
+    assert get_index(edited).find_all("the old dashboard") == [5]
+    assert get_index(TRANSCRIPT).find_all("the old dashboard") == []
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import transcript_summary
+from utils import tracing
+
+
+def make_transcript(words: int) -> list[dict]:
+    # 150 words per minute at 30 fps, one sentence every 10 words
+    return [
+        {
+            "id": str(i),
+            "start": i * 12,
+            "end": i * 12 + 10,
+            "text": f"word{i}." if i % 10 == 9 else f"word{i}",
+        }
+        for i in range(words)
+    ]
+
+
+@pytest.fixture
+def finished_spans(tmp_path):
+    """Records spans while the test runs, and returns those finished so far."""
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("jsonl", str(path))
+
+    def finished():
+        tracing.configure("off")
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    yield finished
+    tracing.configure("off")
+
+
+@pytest.fixture
+def fake_summarize(monkeypatch):
+    def summarize(prompt, text, max_tokens=150):
+        with tracing.span("fake.summarize"):
+            return f"summary of {len(text.split())} words"
+
+    monkeypatch.setattr(transcript_summary, "_summarize", summarize)
+
+
+def test_map_reduce_span_records_success(finished_spans, fake_summarize):
+    summary = transcript_summary.generate_summary(
+        make_transcript(6000), hierarchical=True
+    )
+    assert summary.startswith("summary of")
+    assert tracing.current() is tracing._NOOP
+
+    spans = finished_spans()
+    (map_reduce,) = [s for s in spans if s["name"] == "summary.map_reduce"]
+    assert map_reduce["error"] is None
+    assert map_reduce["attributes"]["levels"] == 2
+    requests = [s for s in spans if s["name"] == "fake.summarize"]
+    assert len(requests) == map_reduce["attributes"]["chunks"] + 1
+    assert all(s["parent_id"] == map_reduce["span_id"] for s in requests)
+
+
+def test_span_is_not_current_while_suspended(finished_spans, fake_summarize):
+    partials = transcript_summary.iter_summary(make_transcript(6000))
+    next(partials)
+    assert tracing.current() is tracing._NOOP
+
+    # Stopping early is recorded as cancelled, not as an error
+    partials.close()
+    spans = finished_spans()
+    (map_reduce,) = [s for s in spans if s["name"] == "summary.map_reduce"]
+    assert map_reduce["error"] is None
+    assert map_reduce["attributes"]["cancelled"] is True
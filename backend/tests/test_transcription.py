@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import pytest
+
+from config.constants import FPS
+from transcription import (
+    FakeBackend,
+    TranscriptionBackend,
+    transcribe,
+    transcribe_many,
+)
+
+WORDS = [
+    {"start": 0, "end": 500, "text": "Hello"},
+    {"start": 1000, "end": 1500, "text": "there."},
+]
+
+
+class FailingBackend(FakeBackend):
+    def poll(self, job_id):
+        return {"status": "error", "error": "bad audio"}
+
+
+def test_an_incomplete_backend_fails_when_created():
+    class SubmitOnly(TranscriptionBackend):
+        def submit(self, audio_path):
+            return "job"
+
+    with pytest.raises(TypeError):
+        SubmitOnly()
+
+
+def test_words_are_written_with_frame_timings(tmp_path):
+    backend = FakeBackend({"a.mp3": WORDS}, polls=3)
+    output_path = tmp_path / "out" / "a.json"
+
+    result = asyncio.run(transcribe("a.mp3", str(output_path), backend, 0))
+
+    assert result == {
+        "audio_path": "a.mp3",
+        "output_path": str(output_path),
+        "words": 2,
+    }
+    words = json.loads(output_path.read_text())
+    assert [(word["start"], word["end"], word["text"]) for word in words] == [
+        (0, round(0.5 * FPS), "Hello"),
+        (FPS, round(1.5 * FPS), "there."),
+    ]
+    assert not (tmp_path / "out" / "a.json.tmp").exists()
+
+
+def test_failed_jobs_write_nothing(tmp_path):
+    output_path = tmp_path / "a.json"
+
+    result = asyncio.run(
+        transcribe("a.mp3", str(output_path), FailingBackend({"a.mp3": WORDS}), 0)
+    )
+    assert result["error"] == "Transcription failed: bad audio"
+
+    result = asyncio.run(
+        transcribe("a.mp3", str(output_path), FakeBackend({"a.mp3": []}), 0)
+    )
+    assert result["error"] == "No words found in audio"
+    assert not output_path.exists()
+
+
+def test_many_jobs_keep_their_order_and_fail_separately(tmp_path):
+    backend = FakeBackend({f"{i}.mp3": WORDS[: i % 2 + 1] for i in range(5)}, polls=2)
+    jobs = [(f"{i}.mp3", str(tmp_path / f"{i}.json")) for i in range(6)]
+
+    results = asyncio.run(
+        transcribe_many(jobs, backend, concurrency=2, poll_interval=0)
+    )
+
+    assert [result["audio_path"] for result in results] == [
+        audio_path for audio_path, _ in jobs
+    ]
+    assert [result["words"] for result in results[:5]] == [1, 2, 1, 2, 1]
+    # The missing file fails on its own
+    assert "error" in results[5]
+    assert not any("error" in result for result in results[:5])
@@ -0,0 +1,112 @@
+import importlib
+import threading
+
+import pytest
+
+from functions.translate.backends import FallbackBackend, TranslationBackend
+
+# The module, since functions.translate is the function once it's been used
+translate_module = importlib.import_module("functions.translate.main")
+
+
+class UpperBackend(TranslationBackend):
+    """Translates by upper-casing each line, and records every request."""
+
+    def __init__(self, max_chars=40):
+        self.max_chars = max_chars
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def translate(self, text, from_lang, to_lang):
+        with self._lock:
+            self.requests.append(text)
+        return "\n".join(line.upper() for line in text.split("\n"))
+
+
+class MergingBackend(UpperBackend):
+    """Joins the lines of a multi-line request, as real services sometimes do."""
+
+    def translate(self, text, from_lang, to_lang):
+        return super().translate(text, from_lang, to_lang).replace("\n", " ")
+
+
+class FailingBackend(TranslationBackend):
+    def translate(self, text, from_lang, to_lang):
+        raise RuntimeError("unavailable")
+
+
+SENTENCES = [f"sentence number {i}." for i in range(10)]
+
+
+def test_an_incomplete_backend_fails_when_created():
+    class NoTranslate(TranslationBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        NoTranslate()
+
+
+def test_batches_fit_in_max_chars():
+    batches = translate_module.make_batches(SENTENCES, 40)
+    assert [i for batch in batches for i in batch] == list(range(10))
+    for batch in batches:
+        assert len("\n".join(SENTENCES[i] for i in batch)) <= 40
+
+    # A text longer than the limit still gets a batch of its own
+    assert translate_module.make_batches(["x" * 50, "y"], 40) == [[0], [1]]
+
+
+def test_sentences_are_translated_in_batches():
+    backend = UpperBackend()
+    result = translate_module.translate_sentences(
+        SENTENCES, "en", "de", backend, max_concurrency=3
+    )
+
+    assert result == [sentence.upper() for sentence in SENTENCES]
+    assert len(backend.requests) == len(translate_module.make_batches(SENTENCES, 40))
+    assert all("\n" in request for request in backend.requests)
+
+
+def test_merged_lines_fall_back_to_one_request_per_sentence():
+    backend = MergingBackend()
+    result = translate_module.translate_sentences(SENTENCES, "en", "de", backend)
+
+    assert result == [sentence.upper() for sentence in SENTENCES]
+    # Each sentence was retried on its own
+    assert sorted(r for r in backend.requests if "\n" not in r) == sorted(SENTENCES)
+
+
+def test_line_breaks_inside_a_sentence_are_removed():
+    backend = UpperBackend()
+    result = translate_module.translate_sentences(
+        ["two\nlines", "one line"], "en", "de", backend
+    )
+    assert result == ["TWO LINES", "ONE LINE"]
+
+
+def test_translated_words_keep_the_sentence_timings():
+    transcript = [
+        {"id": "0", "start": 0, "end": 10, "text": "Hello"},
+        {"id": "1", "start": 10, "end": 20, "text": "world."},
+        {"id": "2", "start": 30, "end": 40, "text": "Bye."},
+    ]
+    result = translate_module.translate_transcript(
+        transcript, "en", "de", UpperBackend()
+    )
+    assert result == [
+        {"id": "0", "start": 0, "end": 10, "text": "HELLO"},
+        {"id": "1", "start": 10, "end": 20, "text": "WORLD."},
+        {"id": "2", "start": 30, "end": 40, "text": "BYE."},
+    ]
+
+
+def test_fallback_tries_the_next_backend():
+    upper = UpperBackend(max_chars=100)
+    backend = FallbackBackend([FailingBackend(), upper])
+
+    assert backend.max_chars == min(TranslationBackend.max_chars, 100)
+    assert backend.translate("hi", "en", "de") == "HI"
+    assert upper.requests == ["hi"]
+
+    with pytest.raises(Exception, match="All translation methods failed"):
+        FallbackBackend([FailingBackend()]).translate("hi", "en", "de")
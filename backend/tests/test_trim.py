@@ -0,0 +1,92 @@
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+from functions.trim.main import main as trim
+from functions.trim.silence import read_audio_blocks
+from utils.transcript_array import TranscriptArray
+
+# The module, since functions.trim is the function once it's been used
+trim_module = importlib.import_module("functions.trim.main")
+
+# Two sentences with a three second pause between them, at 30 fps
+TRANSCRIPT = [
+    {"id": "0", "start": 30, "end": 45, "text": "Hello"},
+    {"id": "1", "start": 50, "end": 70, "text": "there."},
+    {"id": "2", "start": 160, "end": 175, "text": "Next"},
+    {"id": "3", "start": 180, "end": 200, "text": "part."},
+]
+
+
+def test_without_audio_only_the_outer_range_is_trimmed(tmp_path):
+    for path in [None, str(tmp_path / "missing.mp4")]:
+        result = trim(TRANSCRIPT, path)
+        assert result == {"start": 30, "end": 200, "silences": []}
+
+
+def test_unreadable_audio_finds_no_silences(tmp_path, monkeypatch):
+    video = tmp_path / "camera_video.mp4"
+    video.write_bytes(b"not a video")
+
+    def fail(path):
+        raise RuntimeError("no audio track")
+
+    monkeypatch.setattr(trim_module, "read_audio_blocks", fail)
+    result = trim(TranscriptArray.from_words(TRANSCRIPT), str(video))
+    assert result["silences"] == []
+
+
+def test_silent_audio_between_words_is_cut(tmp_path, monkeypatch):
+    video = tmp_path / "camera_video.mp4"
+    video.write_bytes(b"")
+
+    # Loud while speaking, silent in the pause
+    levels = np.full(230, -20.0)
+    levels[75:155] = -80.0
+    monkeypatch.setattr(
+        trim_module, "frame_levels", lambda blocks: levels.astype(np.float32)
+    )
+    monkeypatch.setattr(trim_module, "read_audio_blocks", lambda path: iter(()))
+    result = trim(TRANSCRIPT, str(video))
+    assert len(result["silences"]) == 1
+    assert 70 <= result["silences"][0]["start"] < result["silences"][0]["end"] <= 160
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Puts an `ffmpeg` on the PATH which runs the given shell script."""
+
+    def install(script: str):
+        path = tmp_path / "bin" / "ffmpeg"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"#!/bin/sh\n{script}\n")
+        path.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{path.parent}{os.pathsep}{os.environ['PATH']}")
+
+    return install
+
+
+def test_a_decode_failing_midway_raises(fake_ffmpeg):
+    # One second of samples, then an error a moment after the output ends
+    fake_ffmpeg(
+        "head -c 32000 /dev/zero; exec 1>&-; sleep 0.2;"
+        " echo 'corrupt packet' >&2; exit 1"
+    )
+    blocks = read_audio_blocks("camera_video.mp4", 16000, block_seconds=0.5)
+    with pytest.raises(RuntimeError, match="corrupt packet"):
+        list(blocks)
+
+
+def test_a_complete_decode_yields_every_sample(fake_ffmpeg):
+    fake_ffmpeg("head -c 32000 /dev/zero")
+    blocks = list(read_audio_blocks("camera_video.mp4", 16000, block_seconds=0.25))
+    assert sum(len(block) for block in blocks) == 16000
+
+
+def test_stopping_early_stops_ffmpeg(fake_ffmpeg):
+    fake_ffmpeg("exec cat /dev/zero")
+    blocks = read_audio_blocks("camera_video.mp4", 16000, block_seconds=0.5)
+    assert len(next(blocks)) == 8000
+    blocks.close()
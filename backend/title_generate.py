@@ -1,16 +1,14 @@
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import llm
 from utils.general import get_transcript_words
 
 def generate_title(transcript_path: str) -> str:
-    load_dotenv(override=True)
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
     with open(transcript_path, 'r') as f:
         transcript = json.load(f)
 
+    return generate_title_from_transcript(transcript)
+
+def generate_title_from_transcript(transcript) -> str:
     text = get_transcript_words(transcript, 200)  # Configurable word count
 
     prompt = f"""TRANSCRIPT EXCERPT:
@@ -22,14 +20,14 @@ The title should be clear and descriptive.
 Only return the title, nothing else.
 """
 
-    response = client.chat.completions.create(
+    response = llm.complete(
+        [{"role": "user", "content": prompt}],
         model="gpt-4o-mini",
         temperature=0.7,
         max_tokens=20,
-        messages=[{"role": "user", "content": prompt}]
     )
     
-    title = response.choices[0].message.content.strip()
+    title = response.strip()
     return title
 
 if __name__ == "__main__":
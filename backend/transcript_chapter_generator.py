@@ -1,69 +1,101 @@
-import openai
+import re
+import llm
 from typing import List, Dict
+import custom_types
+from config.constants import CHAPTER_MAX_CHAPTERS, CHAPTER_EXCERPT_WORDS
+from utils import tracing
+from utils.segmentation import topic_segments
 
-def get_full_text(transcript: List[Dict]) -> str:
-    """Combines all transcript segments into single text"""
-    return " ".join(segment["text"] for segment in transcript)
 
-def get_chapters_from_gpt(text: str) -> List[Dict]:
-    """Uses GPT to identify natural chapter breaks and titles"""
+def get_excerpt(
+    transcript: List[Dict],
+    segment: custom_types.Range,
+    max_words: int = CHAPTER_EXCERPT_WORDS,
+) -> str:
+    """The opening words of a segment"""
+    end = min(segment["end"], segment["start"] + max_words)
+    return " ".join(transcript[i]["text"] for i in range(segment["start"], end))
+
+
+def get_titles_from_gpt(excerpts: List[str]) -> List[str]:
+    """Uses GPT to give a short title to each chapter, from its opening words"""
+    chapters = "\n\n".join(
+        f'Chapter {i + 1}: "{excerpt} ..."' for i, excerpt in enumerate(excerpts)
+    )
     prompt = """
-    This is a transcript of a video. Please identify 3-5 main chapters/segments and their titles.
-    For each chapter provide:
-    1. A short title (max 5 words)
-    2. The starting words of that segment
-    
+    These are the opening words of each chapter of a video transcript.
+    Give every chapter a short title (max 5 words).
+
     Format your response exactly like this:
     Chapter 1: <title>
-    Starts with: "<first few words>"
-    
     Chapter 2: <title>
-    Starts with: "<first few words>"
     """
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that analyzes video transcripts."},
-            {"role": "user", "content": f"{text}\n\n{prompt}"}
-        ]
+
+    response = llm.complete(
+        [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that analyzes video transcripts.",
+            },
+            {"role": "user", "content": f"{chapters}\n\n{prompt}"},
+        ],
+        model="gpt-4o-mini",
     )
-    return parse_gpt_response(response.choices[0].message.content)
-
-def find_start_index(transcript: List[Dict], starting_words: str) -> int:
-    """Finds the start index in transcript where the given words appear"""
-    for segment in transcript:
-        if segment["text"].strip() in starting_words:
-            return segment["start"]
-    return 0
-
-def generate_chapters(transcript: List[Dict]) -> List[Dict]:
-    """Main function to generate chapters"""
-    full_text = get_full_text(transcript)
-    gpt_chapters = get_chapters_from_gpt(full_text)
-    
-    chapters = []
-    for i, chapter in enumerate(gpt_chapters):
-        start = find_start_index(transcript, chapter["starting_words"])
-        # End is either next chapter's start or end of transcript
-        end = gpt_chapters[i+1]["start"] if i < len(gpt_chapters)-1 else transcript[-1]["end"]
-        
-        chapters.append({
-            "start": start,
-            "end": end,
-            "title": chapter["title"]
-        })
-    
-    return chapters
+    return parse_gpt_response(response, len(excerpts))
+
+
+def parse_gpt_response(response: str, count: int) -> List[str]:
+    """Parses the "Chapter N: <title>" lines from the GPT response, with a default for missing titles"""
+    titles = {
+        int(number): title.strip().strip('"')
+        for number, title in re.findall(r"Chapter\s*(\d+):\s*(.+)", response)
+    }
+    return [titles.get(i + 1) or f"Chapter {i + 1}" for i in range(count)]
+
+
+def generate_chapters(
+    transcript: List[Dict],
+    sentences: List[custom_types.Range] = None,
+    max_chapters: int = CHAPTER_MAX_CHAPTERS,
+    segments: List[custom_types.Range] = None,
+) -> List[custom_types.Chapter]:
+    """
+    Main function to generate chapters
+
+    The chapters are found locally (see utils.segmentation.topic_segments), so
+    their boundaries are exact word indices. The LLM is only asked for titles,
+    from a short excerpt of each chapter. Chapter word ranges which were already
+    found (e.g. by incremental.LiveTranscript) can be passed as `segments`.
+    """
+    if not transcript:
+        return []
+
+    with tracing.span("chapters", words=len(transcript)) as span:
+        if segments is None:
+            segments = topic_segments(transcript, sentences, max_segments=max_chapters)
+        span.set(chapters=len(segments))
+
+        titles = get_titles_from_gpt(
+            [get_excerpt(transcript, segment) for segment in segments]
+        )
+
+    return [
+        {
+            "start": transcript[segment["start"]]["start"],
+            "end": transcript[segment["end"] - 1]["end"],
+            "title": title,
+            "start_word": segment["start"],
+            "end_word": segment["end"],
+        }
+        for segment, title in zip(segments, titles)
+    ]
+
 
 if __name__ == "__main__":
     import json
-    import os
-    
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    
+
     with open("tests/transcript5.json", "r") as f:
         transcript = json.load(f)
-    
+
     chapters = generate_chapters(transcript)
-    print(json.dumps(chapters, indent=2))
\ No newline at end of file
+    print(json.dumps(chapters, indent=2))
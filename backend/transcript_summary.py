@@ -1,39 +1,170 @@
-from typing import List, Dict
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from typing import List, Dict, Iterator
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+import custom_types
+import llm
+from config.constants import (
+    SUMMARY_SINGLE_CALL_WORDS,
+    SUMMARY_CHUNK_DURATION,
+    SUMMARY_REDUCE_FAN_IN,
+    SUMMARY_CONCURRENCY,
+)
+from utils import tracing
+from utils.general import chunk_transcript, linearize_transcript
 
-# Load environment variables from .env file
-load_dotenv()
+SUMMARY_PROMPT = (
+    "Generate a concise summary (about 50 words) of the following transcript:"
+)
+CHUNK_PROMPT = (
+    "Summarize the following section of a longer transcript in about 80 words. "
+    "Keep the names, numbers and topics that matter:"
+)
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive sections of a transcript, in order. "
+    "Combine them into one summary of about 80 words:"
+)
+FINAL_REDUCE_PROMPT = (
+    "The following are summaries of consecutive sections of a transcript, in order. "
+    "Generate a concise summary (about 50 words) of the whole transcript:"
+)
 
-def generate_summary(transcript: List[Dict]) -> str:
-    """Generate a concise summary (~100 words) of the transcript content"""
+
+def _summarize(prompt: str, text: str, max_tokens: int = 150) -> str:
+    return llm.complete(
+        [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": text},
+        ],
+        model="gpt-4o-mini",
+        max_tokens=max_tokens,
+    )
+
+
+def iter_summary(
+    transcript: List[Dict],
+    max_concurrency: int = SUMMARY_CONCURRENCY,
+    fan_in: int = SUMMARY_REDUCE_FAN_IN,
+    chunk_duration: int = SUMMARY_CHUNK_DURATION,
+) -> Iterator[custom_types.PartialSummary]:
+    """
+    Summarizes a transcript with map-reduce, yielding partial summaries as soon
+    as they are ready.
+
+    The transcript is split into chunks which are summarized concurrently (level
+    0). Then groups of up to `fan_in` consecutive summaries are combined, round
+    after round, until a single summary is left, which is yielded last with
+    `final` set. The latency is one request per level, and the number of levels
+    only grows logarithmically with the transcript length.
+
+    Parameters:
+    transcript (Transcript): The transcript to summarize.
+    max_concurrency (int): Maximum number of requests in flight at once.
+    fan_in (int): Maximum number of summaries combined by one reduce request.
+    chunk_duration (int): Length of each chunk in frames.
+
+    Returns:
+    Iterator[PartialSummary]: Partial summaries in completion order, ending
+                              with the final summary.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    texts = [
+        linearize_transcript(chunk["transcript"])
+        for chunk in chunk_transcript(transcript, duration=chunk_duration)
+    ]
+
+    span = tracing.span("summary.map_reduce", words=len(transcript), chunks=len(texts))
+    # The span is entered in a context of its own, so it doesn't become the
+    # caller's current span while this generator is suspended at a yield
+    span_context = contextvars.copy_context()
+    span_context.run(span.__enter__)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    error = None
     try:
-        # Get API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        level = 0
+        while True:
+            if level == 0:
+                final = len(texts) == 1
+                prompt = SUMMARY_PROMPT if final else CHUNK_PROMPT
+                inputs = texts
+            else:
+                final = len(texts) <= fan_in
+                prompt = FINAL_REDUCE_PROMPT if final else REDUCE_PROMPT
+                inputs = [
+                    "\n\n".join(texts[i : i + fan_in])
+                    for i in range(0, len(texts), fan_in)
+                ]
+
+            # Each request runs in a copy of the span's context, so its spans
+            # are nested under this one
+            futures = {
+                executor.submit(
+                    span_context.copy().run,
+                    _summarize,
+                    prompt,
+                    text,
+                    150 if final else 200,
+                ): i
+                for i, text in enumerate(inputs)
+            }
+
+            summaries = [None] * len(inputs)
+            for future in as_completed(futures):
+                i = futures[future]
+                summaries[i] = future.result()
+                if final:
+                    span.set(levels=level + 1)
+                yield {"level": level, "index": i, "text": summaries[i], "final": final}
+
+            if final:
+                return
+
+            texts = summaries
+            level += 1
+    except GeneratorExit:
+        # The caller stopped reading early, which isn't a failure
+        span.set(cancelled=True)
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        span_context.run(span.__exit__, type(error) if error else None, error, None)
+
+
+def generate_summary(
+    transcript: List[Dict], hierarchical: bool = None, text: str = None
+) -> str:
+    """
+    Generate a concise summary (~100 words) of the transcript content
+
+    Transcripts of up to SUMMARY_SINGLE_CALL_WORDS words are summarized with a
+    single request, longer ones with map-reduce (see `iter_summary`).
+    `hierarchical` forces either mode. `text` is the linearized transcript, if
+    it was already computed.
+    """
+    try:
+        if hierarchical is None:
+            hierarchical = len(transcript) > SUMMARY_SINGLE_CALL_WORDS
+
+        if hierarchical:
+            # The final summary comes last, and reading to the end lets the
+            # map-reduce span finish normally
+            summary = None
+            for partial in iter_summary(transcript):
+                summary = partial["text"]
+            return summary
 
         # Extract all text from transcript
-        full_text = " ".join(item['text'] for item in transcript)
-        
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
-        
+        full_text = text if text is not None else linearize_transcript(transcript)
+
         # Generate summary using OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Generate a concise summary (about 50 words) of the following transcript:"},
-                {"role": "user", "content": full_text}
-            ],
-            max_tokens=150
-        )
-        
-        return response.choices[0].message.content
-        
+        return _summarize(SUMMARY_PROMPT, full_text)
+
     except Exception as e:
         raise Exception(f"Failed to generate transcript summary: {e}")
 
@@ -41,15 +172,15 @@ if __name__ == "__main__":
     try:
         # Use Path for cross-platform compatibility
         transcript_path = Path("tests/transcript5.json")
-        
+
         if not transcript_path.exists():
             raise FileNotFoundError(f"Transcript file not found: {transcript_path}")
-            
+
         with open(transcript_path, 'r') as f:
             transcript_data = json.load(f)
-        
+
         summary = generate_summary(transcript_data)
         print(f"Transcript Summary:\n{summary}")
-        
+
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
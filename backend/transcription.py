@@ -1,44 +1,225 @@
-import assemblyai as aai
-import uuid
-import os
+import abc
+import asyncio
 import json
+import os
+import random
+import sys
+import uuid
+from typing import Iterable, Iterator, Optional
+import custom_types
+from config.constants import FPS
+
+
+class TranscriptionBackend(abc.ABC):
+    """
+    A speech-to-text service with a submit/poll job model.
+
+    `submit` starts a job and returns its id without waiting for it. `poll`
+    returns the job's status and, once completed, its words in AssemblyAI's
+    format (start/end in milliseconds). Both are blocking and are run on worker
+    threads by `transcribe`.
+
+    Words are only delivered once the job has completed, not while it runs;
+    `transcribe` then writes them out one at a time.
+    """
+
+    @abc.abstractmethod
+    def submit(self, audio_path: str) -> str:
+        """Starts a job for the audio file and returns its id."""
+
+    @abc.abstractmethod
+    def poll(self, job_id: str) -> custom_types.TranscriptionStatus:
+        """Returns the job's status, with its words once it has completed."""
+
+
+class AssemblyAIBackend(TranscriptionBackend):
+    def __init__(self, api_key: str = None):
+        import assemblyai as aai
+
+        self._aai = aai
+        aai.settings.api_key = api_key or os.getenv("ASSEMBLYAI_API_KEY")
+
+        config = aai.TranscriptionConfig(
+            language_code="en",
+            speech_model="best",
+        )
+        self._transcriber = aai.Transcriber(config=config)
+
+    def submit(self, audio_path: str) -> str:
+        return self._transcriber.submit(audio_path).id
+
+    def poll(self, job_id: str) -> custom_types.TranscriptionStatus:
+        transcript = self._aai.Transcript.get_by_id(job_id)
+
+        if transcript.status == self._aai.TranscriptStatus.completed:
+            return {"status": "completed", "words": transcript.json_response["words"]}
+        if transcript.status == self._aai.TranscriptStatus.error:
+            return {"status": "error", "error": transcript.error}
+        return {"status": "processing"}
+
+
+class FakeBackend(TranscriptionBackend):
+    """
+    Local stand-in for a real service. Jobs complete after `polls` polls with
+    the words registered for their audio path.
+    """
+
+    def __init__(self, words_by_path: dict[str, list[dict]], polls: int = 1):
+        self.words_by_path = words_by_path
+        self.polls = polls
+        self._jobs = {}
+
+    def submit(self, audio_path: str) -> str:
+        if audio_path not in self.words_by_path:
+            raise FileNotFoundError(audio_path)
+        job_id = str(uuid.uuid4())
+        self._jobs[job_id] = [audio_path, 0]
+        return job_id
+
+    def poll(self, job_id: str) -> custom_types.TranscriptionStatus:
+        job = self._jobs[job_id]
+        job[1] += 1
+        if job[1] < self.polls:
+            return {"status": "processing"}
+        return {"status": "completed", "words": self.words_by_path[job[0]]}
+
+
+def to_frame_words(words: Iterable[dict]) -> Iterator[custom_types.Word]:
+    """Converts words with millisecond timings to the frame-based Word format, lazily."""
+    for word in words:
+        yield {
+            "id": str(uuid.uuid4()),
+            "start": round(word["start"] / 1000 * FPS),
+            "end": round(word["end"] / 1000 * FPS),
+            "text": word["text"],
+        }
+
+
+def write_transcript(words: Iterable[custom_types.Word], output_path: str) -> int:
+    """
+    Writes words to a JSON transcript one at a time, without holding the whole
+    transcript in memory. The file only appears once it is complete.
+
+    Returns:
+    int: The number of words written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+
+    count = 0
+    with open(tmp_path, "w") as f:
+        f.write("[")
+        for word in words:
+            f.write(",\n  " if count else "\n  ")
+            json.dump(word, f)
+            count += 1
+        f.write("\n]" if count else "]")
+
+    os.replace(tmp_path, output_path)
+    return count
+
+
+async def transcribe(
+    audio_path: str,
+    output_path: str,
+    backend: TranscriptionBackend,
+    poll_interval: float = 1.0,
+    max_poll_interval: float = 30.0,
+) -> custom_types.TranscriptionResult:
+    """
+    Transcribes one audio file and writes its transcript to `output_path`.
+
+    The job is polled with exponential backoff (with jitter, so many jobs don't
+    poll in lockstep).
+    """
+    result = {"audio_path": audio_path, "output_path": output_path, "words": 0}
+
+    try:
+        job_id = await asyncio.to_thread(backend.submit, audio_path)
+
+        interval = poll_interval
+        while True:
+            status = await asyncio.to_thread(backend.poll, job_id)
+            if status["status"] in ("completed", "error"):
+                break
+            await asyncio.sleep(interval * random.uniform(0.8, 1.2))
+            interval = min(interval * 1.5, max_poll_interval)
+
+        if status["status"] == "error":
+            raise RuntimeError(f"Transcription failed: {status.get('error')}")
+
+        # This can happen if there are no words in the audio (e.g. if there is no audio stream)
+        if not status.get("words"):
+            raise RuntimeError("No words found in audio")
+
+        result["words"] = await asyncio.to_thread(
+            write_transcript, to_frame_words(status["words"]), output_path
+        )
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
 
-aai.settings.api_key = "c88a63312cb34a2ab566821a463d0b52"
 
-FPS = 30
+async def transcribe_many(
+    jobs: list[tuple[str, str]],
+    backend: Optional[TranscriptionBackend] = None,
+    concurrency: int = 4,
+    poll_interval: float = 1.0,
+) -> list[custom_types.TranscriptionResult]:
+    """
+    Transcribes many audio files in parallel.
 
-config = aai.TranscriptionConfig(
-    language_code="en",
-    speech_model="best",
-)
+    Parameters:
+    jobs (list[tuple[str, str]]): (audio_path, output_path) pairs.
+    backend (TranscriptionBackend, optional): Defaults to AssemblyAI.
+    concurrency (int): Maximum number of jobs in flight at once.
+    poll_interval (float): Initial delay in seconds between status polls.
 
-# Start transcription
-transcriber = aai.Transcriber(config=config)
+    Returns:
+    list (TranscriptionResult): One result per job, in the same order. Failed
+                                jobs have an "error" and don't affect the others.
+    """
+    backend = backend or AssemblyAIBackend()
+    semaphore = asyncio.Semaphore(concurrency)
 
-audio_path = os.path.join(os.path.dirname(__file__), "audiofiles", "testaudio.mp3")
+    async def run(audio_path, output_path):
+        async with semaphore:
+            return await transcribe(audio_path, output_path, backend, poll_interval)
 
-response = transcriber.transcribe(audio_path).json_response
-words = response["words"]
+    return await asyncio.gather(
+        *(run(audio_path, output_path) for audio_path, output_path in jobs)
+    )
 
-# This can happen if there are no words in the audio (e.g. if there is no audio stream)
-if not words:
-    print("No words found in audio")
-    exit(1)
 
-# Reformat the response
-words = [
-    {
-        "id": str(uuid.uuid4()),
-        "start": round(word["start"] / 1000 * FPS),
-        "end": round(word["end"] / 1000 * FPS),
-        "text": word["text"],
-    }
-    for word in words
-]
+if __name__ == "__main__":
+    base_dir = os.path.dirname(__file__)
+    tests_dir = os.path.join(base_dir, "tests")
 
-tests_dir = os.path.join(os.path.dirname(__file__), "tests")
-os.makedirs(tests_dir, exist_ok=True)
+    # Usage: python transcription.py [audio files...]
+    if len(sys.argv) > 1:
+        jobs = [
+            (
+                audio_path,
+                os.path.join(
+                    tests_dir,
+                    os.path.splitext(os.path.basename(audio_path))[0] + ".json",
+                ),
+            )
+            for audio_path in sys.argv[1:]
+        ]
+    else:
+        jobs = [
+            (
+                os.path.join(base_dir, "audiofiles", "testaudio.mp3"),
+                os.path.join(tests_dir, "transcript5.json"),
+            )
+        ]
 
-output_path = os.path.join(tests_dir, "transcript5.json")
-with open(output_path, 'w') as f:
-    json.dump(words, f, indent=2)
\ No newline at end of file
+    for result in asyncio.run(transcribe_many(jobs)):
+        if result.get("error"):
+            print(f"{result['audio_path']}: {result['error']}")
+        else:
+            print(
+                f"{result['audio_path']}: {result['words']} words -> {result['output_path']}"
+            )
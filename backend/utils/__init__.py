@@ -1,4 +1,11 @@
-__all__ = ["diff_text", "general"]
+__all__ = [
+    "diff_text",
+    "general",
+    "transcript_index",
+    "aligner",
+    "transcript_array",
+    "spans",
+]
 
 from .diff_text import diff_text, find_section_range
 from .general import (
@@ -7,5 +14,11 @@ from .general import (
     read_test_data,
     extend_to_complete_sentences,
     split_into_clauses,
-    find_transcript_segment
-)
\ No newline at end of file
+    find_transcript_segment,
+    load_transcript,
+    sentence_ranges,
+)
+from .transcript_index import TranscriptIndex, get_index
+from .aligner import SectionAligner
+from .transcript_array import TranscriptArray
+from .spans import SpanIndex
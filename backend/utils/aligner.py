@@ -0,0 +1,114 @@
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Optional
+
+import custom_types
+from utils.diff_text import cleaned
+from utils.transcript_index import TranscriptIndex
+
+
+class SectionAligner:
+    """
+    Locates sections of text (e.g. LLM answers) inside a transcript.
+
+    The transcript is cleaned and tokenized once. For each section, word n-grams
+    shared with the transcript vote for where the section starts; the word diff
+    then only runs inside a small window around the winning position instead of
+    over the whole transcript, and the range and hallucination score both come
+    out of that single diff.
+
+    Build it once per transcript and reuse it for every section.
+    """
+
+    # N-grams that occur more often than this are too common to be useful anchors
+    MAX_ANCHOR_OCCURRENCES = 50
+
+    def __init__(
+        self,
+        transcript: custom_types.Transcript,
+        window_slack: int = 20,
+        index: Optional[TranscriptIndex] = None,
+    ):
+        """
+        Parameters:
+        transcript (Transcript): The transcript sections are searched in.
+        window_slack (int): Extra words on either side of the anchor position to
+                            include in the diff window.
+        index (TranscriptIndex, optional): A prebuilt index of the transcript.
+        """
+        self.index = index or TranscriptIndex(transcript)
+        self.tokens = self.index.tokens
+        self.window_slack = window_slack
+
+    def align(self, section: str) -> Optional[custom_types.SectionMatch]:
+        """
+        Finds the part of the transcript corresponding to `section`.
+
+        Parameters:
+        section (str): The text to locate.
+
+        Returns:
+        dict (SectionMatch): The word range (end exclusive) and the fraction of the
+                             section's words which had to be replaced to match the
+                             transcript, or None if no part of it matches.
+        """
+        words = [cleaned(word) for word in section.split()]
+        if not words:
+            return None
+
+        offset = self._anchor(words)
+        if offset is None:
+            return None
+
+        # Diff inside a window around the anchor
+        slack = max(self.window_slack, len(words) // 2)
+        lo = max(0, offset - slack)
+        hi = min(len(self.tokens), offset + len(words) + slack)
+
+        matcher = SequenceMatcher(None, self.tokens[lo:hi], words, autojunk=False)
+        opcodes = matcher.get_opcodes()
+
+        equal = [i for i, opcode in enumerate(opcodes) if opcode[0] == "equal"]
+        if not equal:
+            return None
+
+        # Keep everything between the first and last matching words, so that
+        # internal deletions and hallucinated words are reverted to the transcript
+        start, end = opcodes[equal[0]][1], opcodes[equal[-1]][2]
+
+        num_words_replaced = sum(
+            opcode[4] - opcode[3] for opcode in opcodes if opcode[0] == "replace"
+        )
+
+        word_range = self.index.word_range(lo + start, lo + end)
+
+        return {
+            "start": word_range["start"],
+            "end": word_range["end"],
+            "hallucination": num_words_replaced / len(words),
+        }
+
+    def _anchor(self, words: list[str]) -> Optional[int]:
+        """
+        Returns the most likely transcript index of the section's first word.
+
+        Every n-gram of the section which occurs in the transcript votes for the
+        start position it implies; common n-grams are skipped unless nothing
+        rarer matches.
+        """
+        for n in sorted({min(self.index.max_n, len(words)), 1}, reverse=True):
+            votes = Counter()
+            fallback = Counter()
+            for j in range(len(words) - n + 1):
+                positions = self.index.positions(tuple(words[j : j + n]))
+                target = (
+                    votes if len(positions) <= self.MAX_ANCHOR_OCCURRENCES else fallback
+                )
+                for position in positions:
+                    target[position - j] += 1
+
+            votes = votes or fallback
+            if votes:
+                return max(votes.items(), key=lambda item: (item[1], -item[0]))[0]
+
+        return None
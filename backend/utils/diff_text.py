@@ -112,32 +112,29 @@ def revert_internal_deletions(original, summary):
     return " ".join(original.split(" ")[first_equal_opcode[1] : last_equal_opcode[2]])
 
 
-def find_section_range(transcript, section):
-    # Convert transcript to text
-    transcript_text = linearize_transcript(transcript)
+def find_section_range(transcript, section, aligner=None):
+    """
+    Finds the word range of the transcript corresponding to `section`.
 
-    # Strip
-    section = section.strip()
+    Parameters:
+    transcript (Transcript): The transcript to search.
+    section (str): The text to locate, e.g. an LLM answer quoting the transcript.
+    aligner (SectionAligner, optional): A prebuilt aligner for the transcript. Pass
+                                        one when locating many sections.
 
-    # Check how much it has hallucinated
-    # If it has hallucinated a LOT (e.g. just created random text), then discard it - we could not find a match
-    if hallucination_rate(transcript_text, section) > 0.1:
-        return None
+    Returns:
+    tuple: The start (inclusive) and end (exclusive) word index, or None if the
+           section could not be found or is mostly hallucinated.
+    """
+    from utils.aligner import SectionAligner
 
-    # Revert hallucinations
-    section = revert_hallucinations(transcript_text, section)
-    section = revert_internal_deletions(transcript_text, section)
+    if aligner is None:
+        aligner = SectionAligner(transcript)
 
-    # Get diff
-    opcodes = diff_text(transcript_text, section, False)
+    match = aligner.align(section.strip())
 
-    # Get "equal" opcode, i.e. where there is a match
-    equal_opcode = next((x for x in opcodes if x[0] == "equal"), None)
-    if equal_opcode == None:
+    # If it has hallucinated a LOT (e.g. just created random text), then discard it - we could not find a match
+    if match is None or match["hallucination"] > 0.1:
         return None
 
-    # Get start and end word index
-    start_word_index = equal_opcode[1]
-    end_word_index = equal_opcode[2] - 1
-
-    return start_word_index, end_word_index + 1
+    return match["start"], match["end"]
@@ -0,0 +1,266 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config.constants import (
+    CACHE_DIR,
+    EMBEDDING_MODEL,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT,
+)
+from utils import tracing
+
+_models = {}
+_phrase_embeddings = {}
+_batchers = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str = EMBEDDING_MODEL):
+    """
+    Returns the SentenceTransformer for `model_name`, loading it on first use.
+
+    The model is loaded once per process and shared by every caller.
+    """
+    with _lock:
+        if model_name not in _models:
+            from sentence_transformers import SentenceTransformer
+
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
+def normalize_text(text: str) -> str:
+    # The MiniLM tokenizer is uncased, so casing doesn't change the embedding
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of text embeddings, keyed by normalized text."""
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+            return embedding
+
+    def put(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _Request:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Merges the encode calls of concurrent threads into shared model batches.
+
+    A background thread takes the first waiting request, then keeps adding
+    requests that arrive within `max_wait` seconds, until the batch holds
+    `max_batch` texts. A request therefore waits at most `max_wait` plus one
+    model call, and under concurrent load the model sees a few large batches
+    instead of many small ones, which is much faster per text.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        max_batch: int = EMBEDDING_BATCH_SIZE,
+        max_wait: float = EMBEDDING_BATCH_WAIT,
+    ):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embeds the texts as part of the next batch, blocking until it's done."""
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        """Stops the background thread once the waiting requests are done."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> Optional[list[_Request]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            try:
+                request = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                # Stop after this batch
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            texts = [text for request in batch for text in request.texts]
+            try:
+                with tracing.span(
+                    "embeddings.batch", requests=len(batch), texts=len(texts)
+                ):
+                    embeddings = get_model(self.model_name).encode(
+                        texts, normalize_embeddings=True
+                    )
+                offset = 0
+                for request in batch:
+                    request.result = embeddings[offset : offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+
+def enable_batching(
+    model_name: str = EMBEDDING_MODEL,
+    max_batch: int = EMBEDDING_BATCH_SIZE,
+    max_wait: float = EMBEDDING_BATCH_WAIT,
+) -> MicroBatcher:
+    """
+    Routes every `encode` call for `model_name` through a shared MicroBatcher,
+    for processes which serve concurrent requests (see server.py).
+    """
+    with _lock:
+        if model_name not in _batchers:
+            _batchers[model_name] = MicroBatcher(model_name, max_batch, max_wait)
+        return _batchers[model_name]
+
+
+def _encode(texts: list[str], model_name: str) -> np.ndarray:
+    with _lock:
+        batcher = _batchers.get(model_name)
+    if batcher is not None:
+        return batcher.encode(texts)
+    return get_model(model_name).encode(texts, normalize_embeddings=True)
+
+
+# Shared by all callers of `encode` which don't bring their own cache
+clause_cache = EmbeddingCache()
+
+
+def encode(
+    texts: list[str],
+    model_name: str = EMBEDDING_MODEL,
+    cache: Optional[EmbeddingCache] = clause_cache,
+) -> np.ndarray:
+    """
+    Embeds texts with the shared model, returning unit-length vectors.
+
+    Texts already in the cache are not re-encoded; all others are encoded in a
+    single batch, shared with other threads if batching is enabled.
+
+    Parameters:
+    texts (list[str]): The texts to embed.
+    model_name (str): Name of the SentenceTransformer model.
+    cache (EmbeddingCache, optional): Cache to read and fill. Pass None to bypass it.
+
+    Returns:
+    ndarray: Array of shape (len(texts), dim).
+    """
+    keys = [normalize_text(text) for text in texts]
+    embeddings = [cache.get(key) if cache is not None else None for key in keys]
+
+    missing = list(dict.fromkeys(k for k, e in zip(keys, embeddings) if e is None))
+    if missing:
+        encoded = dict(zip(missing, _encode(missing, model_name)))
+        if cache is not None:
+            for key, embedding in encoded.items():
+                cache.put(key, embedding)
+        embeddings = [
+            encoded[key] if embedding is None else embedding
+            for key, embedding in zip(keys, embeddings)
+        ]
+
+    if not embeddings:
+        return np.zeros((0, get_model(model_name).get_sentence_embedding_dimension()))
+
+    return np.stack(embeddings)
+
+
+def phrase_embeddings(
+    phrases: list[str], model_name: str = EMBEDDING_MODEL
+) -> np.ndarray:
+    """
+    Returns unit-length embeddings of a fixed phrase list.
+
+    They are persisted to a .npy file keyed by a hash of the model name and the
+    phrases, so they are only ever computed once, not once per process.
+    """
+    digest = hashlib.sha256(
+        "\n".join([model_name, *phrases]).encode("utf-8")
+    ).hexdigest()[:16]
+
+    with _lock:
+        if digest in _phrase_embeddings:
+            return _phrase_embeddings[digest]
+
+    path = os.path.join(CACHE_DIR, "embeddings", f"{digest}.npy")
+    if os.path.exists(path):
+        embeddings = np.load(path)
+    else:
+        embeddings = get_model(model_name).encode(phrases, normalize_embeddings=True)
+
+        # Write to a temporary file first so other workers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, embeddings)
+        os.replace(tmp_path, path)
+
+    with _lock:
+        _phrase_embeddings[digest] = embeddings
+    return embeddings
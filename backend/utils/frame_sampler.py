@@ -0,0 +1,239 @@
+import contextvars
+import itertools
+import queue
+import threading
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+
+import cv2
+import numpy as np
+
+from utils import tracing
+
+_DONE = object()
+
+
+class FrameSampler:
+    """
+    Reads an arbitrary set of frames from a video while opening the file once.
+
+    Requested frames are visited in sorted order: frames in between are skipped
+    with `grab()` (which doesn't decode them), and only large forward gaps or
+    backward jumps fall back to a real seek. Decoding happens on a background
+    thread that stays up to `prefetch` frames ahead of the consumer.
+
+    Usage:
+        with FrameSampler(video_path, max_width=640) as sampler:
+            for frame in sampler.sample([120, 30, 900]):
+                ...
+            for index, frame in sampler.sample_range(0, None, 30):
+                ...
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        max_width: Optional[int] = None,
+        prefetch: int = 8,
+        seek_threshold: int = 300,
+    ):
+        """
+        Parameters:
+        video_path (str): Path to the video file.
+        max_width (int, optional): Downscale frames wider than this, keeping the aspect ratio.
+        prefetch (int): Number of decoded frames the background thread may buffer.
+        seek_threshold (int): Forward gaps longer than this many frames are seeked
+                              instead of grabbed.
+        """
+        self.video_path = video_path
+        self.max_width = max_width
+        self.prefetch = prefetch
+        self.seek_threshold = seek_threshold
+
+        self._cap = cv2.VideoCapture(video_path)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
+
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Index of the frame the next grab() will return
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+    def sample(self, frame_indices: Iterable[int]) -> Iterator[Optional[np.ndarray]]:
+        """
+        Yields one frame per requested index, in request order.
+
+        Frames that can't be read (e.g. past the end of the video) are yielded as
+        None so the output always lines up with `frame_indices`. Duplicate indices
+        are only decoded once.
+
+        Parameters:
+        frame_indices (Iterable[int]): Frame indices of the video to read.
+
+        Returns:
+        Iterator[Optional[ndarray]]: The BGR frames.
+        """
+        requested = [int(i) for i in frame_indices]
+        if not requested:
+            return
+
+        # How many more times each decoded frame will still be handed out
+        remaining = Counter(requested)
+        decoded = self._decoded(sorted(remaining), until_missing=False)
+
+        pending = {}
+        try:
+            for index in requested:
+                while index not in pending:
+                    item = next(decoded, None)
+                    if item is None:
+                        # The worker always emits every index before finishing
+                        raise RuntimeError(f"Frame {index} was never decoded.")
+                    pending[item[0]] = item[1]
+
+                remaining[index] -= 1
+                frame = pending[index] if remaining[index] else pending.pop(index)
+                yield frame
+        finally:
+            decoded.close()
+
+    def sample_range(
+        self, start: int = 0, end: Optional[int] = None, step: int = 1
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Yields every `step`-th frame in [start, end) with its index, in order,
+        stopping early at the end of the video.
+
+        Parameters:
+        start (int): Index of the first frame.
+        end (int, optional): Index after the last frame. None reads until the
+                             decoder runs out of frames rather than up to
+                             `frame_count`, which is only an estimate for
+                             some containers.
+        step (int): Frames between consecutive samples.
+
+        Returns:
+        Iterator[tuple[int, ndarray]]: The frame indices and BGR frames.
+        """
+        if step < 1:
+            raise ValueError(f"step must be at least 1, got {step}")
+        indices = (
+            itertools.count(start, step) if end is None else range(start, end, step)
+        )
+
+        decoded = self._decoded(indices, until_missing=True)
+        try:
+            for index, frame in decoded:
+                if frame is None:
+                    return
+                yield index, frame
+        finally:
+            decoded.close()
+
+    def _decoded(
+        self, indices: Iterable[int], until_missing: bool
+    ) -> Iterator[tuple[int, Optional[np.ndarray]]]:
+        """
+        (index, frame) for each of the sorted `indices`, decoded on the
+        background thread. With `until_missing`, decoding stops after the
+        first frame that can't be read.
+        """
+        decoded = queue.Queue(maxsize=max(1, self.prefetch))
+        stop = threading.Event()
+
+        # The worker runs in a copy of the caller's context, so that its span
+        # is nested under the caller's
+        worker = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._decode, indices, until_missing, decoded, stop),
+            daemon=True,
+        )
+        worker.start()
+
+        try:
+            while True:
+                item = decoded.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Unblock the worker if it is waiting on a full queue
+            while worker.is_alive():
+                try:
+                    decoded.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+
+    def _decode(
+        self,
+        indices: Iterable[int],
+        until_missing: bool,
+        out: queue.Queue,
+        stop: threading.Event,
+    ):
+        with tracing.span("video.decode") as span:
+            count = 0
+            try:
+                with self._lock:
+                    for index in indices:
+                        if stop.is_set():
+                            span.set(stopped=True)
+                            break
+                        frame = self._read(index)
+                        out.put((index, frame))
+                        count += 1
+                        if frame is None and until_missing:
+                            break
+            except Exception as e:
+                out.put(e)
+            span.set(frames=count)
+        out.put(_DONE)
+
+    def _read(self, index: int) -> Optional[np.ndarray]:
+        if self._cap is None:
+            raise RuntimeError("FrameSampler is closed.")
+        # Frames past `frame_count` are still tried, since it is only an
+        # estimate for some containers
+        if index < 0:
+            return None
+
+        gap = index - self._position
+        if gap < 0 or gap > self.seek_threshold:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._position = index
+        else:
+            for _ in range(gap):
+                if not self._cap.grab():
+                    return None
+                self._position += 1
+
+        ok, frame = self._cap.read()
+        if not ok:
+            return None
+        self._position += 1
+
+        return self._resize(frame)
+
+    def _resize(self, frame: np.ndarray) -> np.ndarray:
+        if not self.max_width or frame.shape[1] <= self.max_width:
+            return frame
+        scale = self.max_width / frame.shape[1]
+        size = (self.max_width, max(1, round(frame.shape[0] * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
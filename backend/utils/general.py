@@ -2,40 +2,67 @@ import json
 import custom_types
 import math
 import re
+from utils.transcript_array import TranscriptArray
+from utils.spans import SpanIndex, ends_sentence
 
 def get_transcript_words(transcript, word_count):
-    return " ".join([word["text"] for word in transcript[:word_count]])
+    return linearize_transcript(transcript[:word_count])
 
 def linearize_transcript(transcript):
+    if isinstance(transcript, TranscriptArray):
+        return " ".join(transcript.texts)
     return " ".join([word["text"] for word in transcript])
 
+def load_transcript(path: str):
+    """
+    Loads a transcript from either a JSON file or the binary format written by
+    TranscriptArray.save (any path ending in ".bin"), which is memory-mapped.
+    """
+    if path.endswith(".bin"):
+        return TranscriptArray.load(path)
+    with open(path) as f:
+        return json.load(f)
+
+def sentence_ranges(transcript: custom_types.Transcript) -> list[custom_types.Range]:
+    """Word ranges (end exclusive) of the sentences in the transcript."""
+    return SpanIndex(transcript).sentences
+
 def split_into_clauses(text):
     """Split text into clauses based on punctuation and conjunctions."""
     clause_pattern = r'(?<=[.,;])\s+|(?=\band\b|\bbut\b|\bor\b)'
     clauses = re.split(clause_pattern, text)
     return [clause.strip() for clause in clauses if clause.strip()]
 
-#we might have to improve this function - using sliding window/rabin karp
-def find_transcript_segment(clause, transcript):
-    words = clause.split()
-    if len(words) < 3:
+def find_transcript_segment(clause, transcript, index=None, hint=None):
+    """
+    Finds the word in the transcript where the given clause starts.
+
+    Parameters:
+    clause (str): The clause to look up. Needs at least three words.
+    transcript (Transcript): The transcript to search.
+    index (TranscriptIndex, optional): A prebuilt index of the transcript. By
+                                       default the cached one of `get_index`.
+    hint (int, optional): Word index the clause is expected near, used to pick
+                          between repeated occurrences.
+
+    Returns:
+    dict (Word): The first word of the clause, or None if it wasn't found.
+    """
+    from utils.transcript_index import get_index
+
+    if len(clause.split()) < 3:
+        return None
+
+    if index is None:
+        index = get_index(transcript)
+
+    match = index.longest_match(clause, hint=hint, min_length=3)
+    if match is None:
         return None
-        
-    word1, word2, word3 = words[0:3]
-    
-    for i in range(len(transcript) - 2):
-        current = transcript[i]
-        next_seg = transcript[i + 1]
-        third_seg = transcript[i + 2]
-        
-        if (current["text"].lower() == word1.lower() and 
-            next_seg["text"].lower() == word2.lower() and
-            third_seg["text"].lower() == word3.lower()):
-            return current
-        
-    return None
-
-def chunk_transcript(transcript, duration, overlap=0):
+
+    return transcript[match["start"]]
+
+def chunk_transcript(transcript, duration, overlap=0, spans=None):
     # Calculate words per minute of speech
     overall_duration = transcript[-1]["end"]
     wpm = 150
@@ -48,6 +75,7 @@ def chunk_transcript(transcript, duration, overlap=0):
     overlap = int(wpm / 60 / 30 * overlap)
 
     num_chunks = max(1, math.floor(len(transcript) / max_words_per_chunk))
+    spans = spans or SpanIndex(transcript)
 
     chunks = []
     for i in range(num_chunks):
@@ -55,7 +83,7 @@ def chunk_transcript(transcript, duration, overlap=0):
         end = (i + 1) * max_words_per_chunk + overlap
 
         range_dict = {"start": start, "end": end}
-        range_dict = extend_to_complete_sentences(range_dict, transcript)
+        range_dict = spans.extend_to_sentences(range_dict)
         start, end = range_dict["start"], range_dict["end"]
 
         if i == num_chunks - 1:
@@ -85,8 +113,7 @@ def read_test_data(test_number: int):
     - No notes.
     """
     # Read test transcript
-    with open(f"tests/{test_number}/transcript.json") as f:
-        transcript = json.load(f)
+    transcript = load_transcript(f"tests/{test_number}/transcript.json")
 
     # Create test camera_video_path
     camera_video_path = f"tests/{test_number}/camera_video.mp4"
@@ -97,7 +124,9 @@ def read_test_data(test_number: int):
     return transcript, camera_video_path, screen_video_path
 
 def extend_to_complete_sentences(
-    word_range: custom_types.Range, transcript: custom_types.Transcript
+    word_range: custom_types.Range,
+    transcript: custom_types.Transcript,
+    spans: SpanIndex = None,
 ) -> custom_types.Range:
     """
     Given a range and a transcript, this function extends the start/end of the
@@ -110,21 +139,27 @@ def extend_to_complete_sentences(
                         and word_range["end"] is the index of the last word in the
                         transcript (exclusive).
     transcript (Transcript): The corresponding transcript.
+    spans (SpanIndex, optional): A prebuilt span index of the transcript, which
+                                 turns the extension into two binary searches.
+                                 Worth it when extending many ranges.
 
     Returns:
     word_range (Range): The updated range of words.
     """
-    eos = ["?", "!", "."]
+    if spans is not None:
+        return spans.extend_to_sentences(word_range)
 
     start = word_range["start"]
     end = word_range["end"]
 
     # Extend start backwards
-    while start > 0 and transcript[start - 1]["text"][-1] not in eos:
+    while start > 0 and not ends_sentence(transcript[start - 1]["text"]):
         start -= 1
 
-    # Extend end forwards
-    while end < len(transcript) - 1 and transcript[end - 1]["text"][-1] not in eos:
+    # Extend end forwards (an empty range at the start has no word before it)
+    while end < len(transcript) and (
+        end == 0 or not ends_sentence(transcript[end - 1]["text"])
+    ):
         end += 1
 
     return {"start": start, "end": end}
\ No newline at end of file
@@ -0,0 +1,145 @@
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import custom_types
+from config.constants import CHAPTER_WINDOW_SENTENCES, CHAPTER_MIN_WORDS
+from utils.embeddings import encode
+from utils.general import linearize_transcript, sentence_ranges
+
+
+def window_similarities(
+    transcript: custom_types.Transcript,
+    sentences: list[custom_types.Range],
+    window_sentences: int,
+) -> np.ndarray:
+    """
+    Cosine similarity across every sentence boundary which has a full window of
+    sentences on both sides.
+
+    All windows of `window_sentences` consecutive sentences are embedded in one
+    batch. Element g compares the window ending right before sentence
+    `g + window_sentences` with the window starting at it.
+    """
+    w = window_sentences
+    if len(sentences) < 2 * w:
+        return np.zeros(0)
+
+    texts = [
+        linearize_transcript(
+            transcript[sentences[j]["start"] : sentences[j + w - 1]["end"]]
+        )
+        for j in range(len(sentences) - w + 1)
+    ]
+    # Bypass the shared clause cache, these texts are only looked up here
+    embeddings = encode(texts, cache=None)
+
+    return np.einsum("ij,ij->i", embeddings[:-w], embeddings[w:])
+
+
+def depth_scores(similarities: np.ndarray, radius: int) -> np.ndarray:
+    """
+    TextTiling depth of every gap: how far the similarity drops below the
+    highest points within `radius` gaps on its left and on its right.
+    """
+    n = len(similarities)
+    padded = np.pad(similarities, radius, mode="edge")
+    # Row k covers similarities[k - radius : k + 1]
+    windows = sliding_window_view(padded, radius + 1)
+    left = windows[:n].max(axis=1)
+    right = windows[radius : radius + n].max(axis=1)
+    return left + right - 2 * similarities
+
+
+def topic_segments(
+    transcript: custom_types.Transcript,
+    sentences: Optional[list[custom_types.Range]] = None,
+    window_sentences: int = CHAPTER_WINDOW_SENTENCES,
+    min_words: int = CHAPTER_MIN_WORDS,
+    max_segments: Optional[int] = None,
+) -> list[custom_types.Range]:
+    """
+    Splits a transcript into topically coherent segments, TextTiling style.
+
+    Boundaries go into the similarity valleys between adjacent sentence windows
+    (smoothed, and deep relative to the rest of the transcript), so they always
+    fall on sentence boundaries. The deepest valleys are taken first, skipping
+    any that would leave a segment shorter than `min_words`.
+
+    Parameters:
+    transcript (Transcript): The transcript to segment.
+    sentences (list[Range], optional): Its sentence ranges, if already computed.
+    window_sentences (int): Number of sentences on each side of a boundary which
+                            are compared.
+    min_words (int): Minimum number of words per segment.
+    max_segments (int, optional): Maximum number of segments.
+
+    Returns:
+    list (Range): Word ranges (end exclusive) covering the whole transcript.
+    """
+    if not len(transcript):
+        return []
+
+    if sentences is None:
+        sentences = sentence_ranges(transcript)
+
+    similarities = window_similarities(transcript, sentences, window_sentences)
+    return select_segments(
+        similarities,
+        sentences,
+        len(transcript),
+        window_sentences,
+        min_words,
+        max_segments,
+    )
+
+
+def select_segments(
+    similarities: np.ndarray,
+    sentences: list[custom_types.Range],
+    num_words: int,
+    window_sentences: int = CHAPTER_WINDOW_SENTENCES,
+    min_words: int = CHAPTER_MIN_WORDS,
+    max_segments: Optional[int] = None,
+) -> list[custom_types.Range]:
+    """
+    The boundary selection of `topic_segments`, for similarities which were
+    already computed by `window_similarities` (or incrementally, in the same
+    layout).
+    """
+    if num_words == 0:
+        return []
+    if len(similarities) < 3:
+        return [{"start": 0, "end": num_words}]
+
+    smoothed = np.convolve(
+        np.pad(similarities, 1, mode="edge"), np.ones(3) / 3, mode="valid"
+    )
+    depths = depth_scores(smoothed, radius=window_sentences)
+
+    # Valleys, deeper than the TextTiling cutoff
+    padded = np.pad(smoothed, 1, mode="edge")
+    valleys = (smoothed <= padded[:-2]) & (smoothed <= padded[2:])
+    candidates = np.flatnonzero(
+        valleys & (depths > 0) & (depths > depths.mean() - depths.std() / 2)
+    )
+    candidates = candidates[np.argsort(-depths[candidates], kind="stable")]
+
+    max_boundaries = num_words // min_words - 1
+    if max_segments is not None:
+        max_boundaries = min(max_boundaries, max_segments - 1)
+
+    boundaries = []
+    for gap in candidates:
+        if len(boundaries) >= max_boundaries:
+            break
+        word = sentences[gap + window_sentences]["start"]
+        if min(word, num_words - word) < min_words:
+            continue
+        if any(abs(word - boundary) < min_words for boundary in boundaries):
+            continue
+        boundaries.append(word)
+
+    edges = [0, *sorted(boundaries), num_words]
+    return [{"start": start, "end": end} for start, end in zip(edges, edges[1:])]
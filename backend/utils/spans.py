@@ -0,0 +1,94 @@
+import re
+
+import numpy as np
+
+import custom_types
+from utils.transcript_array import TranscriptArray
+
+SENTENCE_END = (".", "!", "?")
+CLAUSE_END = (".", ",", ";")
+_CONJUNCTION = re.compile(r"(and|but|or)\b")
+
+
+def ends_sentence(text: str) -> bool:
+    return text.endswith(SENTENCE_END)
+
+
+def starts_clause(previous_text: str, text: str) -> bool:
+    """
+    Whether a word starts a new clause: after punctuation, or at a conjunction.
+    These are the rules of utils.general.split_into_clauses, applied to words.
+    """
+    return previous_text.endswith(CLAUSE_END) or bool(_CONJUNCTION.match(text))
+
+
+class SpanIndex:
+    """
+    Sentence and clause boundaries of a transcript, computed once.
+
+    Both are stored as sorted arrays of end word indices (exclusive), the last
+    of which is always the length of the transcript, so that a trailing
+    sentence without punctuation still counts. Looking up the sentence around
+    a word is then a binary search.
+    """
+
+    def __init__(self, transcript: custom_types.Transcript):
+        if isinstance(transcript, TranscriptArray):
+            texts = transcript.texts
+        else:
+            texts = [word["text"] for word in transcript]
+
+        n = len(texts)
+        sentence_ends = [i + 1 for i, text in enumerate(texts) if ends_sentence(text)]
+        clause_ends = [i for i in range(1, n) if starts_clause(texts[i - 1], texts[i])]
+        for ends in (sentence_ends, clause_ends):
+            if n and (not ends or ends[-1] != n):
+                ends.append(n)
+
+        self.texts = texts
+        self.sentence_ends = np.array(sentence_ends, dtype=np.int64)
+        self.clause_ends = np.array(clause_ends, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def _ranges(ends: np.ndarray) -> list[custom_types.Range]:
+        starts = [0, *ends[:-1].tolist()]
+        return [
+            {"start": start, "end": end} for start, end in zip(starts, ends.tolist())
+        ]
+
+    @property
+    def sentences(self) -> list[custom_types.Range]:
+        """Word ranges (end exclusive) of the sentences."""
+        return self._ranges(self.sentence_ends)
+
+    @property
+    def clauses(self) -> list[custom_types.Clause]:
+        """Word ranges (end exclusive) and text of the clauses with any text."""
+        clauses = []
+        for clause in self._ranges(self.clause_ends):
+            text = " ".join(self.texts[clause["start"] : clause["end"]]).strip()
+            if text:
+                clauses.append({**clause, "text": text})
+        return clauses
+
+    def sentence_of(self, word: int) -> int:
+        """Index of the sentence containing the given word."""
+        return int(np.searchsorted(self.sentence_ends, word, side="right"))
+
+    def extend_to_sentences(self, word_range: custom_types.Range) -> custom_types.Range:
+        """
+        Extends a word range (end exclusive) outwards to the nearest sentence
+        boundaries, so that it only contains complete sentences.
+        """
+        # The last sentence end at or before the start, and the first one at or
+        # after the end
+        i = np.searchsorted(self.sentence_ends, word_range["start"], side="right")
+        start = int(self.sentence_ends[i - 1]) if i else 0
+
+        j = np.searchsorted(self.sentence_ends, word_range["end"], side="left")
+        end = int(self.sentence_ends[j]) if j < len(self.sentence_ends) else len(self)
+
+        return {"start": start, "end": end}
@@ -0,0 +1,264 @@
+"""
+Lightweight tracing: nested, timed spans with attributes.
+
+    with tracing.span("search", words=len(transcript)) as span:
+        ...
+        span.set(prompt_tokens=123, cache="miss")
+
+    @tracing.traced("title")
+    def generate_title(...):
+        ...
+        tracing.current().set(words=len(transcript))
+
+The output is selected with the TRACING environment variable (or `configure`):
+
+- "off" (default): `span` returns a shared no-op object, so instrumented code
+  costs about one function call per span.
+- "jsonl": every finished span is appended as one JSON line to TRACING_PATH
+  (default "traces.jsonl").
+- "prometheus": span durations and numeric attributes are aggregated per span
+  name, and string/bool attributes are counted per value (so they should have
+  few distinct values, like cache="hit"). The metrics are rendered in the
+  Prometheus text format by `render_prometheus` (for an HTTP endpoint), and
+  written at exit to TRACING_PATH (default "metrics.prom") when configured
+  from the environment. `configure("prometheus")` without a path keeps them
+  in memory only.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional
+from config.constants import TRACING, TRACING_PATH
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+_sink = None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "duration",
+        "error",
+        "_started",
+        "_token",
+    )
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+
+    def __enter__(self):
+        parent = _current.get()
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self._token = _current.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        _current.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        if _sink is not None:
+            _sink.record(self)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException):
+        """Marks the span as failed with an error that was handled inside it."""
+        self.error = f"{type(error).__name__}: {error}"
+
+
+def span(name: str, **attributes):
+    """Returns a context manager timing the enclosed block as a span."""
+    if _sink is None:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def current():
+    """The innermost active span, or a no-op span if there is none."""
+    return _current.get() or _NOOP
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping every call of the function in a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        line = json.dumps(
+            {
+                "name": span.name,
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start": span.start,
+                "duration": span.duration,
+                "attributes": span.attributes,
+                "error": span.error,
+            },
+            default=str,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusSink:
+    """Aggregates spans into counters, rendered in the Prometheus text format."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._attributes = defaultdict(float)
+        self._labels = defaultdict(int)
+
+    def record(self, span: Span):
+        with self._lock:
+            self._count[span.name] += 1
+            self._seconds[span.name] += span.duration
+            if span.error:
+                self._errors[span.name] += 1
+            for key, value in span.attributes.items():
+                if isinstance(value, bool) or isinstance(value, str):
+                    # Outcomes such as cache="hit" are counted per value
+                    self._labels[(span.name, key, str(value))] += 1
+                elif isinstance(value, (int, float)):
+                    self._attributes[(span.name, key)] += value
+
+    def render(self) -> str:
+        lines = [
+            "# TYPE span_calls_total counter",
+            "# TYPE span_errors_total counter",
+            "# TYPE span_seconds_total counter",
+            "# TYPE span_attribute_total counter",
+            "# TYPE span_outcome_total counter",
+        ]
+        with self._lock:
+            for name, count in sorted(self._count.items()):
+                lines.append(f'span_calls_total{{span="{name}"}} {count}')
+                lines.append(f'span_errors_total{{span="{name}"}} {self._errors[name]}')
+                lines.append(
+                    f'span_seconds_total{{span="{name}"}} {self._seconds[name]:.6f}'
+                )
+            for (name, key), value in sorted(self._attributes.items()):
+                lines.append(
+                    f'span_attribute_total{{span="{name}",attribute="{key}"}} {value:g}'
+                )
+            for (name, key, value), count in sorted(self._labels.items()):
+                value = value.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(
+                    f'span_outcome_total{{span="{name}",attribute="{key}",value="{value}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self.path:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+
+
+def configure(mode: str, path: Optional[str] = None):
+    """
+    Switches the tracing output.
+
+    Parameters:
+    mode (str): "off", "jsonl" or "prometheus".
+    path (str, optional): Output file. For "prometheus", None keeps the metrics
+                          in memory only (e.g. for an HTTP endpoint).
+    """
+    global _sink
+
+    if _sink is not None:
+        _sink.close()
+
+    if mode == "off":
+        _sink = None
+    elif mode == "jsonl":
+        _sink = JsonlSink(path or "traces.jsonl")
+    elif mode == "prometheus":
+        _sink = PrometheusSink(path)
+    else:
+        raise ValueError(f"Unknown tracing mode: {mode}")
+
+
+def render_prometheus() -> str:
+    """The aggregated metrics in the Prometheus text format, if enabled."""
+    if isinstance(_sink, PrometheusSink):
+        return _sink.render()
+    return ""
+
+
+def _close():
+    if _sink is not None:
+        _sink.close()
+
+
+atexit.register(_close)
+
+if TRACING != "off":
+    configure(TRACING, TRACING_PATH)
@@ -0,0 +1,265 @@
+import json
+import struct
+import uuid
+from typing import Iterator, Union
+
+import numpy as np
+
+import custom_types
+
+MAGIC = b"TRNA"
+VERSION = 1
+FLAG_UUID_IDS = 1
+
+# magic, version, flags, num words, vocab size, vocab bytes, id vocab size, id vocab bytes
+_HEADER = struct.Struct("<4sIIQQQQQ")
+
+
+class StringTable:
+    """Interned strings stored in a single UTF-8 buffer with offsets."""
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+        self._decoded = None
+
+    @classmethod
+    def intern(cls, strings: list[str]) -> tuple["StringTable", np.ndarray]:
+        """Returns the table of unique strings and the index of each input string."""
+        table = {}
+        indices = np.fromiter(
+            (table.setdefault(s, len(table)) for s in strings),
+            dtype=np.int32,
+            count=len(strings),
+        )
+
+        encoded = [s.encode("utf-8") for s in table]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        return cls(buffer, offsets), indices
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def strings(self) -> list[str]:
+        # Decoded lazily, once; the vocabulary is much smaller than the transcript
+        if self._decoded is None:
+            data = self.buffer.tobytes()
+            offsets = self.offsets.tolist()
+            self._decoded = [
+                data[offsets[i] : offsets[i + 1]].decode("utf-8")
+                for i in range(len(self))
+            ]
+        return self._decoded
+
+
+class TranscriptArray:
+    """
+    Compact, columnar alternative to `Transcript` (a list of Word dicts).
+
+    Start/end frames are int32 arrays, word texts are interned into a single
+    buffer, and uuid4 ids are stored as 16 raw bytes (other ids fall back to an
+    interned string table). Slicing returns a zero-copy view, and the binary
+    format written by `save` can be memory-mapped by `load`.
+
+    It behaves like a `Transcript` where it matters: `len`, iteration and integer
+    indexing yield Word dicts, so it can be passed to the functions in
+    utils.general and functions.trim as is.
+    """
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        text_ids: np.ndarray,
+        vocab: StringTable,
+        ids: Union[np.ndarray, tuple[np.ndarray, StringTable]],
+    ):
+        """
+        Parameters:
+        starts (ndarray): int32 start frame of each word.
+        ends (ndarray): int32 end frame of each word.
+        text_ids (ndarray): int32 index of each word's text in `vocab`.
+        vocab (StringTable): The interned word texts.
+        ids (ndarray | tuple): Either an (n, 16) uint8 array of uuid bytes, or the
+                               int32 index of each id plus the interned id table.
+        """
+        self.starts = starts
+        self.ends = ends
+        self.text_ids = text_ids
+        self.vocab = vocab
+        self.ids = ids
+
+    @property
+    def uuid_ids(self) -> bool:
+        return not isinstance(self.ids, tuple)
+
+    @classmethod
+    def from_words(cls, words: custom_types.Transcript) -> "TranscriptArray":
+        starts = np.fromiter((w["start"] for w in words), np.int32, len(words))
+        ends = np.fromiter((w["end"] for w in words), np.int32, len(words))
+        vocab, text_ids = StringTable.intern([w["text"] for w in words])
+
+        try:
+            raw = b"".join(uuid.UUID(w["id"]).bytes for w in words)
+            # Only store raw bytes if they round-trip to the exact same id
+            if any(str(uuid.UUID(w["id"])) != w["id"] for w in words):
+                raise ValueError
+            ids = np.frombuffer(raw, dtype=np.uint8).reshape(len(words), 16)
+        except ValueError:
+            id_table, id_index = StringTable.intern([w["id"] for w in words])
+            ids = (id_index, id_table)
+
+        return cls(starts, ends, text_ids, vocab, ids)
+
+    def to_words(self) -> custom_types.Transcript:
+        return list(self)
+
+    @classmethod
+    def from_json(cls, path: str) -> "TranscriptArray":
+        with open(path) as f:
+            return cls.from_words(json.load(f))
+
+    def to_json(self, path: str, indent: int = None):
+        with open(path, "w") as f:
+            json.dump(self.to_words(), f, indent=indent)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"TranscriptArray({len(self)} words)"
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            ids = self.ids[key] if self.uuid_ids else (self.ids[0][key], self.ids[1])
+            return TranscriptArray(
+                self.starts[key], self.ends[key], self.text_ids[key], self.vocab, ids
+            )
+
+        i = range(len(self))[key]  # Normalizes negative indices, raises IndexError
+        return {
+            "id": self.id(i),
+            "start": int(self.starts[i]),
+            "end": int(self.ends[i]),
+            "text": self.vocab.strings[self.text_ids[i]],
+        }
+
+    def __iter__(self) -> Iterator[custom_types.Word]:
+        texts = self.texts
+        starts, ends = self.starts.tolist(), self.ends.tolist()
+        for i in range(len(self)):
+            yield {
+                "id": self.id(i),
+                "start": starts[i],
+                "end": ends[i],
+                "text": texts[i],
+            }
+
+    def id(self, i: int) -> str:
+        if self.uuid_ids:
+            return str(uuid.UUID(bytes=self.ids[i].tobytes()))
+        index, table = self.ids
+        return table.strings[index[i]]
+
+    @property
+    def texts(self) -> list[str]:
+        strings = self.vocab.strings
+        return [strings[i] for i in self.text_ids.tolist()]
+
+    def save(self, path: str):
+        """Writes the transcript in the binary format read by `load`."""
+        # Slices may share a larger vocabulary; that is fine, it is written as is
+        id_index, id_table = (None, None) if self.uuid_ids else self.ids
+        flags = FLAG_UUID_IDS if self.uuid_ids else 0
+
+        sections = [
+            self.starts.astype("<i4"),
+            self.ends.astype("<i4"),
+            self.text_ids.astype("<i4"),
+            self.vocab.offsets.astype("<i8"),
+            self.vocab.buffer,
+        ]
+        if self.uuid_ids:
+            sections.append(np.ascontiguousarray(self.ids).reshape(-1))
+        else:
+            sections += [
+                id_index.astype("<i4"),
+                id_table.offsets.astype("<i8"),
+                id_table.buffer,
+            ]
+
+        header = _HEADER.pack(
+            MAGIC,
+            VERSION,
+            flags,
+            len(self),
+            len(self.vocab),
+            len(self.vocab.buffer),
+            0 if self.uuid_ids else len(id_table),
+            0 if self.uuid_ids else len(id_table.buffer),
+        )
+
+        with open(path, "wb") as f:
+            f.write(header)
+            position = len(header)
+            for section in sections:
+                padding = -position % 8
+                f.write(b"\0" * padding)
+                data = np.ascontiguousarray(section).tobytes()
+                f.write(data)
+                position += padding + len(data)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TranscriptArray":
+        """
+        Reads a transcript written by `save`.
+
+        With `mmap`, the arrays are views into a read-only memory map of the
+        file, so loading is O(1) and pages are only read when touched.
+        """
+        if mmap:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+
+        (
+            magic,
+            version,
+            flags,
+            n,
+            vocab_size,
+            vocab_bytes,
+            id_vocab_size,
+            id_vocab_bytes,
+        ) = _HEADER.unpack(data[: _HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a transcript file (version {VERSION}): {path}")
+
+        position = _HEADER.size
+
+        def take(dtype, count):
+            nonlocal position
+            position += -position % 8
+            nbytes = np.dtype(dtype).itemsize * count
+            array = data[position : position + nbytes].view(dtype)
+            position += nbytes
+            return array
+
+        starts = take("<i4", n)
+        ends = take("<i4", n)
+        text_ids = take("<i4", n)
+        vocab_offsets = take("<i8", vocab_size + 1)
+        vocab = StringTable(take(np.uint8, vocab_bytes), vocab_offsets)
+
+        if flags & FLAG_UUID_IDS:
+            ids = take(np.uint8, n * 16).reshape(n, 16)
+        else:
+            id_index = take("<i4", n)
+            id_offsets = take("<i8", id_vocab_size + 1)
+            ids = (id_index, StringTable(take(np.uint8, id_vocab_bytes), id_offsets))
+
+        return cls(starts, ends, text_ids, vocab, ids)
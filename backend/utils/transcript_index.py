@@ -0,0 +1,160 @@
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+import custom_types
+from utils.diff_text import cleaned
+
+
+class TranscriptIndex:
+    """
+    Hash index from normalized word n-grams to their positions in a transcript.
+
+    The transcript is tokenized the same way as its linearized text (a word whose
+    text contains spaces yields several tokens), and tokens are normalized with
+    `cleaned` (lowercased, punctuation stripped), so lookups don't care about
+    casing or punctuation differences. Every n-gram of length 1..max_n is
+    indexed, which makes a lookup a single dict access followed by a short
+    extension of each candidate.
+
+    Build it once per transcript and reuse it for every query.
+    """
+
+    def __init__(self, transcript: custom_types.Transcript, max_n: int = 3):
+        """
+        Parameters:
+        transcript (Transcript): The transcript to index.
+        max_n (int): Length of the longest n-gram stored in the index.
+        """
+        self.max_n = max_n
+        self.num_words = len(transcript)
+
+        # Normalized tokens, and the index of the word each token came from
+        self.tokens = []
+        self.token_words = []
+        for word_index, word in enumerate(transcript):
+            for token in word["text"].split():
+                self.tokens.append(cleaned(token))
+                self.token_words.append(word_index)
+
+        self._ngrams = defaultdict(list)
+        for n in range(1, max_n + 1):
+            for i in range(len(self.tokens) - n + 1):
+                self._ngrams[tuple(self.tokens[i : i + n])].append(i)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @staticmethod
+    def tokenize(phrase: str) -> list[str]:
+        return [cleaned(word) for word in phrase.split()]
+
+    def positions(self, ngram: tuple[str, ...]) -> list[int]:
+        """Returns the start token index of every occurrence of an indexed n-gram."""
+        return self._ngrams.get(ngram, [])
+
+    def word_range(self, start: int, end: int) -> custom_types.Range:
+        """Converts a token range (end exclusive) to a word range (end exclusive)."""
+        return {
+            "start": self.token_words[start],
+            "end": self.token_words[end - 1] + 1,
+        }
+
+    def find_all(self, phrase: str) -> list[int]:
+        """
+        Returns the start word index of every exact (normalized) occurrence of
+        `phrase`, in transcript order.
+        """
+        words = self.tokenize(phrase)
+        if not words:
+            return []
+
+        candidates = self.positions(tuple(words[: self.max_n]))
+        if len(words) > self.max_n:
+            candidates = [
+                i for i in candidates if self.tokens[i : i + len(words)] == words
+            ]
+
+        return [self.token_words[i] for i in candidates]
+
+    def longest_match(
+        self, phrase: str, hint: Optional[int] = None, min_length: int = 1
+    ) -> Optional[custom_types.Range]:
+        """
+        Finds the occurrence of the longest prefix of `phrase` in the transcript.
+
+        Parameters:
+        phrase (str): The text to look up.
+        hint (int, optional): Word index the match is expected near. Among equally
+                              long matches, the one closest to the hint wins;
+                              without a hint, the earliest one does.
+        min_length (int): Minimum number of matching words of `phrase` for a result.
+
+        Returns:
+        dict (Range): Word range of the match (end exclusive), or None.
+        """
+        words = self.tokenize(phrase)
+
+        # Find the longest indexed prefix which occurs at all
+        n = min(len(words), self.max_n)
+        while n > 0 and tuple(words[:n]) not in self._ngrams:
+            n -= 1
+        if n == 0:
+            return None
+
+        best_start, best_length = None, 0
+        for start in self._ngrams[tuple(words[:n])]:
+            # Extend the match past the indexed prefix
+            length = n
+            while (
+                length < len(words)
+                and start + length < len(self.tokens)
+                and self.tokens[start + length] == words[length]
+            ):
+                length += 1
+
+            if length > best_length or (
+                length == best_length
+                and hint is not None
+                and abs(self.token_words[start] - hint)
+                < abs(self.token_words[best_start] - hint)
+            ):
+                best_start, best_length = start, length
+
+        if best_length < min_length:
+            return None
+
+        return self.word_range(best_start, best_start + best_length)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_CACHED_INDEXES = 16
+
+
+def get_index(transcript: custom_types.Transcript) -> TranscriptIndex:
+    """
+    Returns the index of a transcript, building it on first use.
+
+    Indexes are cached per transcript text, so repeated lookups in the same
+    transcript (e.g. one `find_transcript_segment` per clause) only build it
+    once.
+    """
+    key = hashlib.sha256(
+        "\n".join(word["text"] for word in transcript).encode("utf-8")
+    ).hexdigest()
+
+    with _indexes_lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return _indexes[key]
+
+    index = TranscriptIndex(transcript)
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+
+    return index